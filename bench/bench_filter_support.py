@@ -0,0 +1,93 @@
+"""
+Сверка filter_support.classify_chunk с прежним фильтром (strip_html + четыре str.contains)
+на описаниях, где ключевые слова разрезаны тегами и пробелами, плюс время на вакансию.
+
+    python bench/bench_filter_support.py
+    python bench/bench_filter_support.py --rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import filter_support as fs  # noqa: E402
+
+TAG_RE = re.compile(r"<[^>]+>")
+
+# фразы, которые теги и переносы режут посередине: совпадение зависит от схлопывания пробелов
+SPLIT = [
+    "<p>Работа в контакт <b>центр</b>е</p>",
+    "<p>Оператор call\n\n<i>центр</i>а</p>",
+    "<li>контакт-<b>центр</b></li>",
+    "<p>служба <b>поддержк</b>и</p>",
+    "<p>директор <br/> магазина</p>",
+    "<p>менеджер <b>по</b>\t<b>продажам</b></p>",
+    "<p>линия <b>1</b>, <b>L2</b></p>",
+    "<p>кредитный\n<b>аналитик</b></p>",
+]
+FILLER = "компания склад офис график доставка обучение команда проект клиент".split()
+NAMES = ["Специалист", "Оператор", "Продавец-кассир", "Менеджер", "Support engineer", "Курьер"]
+
+
+def legacy_strip_html(x: str) -> str:
+    x = TAG_RE.sub(" ", x)
+    return re.sub(r"\s+", " ", x).strip()
+
+
+def legacy_keep(df: pd.DataFrame) -> pd.Series:
+    # filter_support до потоковой версии — эталон
+    name = df["name"].fillna("").astype(str)
+    desc = df["description"].fillna("").astype(str).map(legacy_strip_html)
+    is_pos = name.str.contains(fs.POS) | desc.str.contains(fs.POS)
+    is_neg = name.str.contains(fs.NEG) | desc.str.contains(fs.NEG)
+    return is_pos & ~is_neg
+
+
+def synthetic(rng: random.Random, rows: int) -> pd.DataFrame:
+    out = []
+    for i in range(rows):
+        parts = [rng.choice(FILLER) for _ in range(rng.randint(20, 120))]
+        for _ in range(rng.randint(0, 2)):
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(SPLIT))
+        out.append({"vacancy_id": str(i), "name": rng.choice(NAMES), "description": " ".join(parts)})
+    return pd.DataFrame(out)
+
+
+def main() -> None:
+    # у POS/NEG есть группы — str.contains предупреждает, на результат это не влияет
+    warnings.filterwarnings("ignore", "This pattern is interpreted as a regular expression")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    df = synthetic(random.Random(args.seed), args.rows)
+
+    started = time.process_time()
+    old = df[legacy_keep(df)]
+    legacy_s = time.process_time() - started
+    started = time.process_time()
+    new = fs.classify_chunk(df)
+    new_s = time.process_time() - started
+
+    diff = set(old["vacancy_id"]) ^ set(new["vacancy_id"])
+    for vid in sorted(diff, key=int)[:3]:
+        print("MISMATCH", df.loc[int(vid), "name"], "|", df.loc[int(vid), "description"][:200])
+
+    print(f"rows: {len(df)}, kept: legacy {len(old)}, new {len(new)}")
+    print(f"legacy: {legacy_s * 1e6 / len(df):.1f} us/row")
+    print(f"new:    {new_s * 1e6 / len(df):.1f} us/row  (x{legacy_s / max(new_s, 1e-9):.2f})")
+    print(f"mismatches: {len(diff)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Время ответа inn_index.InnIndex на синтетическом индексе: точные и нечёткие запросы
+(опечатки, перестановки слов, чужие названия), плюс выборочная сверка с полным перебором.
+
+    python bench/bench_inn_index.py
+    python bench/bench_inn_index.py --names 50000 --queries 500
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import inn_index  # noqa: E402
+
+# частые слова названий + выдуманные из слогов: в ЕГРЮЛ словарь названий широкий
+COMMON = (
+    "орбита сервис строй торг инвест логистик урал сибирь волга нева альфа бета гамма дельта "
+    "техно профи групп холдинг медиа софт телеком энерго агро фарм транс маркет ритейл финанс "
+    "капитал север юг восток запад центр регион союз мир новые системы решения проекты"
+).split()
+SYLLABLES = [c + v for c in "бвгджзклмнпрстфхцчшщ" for v in "аеиоуыэюя"] + "экс ал ин ор ус ан ер".split()
+FORMS = ("ООО", "АО", "ПАО", "ИП", "")
+
+
+def vocabulary(rng: random.Random, size: int = 5000) -> list:
+    made = {"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)}
+    return COMMON + sorted(made)
+
+
+WORDS = vocabulary(random.Random(0))
+
+
+def company_name(rng: random.Random) -> str:
+    words = [rng.choice(COMMON if rng.random() < 0.4 else WORDS) for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.5:
+        words.append(str(rng.randint(1, 999)))
+    return f'{rng.choice(FORMS)} "{"-".join(words) if rng.random() < 0.2 else " ".join(words)}"'.strip()
+
+
+def typo(rng: random.Random, name: str) -> str:
+    chars = list(name)
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.4:
+            chars[i] = rng.choice("абвгдеклмнопрст")
+        elif op < 0.7:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice("абвгдеклмнопрст"))
+    return "".join(chars)
+
+
+def brute(index: inn_index.InnIndex, name: str, min_score: float) -> float:
+    q = inn_index.trigrams(inn_index.normalize_name(name))
+    best = 0.0
+    for _, grams in index._entries:
+        common = len(q & grams)
+        best = max(best, common / (len(q) + len(grams) - common))
+    return best if best >= min_score else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--check", type=int, default=100, help="сколько нечётких запросов сверить с перебором")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    index = inn_index.InnIndex()
+    names = []
+    started = time.perf_counter()
+    for i in range(args.names):
+        name = company_name(rng)
+        names.append(name)
+        index.add(f"{7700000000 + i}", name, f"site{i}.ru" if rng.random() < 0.3 else "", "bench")
+    print(f"index: {len(index)} distinct names, built in {time.perf_counter() - started:.2f}s")
+
+    exact = [rng.choice(names) for _ in range(args.queries)]
+    fuzzy = [typo(rng, rng.choice(names)) for _ in range(args.queries)]
+    foreign = [company_name(random.Random(rng.random())) + " " + rng.choice(WORDS) for _ in range(args.queries)]
+
+    # первый проход ещё собирает numpy-списки триграмм (лениво) — отдельной строкой
+    for label, queries in (("exact", exact), ("cold", fuzzy), ("typo", fuzzy), ("other", foreign)):
+        started = time.perf_counter()
+        found = sum(index.lookup(name=q) is not None for q in queries)
+        us = (time.perf_counter() - started) * 1e6 / len(queries)
+        print(f"{label:6} {us:8.0f} us/lookup  answered {found}/{len(queries)}")
+
+    # prefix filter не должен терять лучший ответ: его score совпадает с полным перебором
+    lost = 0
+    for q in fuzzy[:args.check]:
+        m = index._fuzzy(inn_index.normalize_name(q), inn_index.FUZZY_MIN)
+        want = brute(index, q, inn_index.FUZZY_MIN)
+        got = m.score if m else 0.0
+        # неоднозначное название (несколько ИНН) индекс не отдаёт — это не потеря
+        if abs(got - want) > 1e-9 and not (m is None and want and _ambiguous(index, q, want)):
+            lost += 1
+    print(f"fuzzy vs brute force: {lost}/{min(args.check, len(fuzzy))} differ")
+
+
+def _ambiguous(index: inn_index.InnIndex, name: str, score: float) -> bool:
+    q = inn_index.trigrams(inn_index.normalize_name(name))
+    for norm, grams in index._entries:
+        common = len(q & grams)
+        if abs(common / (len(q) + len(grams) - common) - score) < 1e-9:
+            return index._unique(index._names[norm]) is None
+    return False
+
+
+if __name__ == "__main__":
+    main()
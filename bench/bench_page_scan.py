@@ -0,0 +1,214 @@
+"""
+Сравнение CPU на страницу: старый анализ (отдельный regex по сырому html на каждый признак + extract_links)
+против enrich_site_features: один разбор страницы (html_doc) и однопроходный MultiMatcher.
+Расхождения ожидаемы только там, где признак был лишь в тексте скриптов/стилей или в HTML-сущностях.
+
+    python bench/bench_page_scan.py                 # синтетический корпус
+    python bench/bench_page_scan.py --from-cache    # реальные страницы из data/cache/http.sqlite
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import enrich_site_features as esf  # noqa: E402
+import html_doc  # noqa: E402
+from http_cache import CACHE_PATH  # noqa: E402
+
+WORDS = (
+    "компания доставка товары клиенты новости главная каталог статус статистика длинный "
+    "lorem ipsum dolor sit amet help helpdesk contacts 2024 24 часа поддержки обратной связи "
+    "база знаний инструкция помощь FAQ ИНН"
+).split()
+
+SNIPPETS = [
+    '<a href="https://t.me/firm">Telegram</a>',
+    '<a href="https://wa.me/79990000000">WhatsApp</a>',
+    '<script src="//code.jivo.ru/widget/abc"></script>',
+    '<script src="https://widget.intercom.io/x.js"></script>',
+    '<script>var b24 = "bitrix24";</script>',
+    '<form action="/send" method="post"><input name="q"></form>',
+    '<script type="application/ld+json">{"@type":"Organization","taxID":"7701234567"}</script>',
+    "<p>ИНН: 7701234567, ОГРН 1027700000000</p>",
+    "<p>Реквизиты: INN 770123456789</p>",
+    "<p>Пишите: support@firm.ru или sales@firm.ru, info@firm.ru</p>",
+    "<p>client.help@firm.ru</p>",
+    "<p>Работаем 24/7, круглосуточно</p>",
+    "<p>Служба поддержки, обратная связь</p>",
+    "<p>База знаний, FAQ, статьи и инструкции</p>",
+    '<a href="/contacts">Контакты</a> <a href="/faq">FAQ</a> <a href="/support">Support</a>',
+    '<a href="#top">up</a> <a href="mailto:x@y.ru">mail</a> <a href="tel:+7">tel</a>',
+    '<a href="/a/../b/">dots</a> <a href="//cdn.firm.ru/x">cdn</a> <a href="/x?y=1#z">q</a> <a href="rel/path">rel</a>',
+    '<a href="https://other.ru/help">ext</a> <a href=" /spaced ">sp</a> <a href="/path/">slash</a>',
+    # маркеры вендоров вне <a href>/<script>: iframe, link, data-* и обработчики
+    '<iframe src="https://yandex.ru/chat/widget/firm"></iframe>',
+    '<link rel="preconnect" href="https://widget.chatra.io">',
+    '<button data-href="https://wa.me/79990000000">WhatsApp</button>',
+    "<div onclick=\"window.open('https://t.me/firm')\">Telegram</div>",
+    '<div data-widget="livetex" class="w"></div>',
+]
+
+
+def synthetic_page(rng: random.Random, size: int) -> str:
+    parts = ["<html><head><title>Компания</title></head><body>"]
+    for i in range(size):
+        r = rng.random()
+        if r < 0.55:
+            parts.append(rng.choice(WORDS))
+        elif r < 0.8:
+            parts.append(f'<div class="c{i}">')
+        elif r < 0.9:
+            parts.append(f'<a href="/p/{i}">{rng.choice(WORDS)}</a>')
+        elif r < 0.93:
+            parts.append(rng.choice(SNIPPETS))
+        else:
+            parts.append("</div>")
+    parts.append("</body></html>")
+    return " ".join(parts)
+
+
+def cached_pages(limit: int) -> List[Tuple[str, str]]:
+    conn = sqlite3.connect(str(CACHE_PATH))
+    rows = conn.execute(
+        "SELECT url, body, encoding FROM responses WHERE source = 'site' AND status = 200 LIMIT ?",
+        (limit,),
+    ).fetchall()
+    return [(url, body.decode(enc or "utf-8", errors="replace")) for url, body, enc in rows]
+
+
+TAG_RE = re.compile(r"<[^>]+>")
+WS_RE = re.compile(r"\s+")
+FORM_RE = re.compile(r"<form\b", re.IGNORECASE)
+
+
+def legacy_norm_text(html: str) -> str:
+    return WS_RE.sub(" ", TAG_RE.sub(" ", html)).strip()
+
+
+def legacy_extract_links(html: str, base_url: str) -> List[str]:
+    # extract_links + same_domain в исходном виде
+    hrefs = re.findall(r'href=["\']([^"\']+)["\']', html, flags=re.IGNORECASE)
+    links = []
+    for h in hrefs:
+        h = h.strip()
+        if not h or h.startswith("#") or h.startswith("mailto:") or h.startswith("tel:"):
+            continue
+        full = urljoin(base_url, h)
+        try:
+            netloc = urlparse(full).netloc
+            same = not netloc or netloc == urlparse(base_url).netloc
+        except Exception:
+            same = False
+        if same:
+            links.append(full)
+    seen = set()
+    out = []
+    for u in links:
+        if u not in seen:
+            out.append(u); seen.add(u)
+    return out
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    # то же, что analyze_page отдаёт краулеру: ссылки разобранного документа того же домена
+    return esf.resolve_links(html_doc.parse(html).links, base_url)
+
+
+def legacy_analyze(pages_html: List[Tuple[str, str]]) -> esf.SiteFeatures:
+    # анализ из enrich_one_site до MultiMatcher и html_doc — эталон по скорости и результату
+    f = esf.SiteFeatures()
+    all_links: List[str] = []
+    for url, html in pages_html:
+        text = legacy_norm_text(html)
+        if not f.inn:
+            mj = esf.TAXID_JSON_RE.search(html)
+            if mj:
+                f.inn = mj.group(1)
+        if not f.inn:
+            m = esf.INN_RE.search(text)
+            if m:
+                f.inn = m.group(2)
+        emails = [e.lower() for e in esf.EMAIL_RE.findall(text)]
+        support_emails = [e for e in emails if e.startswith(("support@", "help@", "client@", "service@", "info@")) or "support" in e or "help" in e]
+        if support_emails and not f.support_email:
+            f.support_email = support_emails[0]
+            f.has_support_email = 1
+        if not f.has_contact_form and FORM_RE.search(html):
+            f.has_contact_form = 1
+        if not f.mentions_24_7 and esf.MENTIONS_24_7_RE.search(text):
+            f.mentions_24_7 = 1
+        if not f.has_messengers and esf.MESSENGERS_RE.search(html):
+            f.has_messengers = 1
+        if not f.has_online_chat:
+            for vendor, rx in esf.CHAT_VENDORS.items():
+                if rx.search(html):
+                    f.has_online_chat = 1
+                    f.chat_vendor = vendor
+                    break
+        all_links.extend(legacy_extract_links(html, url))
+        if not f.has_support_section and esf.SUPPORT_HINT_RE.search(text):
+            f.has_support_section = 1
+        if not f.has_kb_or_faq and esf.KB_HINT_RE.search(text):
+            f.has_kb_or_faq = 1
+    if all_links:
+        f.support_url, f.kb_url = esf.pick_best_support_links(all_links)
+    return f
+
+
+def per_page_ms(fn, pages: List[Tuple[str, str]], repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        for page in pages:
+            fn([page])
+    return (time.process_time() - started) * 1000 / (repeat * len(pages))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--size", type=int, default=3000, help="токенов на синтетическую страницу")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--from-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.from_cache:
+        pages = cached_pages(args.pages)
+    else:
+        rng = random.Random(args.seed)
+        pages = [(f"https://firm{i}.ru/", synthetic_page(rng, args.size)) for i in range(args.pages)]
+    if not pages:
+        print("No pages")
+        return
+
+    # результаты должны совпадать постранично
+    mismatches = 0
+    for page in pages:
+        old = legacy_analyze([page])
+        new = esf.analyze_pages([page], esf.SiteFeatures())
+        if old != new or legacy_extract_links(page[1], page[0]) != extract_links(page[1], page[0]):
+            mismatches += 1
+            if mismatches <= 3:
+                print("MISMATCH", page[0], "\n  old:", old, "\n  new:", new)
+
+    avg_kb = sum(len(h) for _, h in pages) / len(pages) / 1024
+    legacy_ms = per_page_ms(legacy_analyze, pages, args.repeat)
+    new_ms = per_page_ms(lambda p: esf.analyze_pages(p, esf.SiteFeatures()), pages, args.repeat)
+
+    print(f"pages: {len(pages)}, avg size: {avg_kb:.1f} KB")
+    print(f"legacy:  {legacy_ms:.3f} ms/page")
+    print(f"matcher: {new_ms:.3f} ms/page  (x{legacy_ms / max(new_ms, 1e-9):.2f})")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
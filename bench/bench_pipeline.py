@@ -0,0 +1,164 @@
+"""
+Сквозной офлайн-бенчмарк пайплайна: поднимает стенд-ины (bench/standin.py),
+копирует src/ во временный каталог (data/ там своя, рабочие данные не трогаем)
+и по очереди запускает стадии. По каждой: время, запросов к стенду, req/s, строк на выходе, rows/s.
+
+    python bench/bench_pipeline.py                            # весь пайплайн, 40 работодателей
+    python bench/bench_pipeline.py --employers 200 --rate-429 0.02 --runs 2   # второй прогон — с тёплым кэшем
+    python bench/bench_pipeline.py --stages collect_seeds,job_details --json /tmp/bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import fixtures  # noqa: E402
+import storage  # noqa: E402
+from pipeline import STAGES as PIPELINE_STAGES  # noqa: E402
+from standin import Faults, Stand  # noqa: E402
+
+# стадии в порядке пайплайна; строки считаем по первому выходу (таблица storage или файл в data/)
+STAGES: List[Tuple[str, str]] = [(s.name, s.outputs[0]) for s in PIPELINE_STAGES]
+
+
+def output_path(workspace: Path, output: str) -> Path:
+    data_dir = workspace / "data"
+    return data_dir / output if Path(output).suffix else storage.table_path(output, data_dir)
+
+
+def delta(after: Dict[str, Dict[str, Any]], before: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    requests = 0
+    statuses: Dict[str, int] = {}
+    for name, snap in after.items():
+        requests += snap["requests"] - before[name]["requests"]
+        for status, n in snap["statuses"].items():
+            d = n - before[name]["statuses"].get(status, 0)
+            if d:
+                statuses[str(status)] = statuses.get(str(status), 0) + d
+    return {"requests": requests, "statuses": statuses}
+
+
+def run_stage(
+    stage: str, output: str, workspace: Path, env: Dict[str, str], stand: Stand, extra: List[str],
+) -> Dict[str, Any]:
+    log_path = workspace / "logs" / f"{stage}.log"
+    before = stand.snapshot()
+    started = time.perf_counter()
+    with log_path.open("a", encoding="utf-8") as log:
+        proc = subprocess.run(
+            [sys.executable, str(workspace / "src" / f"{stage}.py"), *extra],
+            cwd=workspace, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    wall = time.perf_counter() - started
+    traffic = delta(stand.snapshot(), before)
+    rows = storage.num_rows(output_path(workspace, output))
+    # хвост лога упавшей стадии — рабочий каталог без --keep потом удаляется
+    tail = log_path.read_text(encoding="utf-8").splitlines()[-5:] if proc.returncode else []
+    return {
+        "stage": stage,
+        "ok": proc.returncode == 0,
+        "wall_s": round(wall, 3),
+        "requests": traffic["requests"],
+        "req_per_s": round(traffic["requests"] / wall, 2) if wall > 0 else 0.0,
+        "rows": rows,
+        "rows_per_s": round(rows / wall, 2) if wall > 0 else 0.0,
+        "statuses": traffic["statuses"],
+        "log": str(log_path),
+        "tail": tail,
+    }
+
+
+def print_table(run: int, results: List[Dict[str, Any]]) -> None:
+    print(f"\nrun {run}")
+    print(f"{'stage':30} {'wall, s':>9} {'requests':>9} {'req/s':>8} {'rows':>7} {'rows/s':>8}  statuses")
+    for r in results:
+        mark = "" if r["ok"] else "  FAILED"
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(r["statuses"].items()))
+        print(f"{r['stage']:30} {r['wall_s']:9.2f} {r['requests']:9d} {r['req_per_s']:8.2f} "
+              f"{r['rows']:7d} {r['rows_per_s']:8.2f}  {statuses}{mark}")
+        for line in r["tail"]:
+            print("    | " + line)
+    total = sum(r["wall_s"] for r in results)
+    print(f"{'total':30} {total:9.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employers", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fixtures", type=Path, default=None, help="готовый JSON из bench/fixtures.py")
+    parser.add_argument("--stages", type=str, default="", help="через запятую; по умолчанию все")
+    parser.add_argument("--runs", type=int, default=1, help="повторные прогоны идут с тёплым HTTP-кэшем")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--keep", action="store_true", help="не удалять рабочий каталог")
+    parser.add_argument("--profile", action="store_true", help="стадии с --profile: профили в <workspace>/data/profiles")
+    parser.add_argument("--json", type=Path, default=None, help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    selected = [s for s in args.stages.split(",") if s]
+    stages = [(s, out) for s, out in STAGES if not selected or s in selected]
+    unknown = set(selected) - {s for s, _ in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    fx = fixtures.load(args.fixtures) if args.fixtures else fixtures.generate(args.employers, args.seed)
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_429)
+    stand = Stand(fx, faults).start()
+
+    workspace = Path(tempfile.mkdtemp(prefix="lead_sniper_bench_"))
+    shutil.copytree(ROOT / "src", workspace / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    (workspace / "logs").mkdir()
+    env = {
+        **os.environ,
+        "HTTP_BASE_OVERRIDES": json.dumps(stand.overrides),
+        "DADATA_TOKEN": "bench",
+        # стенд на 127.0.0.1 — никаких системных прокси
+        "NO_PROXY": "*",
+        "no_proxy": "*",
+        "PYTHONUNBUFFERED": "1",
+    }
+
+    print(f"employers: {len(fx['employers'])}, vacancies: {len(fx['vacancies'])}, sites: {len(fx['sites'])}")
+    print(f"workspace: {workspace}")
+    all_runs: List[List[Dict[str, Any]]] = []
+    try:
+        for run in range(1, args.runs + 1):
+            results: List[Dict[str, Any]] = []
+            for stage, output in stages:
+                res = run_stage(stage, output, workspace, env, stand, ["--profile"] if args.profile else [])
+                results.append(res)
+                if not res["ok"]:
+                    break
+            print_table(run, results)
+            all_runs.append(results)
+    finally:
+        stand.stop()
+        if not args.keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    if args.json:
+        summary: Dict[str, Any] = {
+            "employers": len(fx["employers"]),
+            "faults": vars(faults),
+            "runs": all_runs,
+        }
+        args.json.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nSaved -> {args.json}")
+
+
+if __name__ == "__main__":
+    main()
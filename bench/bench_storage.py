@@ -0,0 +1,88 @@
+"""
+storage: parquet против прежних CSV на синтетической таблице вакансий (нужен pyarrow).
+Сверяет, что read_table/iter_table отдают одно и то же, что таблица, оставшаяся
+только в CSV (до перехода на parquet), видна и читается, и меряет время чтения.
+
+    python bench/bench_storage.py
+    python bench/bench_storage.py --rows 200000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import storage  # noqa: E402
+
+WORDS = "клиент обращения чат звонки смена график поддержка оператор линия продукт сервис опыт команда".split()
+
+
+def frame(rows: int, rng: random.Random) -> pd.DataFrame:
+    return pd.DataFrame({
+        "vacancy_id": [str(10_000_000 + i) for i in range(rows)],
+        "employer_id": [str(rng.randint(1, rows // 10 + 1)) for _ in range(rows)],
+        "name": [f"Специалист поддержки {rng.randint(1, 999)}" for _ in range(rows)],
+        "query": [rng.choice(("поддержка", "support", "оператор")) for _ in range(rows)],
+        "status": [rng.choice(("200", "404", "")) for _ in range(rows)],
+        "description": [" ".join(rng.choices(WORDS, k=rng.randint(20, 200))) for _ in range(rows)],
+    })
+
+
+def same(got: pd.DataFrame, want: pd.DataFrame) -> None:
+    # строки сравниваем по значениям: object против str у pandas 3 — не расхождение
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    out = fn()
+    print(f"{label:28} {time.perf_counter() - started:7.3f}s")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not storage.PARQUET:
+        sys.exit("нужен pyarrow (и STORAGE_FORMAT не csv)")
+
+    df = frame(args.rows, random.Random(args.seed))
+    data_dir = Path(tempfile.mkdtemp(prefix="lead_sniper_storage_"))
+    name = "raw/vacancies_details"
+    (data_dir / "raw").mkdir()
+    legacy = data_dir / f"{name}.csv"
+    df.to_csv(legacy, index=False, encoding="utf-8")
+
+    # таблица есть только в CSV: source_path уводит на неё, чтение — как прежний read_csv
+    assert storage.source_path(name, data_dir) == legacy
+    from_csv = timed("read legacy csv", lambda: storage.read_table(name, data_dir=data_dir))
+    same(from_csv, df)
+    chunks = list(storage.iter_table(name, columns=["vacancy_id", "status"], chunk_rows=7_000, data_dir=data_dir))
+    same(pd.concat(chunks, ignore_index=True), df[["vacancy_id", "status"]])
+
+    # первая запись — уже parquet, и дальше читается он
+    timed("write parquet", lambda: storage.write_table(from_csv, name, data_dir))
+    assert storage.source_path(name, data_dir).suffix == ".parquet"
+    from_parquet = timed("read parquet", lambda: storage.read_table(name, data_dir=data_dir))
+    same(from_parquet, df)
+    cols = timed("read parquet, 2 columns", lambda: storage.read_table(name, columns=["vacancy_id", "status"], data_dir=data_dir))
+    same(cols, df[["vacancy_id", "status"]])
+    chunks = list(storage.iter_table(name, chunk_rows=7_000, data_dir=data_dir))
+    same(pd.concat(chunks, ignore_index=True), df)
+
+    sizes = {p.suffix: p.stat().st_size for p in (data_dir / "raw").iterdir()}
+    print(f"size: csv {sizes['.csv'] / 1e6:.1f} MB, parquet {sizes['.parquet'] / 1e6:.1f} MB")
+    print("parity: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Фикстуры для офлайн-стенда: работодатели, вакансии HH, сайты компаний, карточки rusprofile
+и ответы DaData. Генерируются детерминированно по seed и сохраняются в JSON,
+стенд-ины (bench/standin.py) отдают их как записанные ответы.
+
+    python bench/fixtures.py --employers 200 --out /tmp/fixtures.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# те же фразы, что в collect_seeds.QUERIES
+QUERIES = [
+    "служба поддержки",
+    "helpdesk",
+    "контакт-центр",
+    "техподдержка",
+    "customer support",
+]
+
+BRANDS = (
+    "Ромашка Альфа Вектор Гранит Орбита Север Лайт Сфера Магнит Прайм Спектр Ока "
+    "Кедр Аврора Восток Меридиан Пульс Гермес Оникс Титан"
+).split()
+FORMS = ("ООО", "АО", "ПАО", "ООО", "ООО")
+
+FILLER = (
+    "компания сервис клиенты доставка качество команда продукт решения партнеры "
+    "новости каталог услуги проекты опыт лет рынок технологии развитие"
+).split()
+
+SUPPORT_LINES = [
+    "В поддержке {n} специалистов, работаем по сменам.",
+    "Контакт-центр: {n} операторов на линии.",
+    "Команда support — {n} человек.",
+]
+B_LINES = [
+    "Работа 24/7, сменный график 2/2.",
+    "Круглосуточная линия, ночные смены.",
+]
+NEG_TITLES = ["Продавец-кассир", "Менеджер по продажам", "Директор магазина"]
+POS_TITLES = ["Специалист службы поддержки", "Оператор контакт-центра", "Helpdesk L1", "Инженер техподдержки"]
+
+
+def filler(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(FILLER) for _ in range(words))
+
+
+def make_inn(rng: random.Random) -> str:
+    # ИНН юрлица с верной контрольной цифрой — иначе резолвер посчитает его неуверенным
+    digits = [rng.randint(0, 9) for _ in range(9)]
+    digits[0] = rng.randint(1, 9)
+    check = sum(d * w for d, w in zip(digits, (2, 4, 10, 3, 5, 9, 4, 6, 8))) % 11 % 10
+    return "".join(map(str, digits)) + str(check)
+
+
+def vacancy_description(rng: random.Random, positive: bool) -> str:
+    parts = [f"<p>{filler(rng, rng.randint(40, 160))}</p>"]
+    if positive:
+        r = rng.random()
+        if r < 0.5:
+            parts.append("<p>" + rng.choice(SUPPORT_LINES).format(n=rng.choice([12, 25, 40, 120, 300])) + "</p>")
+        elif r < 0.85:
+            parts.append("<p>" + rng.choice(B_LINES) + "</p>")
+        parts.append("<ul><li>обработка обращений в чате</li><li>тикеты и SLA</li></ul>")
+    parts.append(f"<p>{filler(rng, rng.randint(20, 120))}</p>")
+    return "".join(parts)
+
+
+def site_pages(rng: random.Random, emp: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Страницы одного сайта. "{base}" в sitemap/ссылках стенд подставит на свой адрес.
+    """
+    pad = filler(rng, rng.randint(1500, 5000))
+    has_faq = rng.random() < 0.5
+    has_support = rng.random() < 0.5
+    links = ['<a href="/contacts">Контакты</a>', '<a href="/about">О компании</a>']
+    if has_faq:
+        links.append('<a href="/faq">FAQ</a>')
+    if has_support:
+        links.append('<a href="/support">Поддержка</a>')
+    head = "<html><head><title>{}</title>{}</head><body>".format(
+        emp["brand"],
+        '<script src="//code.jivo.ru/widget/x"></script>' if rng.random() < 0.3 else "",
+    )
+    home_extra = []
+    if rng.random() < 0.4:
+        home_extra.append('<a href="https://t.me/{}">Telegram</a>'.format(emp["brand"].lower()))
+    if rng.random() < 0.3:
+        home_extra.append("<p>Работаем 24/7</p>")
+
+    pages = {
+        "/": head + "<nav>" + " ".join(links) + "</nav>" + "".join(home_extra) + f"<main>{pad}</main></body></html>",
+        "/about": head + f"<main>{filler(rng, 400)}</main></body></html>",
+        "/contacts": head + (
+            '<form action="/send" method="post"><input name="q"></form>' if rng.random() < 0.6 else ""
+        ) + "<p>Пишите: {}</p><footer>{} ИНН {}</footer></body></html>".format(
+            "support@{}.ru".format(emp["slug"]) if rng.random() < 0.6 else "info@{}.ru".format(emp["slug"]),
+            emp["legal_name"],
+            emp["inn"] if rng.random() < 0.5 else "",
+        ),
+    }
+    if has_faq:
+        pages["/faq"] = head + f"<h1>База знаний</h1><main>{filler(rng, 600)}</main></body></html>"
+    if has_support:
+        pages["/support"] = head + f"<h1>Служба поддержки</h1><main>{filler(rng, 300)}</main></body></html>"
+
+    sitemap: Optional[str] = None
+    robots = "User-agent: *\nDisallow: /admin\n"
+    if rng.random() < 0.5:
+        locs = "".join(f"<url><loc>{{base}}{p.lstrip('/')}</loc></url>" for p in pages)
+        sitemap = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+        robots += "Sitemap: {base}sitemap.xml\n"
+    return {"pages": pages, "robots": robots, "sitemap": sitemap}
+
+
+def generate(employers: int = 40, seed: int = 1, site_share: float = 0.8) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 15, tzinfo=timezone.utc)
+
+    emps: List[Dict[str, Any]] = []
+    sites: List[Dict[str, Any]] = []
+    for i in range(employers):
+        brand = f"{rng.choice(BRANDS)}-{i}"
+        emp = {
+            "id": str(1000 + i),
+            "brand": brand,
+            "slug": f"firm{i}",
+            "name": brand if rng.random() < 0.5 else f"{rng.choice(FORMS)} «{brand}»",
+            "legal_name": f"{rng.choice(FORMS)} «{brand}»",
+            "inn": make_inn(rng),
+            "card_id": str(500000 + i),
+            "in_dadata": rng.random() < 0.85,
+            "site": None,
+        }
+        if rng.random() < site_share:
+            emp["site"] = len(sites)
+            sites.append(site_pages(rng, emp))
+        emps.append(emp)
+
+    vacancies: List[Dict[str, Any]] = []
+    vid = 90000
+    for emp in emps:
+        for _ in range(rng.randint(1, 4)):
+            vid += 1
+            positive = rng.random() < 0.8
+            vacancies.append({
+                "id": str(vid),
+                "employer_id": emp["id"],
+                "query": rng.choice(QUERIES),
+                "name": rng.choice(POS_TITLES if positive else NEG_TITLES),
+                "description": vacancy_description(rng, positive),
+                "published_at": (now - timedelta(minutes=vid % 5000)).strftime("%Y-%m-%dT%H:%M:%S+0300"),
+            })
+    # HH отдаёт выдачу от свежих к старым
+    vacancies.sort(key=lambda v: v["published_at"], reverse=True)
+    return {"seed": seed, "employers": emps, "vacancies": vacancies, "sites": sites}
+
+
+def load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employers", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    fx = generate(args.employers, args.seed)
+    args.out.write_text(json.dumps(fx, ensure_ascii=False), encoding="utf-8")
+    print(f"employers: {len(fx['employers'])}, vacancies: {len(fx['vacancies'])}, sites: {len(fx['sites'])} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Локальные стенд-ины внешних сервисов: HH API, страницы работодателей hh.ru, сайты компаний,
+rusprofile (поиск и карточки) и DaData suggest/party. Отдают фикстуры из bench/fixtures.py
+с настраиваемой задержкой, долей 5xx и 429 (с Retry-After).
+
+Стадии пайплайна переключаются на стенд переменной HTTP_BASE_OVERRIDES (см. http_client.route);
+сайты компаний — это отдельные порты на 127.0.0.1, так что для per-host вежливости они разные хосты.
+
+    python bench/standin.py --employers 40 --latency-ms 30 --rate-429 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import fixtures
+
+Response = Tuple[int, Dict[str, str], bytes]
+Handler = Callable[[str, str, Dict[str, List[str]], bytes], Response]
+
+HTML = "text/html; charset=utf-8"
+JSON = "application/json; charset=utf-8"
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0     # доля ответов 503
+    rate_429: float = 0.0       # доля ответов 429
+    retry_after: int = 1
+
+
+def html(body: str, status: int = 200) -> Response:
+    return status, {"Content-Type": HTML}, body.encode("utf-8")
+
+
+def as_json(obj: Any, status: int = 200) -> Response:
+    return status, {"Content-Type": JSON}, json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+NOT_FOUND: Response = (404, {"Content-Type": HTML}, b"<html><body>Not found</body></html>")
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # клиент закрыл keep-alive соединение — для стенда это норма
+        pass
+
+
+class StandIn:
+    """Один HTTP-сервис на 127.0.0.1: handler(method, path, query, body) + задержки/сбои + счётчики."""
+
+    def __init__(self, name: str, handler: Handler, faults: Faults, seed: int = 0) -> None:
+        self.name = name
+        self.handler = handler
+        self.faults = faults
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.statuses: Counter = Counter()
+        self.bytes_out = 0
+        self.server = QuietServer(("127.0.0.1", 0), self._make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def _decide(self) -> Tuple[float, Optional[int]]:
+        f = self.faults
+        with self.lock:
+            delay = max(0.0, f.latency_ms + self.rng.uniform(-f.jitter_ms, f.jitter_ms)) / 1000
+            r = self.rng.random()
+        if r < f.rate_429:
+            return delay, 429
+        if r < f.rate_429 + f.error_rate:
+            return delay, 503
+        return delay, None
+
+    def _make_handler(self) -> type:
+        stand = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parts = urlsplit(self.path)
+                delay, fault = stand._decide()
+                time.sleep(delay)
+                if fault == 429:
+                    status, headers, data = 429, {"Retry-After": str(stand.faults.retry_after)}, b""
+                elif fault is not None:
+                    status, headers, data = fault, {}, b""
+                else:
+                    status, headers, data = stand.handler(self.command, parts.path, parse_qs(parts.query), body)
+
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+                with stand.lock:
+                    stand.statuses[status] += 1
+                    stand.bytes_out += len(data)
+
+            do_GET = do_POST = do_HEAD = _serve
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return RequestHandler
+
+    def start(self) -> "StandIn":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"requests": sum(self.statuses.values()), "statuses": dict(self.statuses), "bytes": self.bytes_out}
+
+
+class Stand:
+    """Все стенд-ины разом поверх одних фикстур."""
+
+    def __init__(self, fx: Dict[str, Any], faults: Faults) -> None:
+        self.fx = fx
+        self.employers = {e["id"]: e for e in fx["employers"]}
+        self.by_site = {e["site"]: e for e in fx["employers"] if e["site"] is not None}
+        self.by_card = {e["card_id"]: e for e in fx["employers"]}
+        self.vacancies = {v["id"]: v for v in fx["vacancies"]}
+
+        self.sites: List[StandIn] = []
+        for i, _ in enumerate(fx["sites"]):
+            # у сайтов 429 не бывает, только медленные ответы и 5xx
+            site_faults = Faults(faults.latency_ms, faults.jitter_ms, faults.error_rate, 0.0)
+            self.sites.append(StandIn(f"site{i}", self._site_handler(i), site_faults, seed=100 + i))
+
+        self.services: Dict[str, StandIn] = {
+            "hh_api": StandIn("hh_api", self.hh_api, faults, seed=1),
+            "hh_web": StandIn("hh_web", self.hh_web, faults, seed=2),
+            "rusprofile": StandIn("rusprofile", self.rusprofile, faults, seed=3),
+            "dadata": StandIn("dadata", self.dadata, faults, seed=4),
+        }
+
+    # --- адреса ---
+
+    def site_url(self, i: int) -> str:
+        return self.sites[i].base_url + "/"
+
+    def site_domain(self, i: int) -> str:
+        return f"127.0.0.1:{self.sites[i].server.server_port}"
+
+    @property
+    def overrides(self) -> Dict[str, str]:
+        return {
+            "https://api.hh.ru": self.services["hh_api"].base_url,
+            "https://hh.ru": self.services["hh_web"].base_url,
+            "https://www.rusprofile.ru": self.services["rusprofile"].base_url,
+            "https://suggestions.dadata.ru": self.services["dadata"].base_url,
+        }
+
+    def start(self) -> "Stand":
+        for s in [*self.services.values(), *self.sites]:
+            s.start()
+        return self
+
+    def stop(self) -> None:
+        for s in [*self.services.values(), *self.sites]:
+            s.stop()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        out = {name: s.snapshot() for name, s in self.services.items()}
+        sites: Counter = Counter()
+        total = {"requests": 0, "bytes": 0}
+        for s in self.sites:
+            snap = s.snapshot()
+            sites.update(snap["statuses"])
+            total["requests"] += snap["requests"]
+            total["bytes"] += snap["bytes"]
+        out["sites"] = {**total, "statuses": dict(sites)}
+        return out
+
+    # --- HH API ---
+
+    def _hh_item(self, v: Dict[str, Any]) -> Dict[str, Any]:
+        emp = self.employers[v["employer_id"]]
+        return {
+            "id": v["id"],
+            "name": v["name"],
+            "alternate_url": f"https://hh.ru/vacancy/{v['id']}",
+            "published_at": v["published_at"],
+            "employer": {
+                "id": emp["id"],
+                "name": emp["name"],
+                "alternate_url": f"https://hh.ru/employer/{emp['id']}",
+            },
+        }
+
+    def hh_api(self, method: str, path: str, query: Dict[str, List[str]], body: bytes) -> Response:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["vacancies"]:
+            text = (query.get("text") or [""])[0]
+            page = int((query.get("page") or ["0"])[0])
+            per_page = int((query.get("per_page") or ["20"])[0])
+            date_from = (query.get("date_from") or [""])[0]
+            found = [v for v in self.fx["vacancies"] if v["query"] == text and v["published_at"] > date_from]
+            items = found[page * per_page:(page + 1) * per_page]
+            return as_json({
+                "items": [self._hh_item(v) for v in items],
+                "found": len(found),
+                "pages": max(1, math.ceil(len(found) / per_page)),
+                "page": page,
+                "per_page": per_page,
+            })
+        if len(parts) == 2 and parts[0] == "vacancies":
+            v = self.vacancies.get(parts[1])
+            if v is None:
+                return as_json({"errors": [{"type": "not_found"}]}, 404)
+            return as_json({
+                "id": v["id"],
+                "name": v["name"],
+                "employer": {"id": v["employer_id"]},
+                "published_at": v["published_at"],
+                "description": v["description"],
+                "schedule": {"name": "Сменный график"},
+                "employment": {"name": "Полная занятость"},
+                "alternate_url": f"https://hh.ru/vacancy/{v['id']}",
+            })
+        return as_json({"errors": [{"type": "not_found"}]}, 404)
+
+    # --- hh.ru: страница работодателя ---
+
+    def hh_web(self, method: str, path: str, query: Dict[str, List[str]], body: bytes) -> Response:
+        parts = [p for p in path.split("/") if p]
+        emp = self.employers.get(parts[1]) if len(parts) == 2 and parts[0] == "employer" else None
+        if emp is None:
+            return NOT_FOUND
+        site = f'<a href="{self.site_url(emp["site"])}">Сайт</a>' if emp["site"] is not None else ""
+        return html(
+            '<html><head><link href="https://i.hh.ru/css/app.css"></head><body>'
+            f'<h1>{emp["name"]}</h1><a href="https://hh.ru/search/vacancy?employer_id={emp["id"]}">Вакансии</a>'
+            f'<a href="https://vk.com/{emp["slug"]}">VK</a>{site}'
+            f'<p>{fixtures.filler(random.Random(emp["id"]), 300)}</p></body></html>'
+        )
+
+    # --- сайты компаний ---
+
+    def _site_handler(self, i: int) -> Handler:
+        def handler(method: str, path: str, query: Dict[str, List[str]], body: bytes) -> Response:
+            site = self.fx["sites"][i]
+            base = self.site_url(i)
+            if path == "/robots.txt":
+                return 200, {"Content-Type": "text/plain"}, site["robots"].replace("{base}", base).encode()
+            if path == "/sitemap.xml":
+                if not site["sitemap"]:
+                    return NOT_FOUND
+                return 200, {"Content-Type": "application/xml"}, site["sitemap"].replace("{base}", base).encode()
+            page = site["pages"].get(path.rstrip("/") or "/")
+            return html(page) if page is not None else NOT_FOUND
+        return handler
+
+    # --- rusprofile ---
+
+    def _match(self, q: str) -> List[Dict[str, Any]]:
+        # по домену сайта -> ровно эта компания; по названию -> все, у кого бренд есть в запросе
+        q = " ".join(q.split()).lower()
+        for i, emp in self.by_site.items():
+            if q == self.site_domain(i):
+                return [emp]
+        return [e for e in self.fx["employers"] if e["brand"].lower() in q]
+
+    def rusprofile(self, method: str, path: str, query: Dict[str, List[str]], body: bytes) -> Response:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["search"]:
+            found = self._match((query.get("query") or [""])[0])
+            cards = [e["card_id"] for e in found]
+            if found:
+                # в выдаче rusprofile рядом с нужной обычно тёзки/филиалы
+                rng = random.Random(cards[0])
+                cards = [rng.choice(self.fx["employers"])["card_id"], *cards]
+            # как в настоящей выдаче: название, адрес и ИНН видны прямо в списке
+            items = "".join(
+                f'<div class="company-item"><div class="company-item__title">'
+                f'<a href="/id/{c}">{self.by_card[c]["legal_name"]}</a></div>'
+                f'<address class="company-item__text">г. Москва, ул. Тестовая, д. {int(c) % 97}</address>'
+                f'<div class="company-item-info"><dl><dt>ИНН</dt><dd>{self.by_card[c]["inn"]}</dd></dl></div></div>'
+                for c in dict.fromkeys(cards)
+            )
+            return html(f"<html><body><div class='search'>{items}</div></body></html>")
+        if len(parts) == 2 and parts[0] == "id":
+            emp = self.by_card.get(parts[1])
+            if emp is None:
+                return NOT_FOUND
+            site = self.site_domain(emp["site"]) if emp["site"] is not None else ""
+            return html(
+                f"<html><body><h1>{emp['legal_name']}</h1>"
+                f"<p>{fixtures.filler(random.Random(emp['card_id']), 800)}</p>"
+                f"<dl><dt>ИНН</dt><dd>{emp['inn']}</dd><dt>Сайт</dt><dd>{site}</dd></dl></body></html>"
+            )
+        return NOT_FOUND
+
+    # --- DaData ---
+
+    def dadata(self, method: str, path: str, query: Dict[str, List[str]], body: bytes) -> Response:
+        if method != "POST" or not path.endswith("/suggest/party"):
+            return as_json({"message": "not found"}, 404)
+        payload = json.loads(body or b"{}")
+        found = [e for e in self._match(payload.get("query") or "") if e["in_dadata"]]
+        return as_json({"suggestions": [
+            {"value": e["legal_name"], "data": {"inn": e["inn"], "state": {"status": "ACTIVE"}}}
+            for e in found[: int(payload.get("count") or 10)]
+        ]})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=str, default=None, help="JSON из bench/fixtures.py")
+    parser.add_argument("--employers", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fx = fixtures.load(Path(args.fixtures)) if args.fixtures else fixtures.generate(args.employers, args.seed)
+    stand = Stand(fx, Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_429)).start()
+    print("export HTTP_BASE_OVERRIDES='" + json.dumps(stand.overrides) + "'")
+    print(f"sites: {len(stand.sites)} (127.0.0.1:{stand.sites[0].server.server_port}...)" if stand.sites else "sites: 0")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stand.stop()
+
+
+if __name__ == "__main__":
+    main()
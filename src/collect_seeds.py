@@ -1,6 +1,7 @@
-import time
-import random
-from typing import Dict, Any, List
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
 from tqdm import tqdm
 
 import pandas as pd
@@ -8,10 +9,25 @@ import requests
 
 from pathlib import Path
 
+import metrics
+import storage
+from http_client import http_request
+from rate_limit import TokenBucket, parse_retry_after
+
 BASE_DIR = Path(__file__).resolve().parent.parent   # корень проекта (analytics_vacancies)
 DATA_RAW = BASE_DIR / "data" / "raw"
 DATA_RAW.mkdir(parents=True, exist_ok=True)
 
+EMPLOYERS_TABLE = "raw/employers_seeds"
+VACANCIES_TABLE = "raw/vacancies_seeds"
+# водяной знак для инкрементального режима: max(published_at) прошлого прогона
+STATE_PATH = DATA_RAW / "seeds_state.json"
+
+EMPLOYER_COLS = ["employer_id", "employer_name", "employer_url"]
+VACANCY_COLS = ["employer_id", "employer_name", "employer_url",
+                "vacancy_id", "vacancy_name", "vacancy_url", "query"]
+
+HH_DATE_FMT = "%Y-%m-%dT%H:%M:%S%z"
 
 HH_API = 'https://api.hh.ru'
 QUERIES = [
@@ -22,15 +38,15 @@ QUERIES = [
     'customer support'
 ]
 
+# общий лимит на все запросы к HH при параллельной выкачке страниц
+RPS = 5.0
+WORKERS = 8
+MAX_RETRIES_429 = 5
 
-def get_hh(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
-    #говорит hh.ru что мы не робот, а пользователь
-    headers = {
-        "HH-User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-        "User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-    }
 
-    r = requests.get(url, params=params, headers=headers, timeout=30)
+def get_hh(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    # User-Agent / HH-User-Agent (говорят hh.ru, кто мы) и таймауты — в http_client
+    r = http_request("GET", url, source="hh_search", params=params)
     '''
     Если будет ошибка, то заранее выкидываем его
     •	429 → слишком много запросов
@@ -43,7 +59,25 @@ def get_hh(url: str, params: Dict[str, Any]) -> Dict[str, Any]:
     return r.json()
 
 
-def collect_vacancies(query: str, max_page: int = 5, per_page: int = 100) -> List[Dict[str, Any]]:
+def search_params(query: str, page: int, per_page: int, date_from: Optional[str] = None) -> Dict[str, Any]:
+    params = {
+        'text': query,
+        'area': 113, #Россия
+        'per_page': per_page, #максимум вакансий на странице
+        'page': page,
+        'order_by': 'publication_time'
+    }
+    if date_from:
+        params['date_from'] = date_from #только опубликованные начиная с этой даты
+    return params
+
+
+def collect_vacancies(
+    query: str,
+    max_page: int = 5,
+    per_page: int = 100,
+    date_from: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     '''
     Берёт одну фразу поиска (например "техподдержка") и скачивает по ней много вакансий,
     листая страницы, пока не соберёт достаточно или пока вакансии не закончатся.
@@ -52,15 +86,7 @@ def collect_vacancies(query: str, max_page: int = 5, per_page: int = 100) -> Lis
     items = []
 
     for page in range(max_page):
-        data = get_hh(f'{HH_API}/vacancies/',
-                         params={
-                             'text': query,
-                             'area': 113, #Россия
-                             'per_page': per_page, #максимум вакансий на странице
-                             'page': page,
-                             'order_by': 'publication_time'
-                         }
-                         )
+        data = get_hh(f'{HH_API}/vacancies/', params=search_params(query, page, per_page, date_from))
 
         page_items = data.get('items', [])
 
@@ -69,48 +95,218 @@ def collect_vacancies(query: str, max_page: int = 5, per_page: int = 100) -> Lis
 
         items.extend(page_items)
 
-        time.sleep(0.4 + random.random() * 0.4) #делаем паузу, чтобы не выглядеть как бот
+        # HH сам говорит, сколько всего страниц — не тратим запрос на пустую
+        if data.get('pages') is not None and page + 1 >= int(data['pages']):
+            break
+
 
     return items
 
 
-def main() -> None:
+def get_hh_limited(url: str, params: Dict[str, Any], bucket: TokenBucket) -> Dict[str, Any]:
+    # то же, что get_hh, но через общий bucket и с ожиданием по Retry-After на 429
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            return get_hh(url, params)
+        except requests.HTTPError as e:
+            if getattr(e.response, 'status_code', None) != 429 or attempt >= MAX_RETRIES_429:
+                raise
+            attempt += 1
+            bucket.pause(parse_retry_after(e.response.headers.get('Retry-After'), default=2.0 * attempt))
+
+
+def collect_vacancies_parallel(
+    queries: List[str],
+    max_page: int = 5,
+    per_page: int = 100,
+    rps: float = RPS,
+    workers: int = WORKERS,
+    date_from: Optional[str] = None,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Set[str]]:
+    '''
+    Режим "веером": сначала page=0 по всем запросам, из ответа берём реальное число страниц (pages),
+    затем оставшиеся страницы всех запросов качаем параллельно под одним лимитом rps.
+    Возвращает ({query: items} в порядке страниц, запросы, где найдено больше max_page*per_page):
+    у таких самые старые вакансии остались за пределами выдачи.
+    '''
+    bucket = TokenBucket(rps, burst=workers)
+    url = f'{HH_API}/vacancies/'
+
+    def fetch(task: Tuple[str, int]) -> Tuple[str, int, Dict[str, Any]]:
+        query, page = task
+        return query, page, get_hh_limited(url, search_params(query, page, per_page, date_from), bucket)
+
+    pages: Dict[str, Dict[int, List[Dict[str, Any]]]] = {q: {} for q in queries}
+    truncated: Set[str] = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        first = list(tqdm(pool.map(fetch, [(q, 0) for q in queries]), total=len(queries), desc='Queries (page 0)'))
+
+        rest: List[Tuple[str, int]] = []
+        for query, _, data in first:
+            pages[query][0] = data.get('items', [])
+            if not pages[query][0]:
+                continue
+            if int(data.get('found') or 0) > max_page * per_page:
+                truncated.add(query)
+            total_pages = min(max_page, int(data.get('pages', max_page)))
+            rest.extend((query, p) for p in range(1, total_pages))
+
+        for query, page, data in tqdm(pool.map(fetch, rest), total=len(rest), desc='Pages'):
+            pages[query][page] = data.get('items', [])
+
+    by_query = {
+        q: [v for p in sorted(by_page) for v in by_page[p]]
+        for q, by_page in pages.items()
+    }
+    return by_query, truncated
+
+
+class SeedWriter:
+    '''
+    Пишет сиды через storage.TableWriter: новые строки копятся до flush и уходят куском
+    в конец таблицы, таблица подменяется один раз на close.
+    Работодатели дедуплицируются через seen-set, вакансии — по (vacancy_id, query).
+    При append=True уже сохранённые таблицы переписываются первым куском, иначе начинаются заново.
+    '''
+
+    def __init__(self, append: bool = False) -> None:
+        self.new_employers = 0
+        self.new_vacancies = 0
+        self.seen_employers: Set[str] = set()
+        self.seen_vacancies: Set[Tuple[str, str]] = set()
+        self._employers: List[Dict[str, Any]] = []
+        self._vacancies: List[Dict[str, Any]] = []
+        self._employers_out = storage.TableWriter(EMPLOYERS_TABLE)
+        self._vacancies_out = storage.TableWriter(VACANCIES_TABLE)
+
+        if append:
+            old = self._read(EMPLOYERS_TABLE, EMPLOYER_COLS)
+            self.seen_employers = set(old["employer_id"])
+            self._employers_out.write(old)
+            old = self._read(VACANCIES_TABLE, VACANCY_COLS)
+            self.seen_vacancies = set(zip(old["vacancy_id"], old["query"]))
+            self._vacancies_out.write(old)
+
+    @staticmethod
+    def _read(name: str, cols: List[str]) -> pd.DataFrame:
+        if not storage.exists(name):
+            return pd.DataFrame(columns=cols)
+        return storage.read_table(name, columns=cols)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        employer_id = row.get("employer_id")
+        if not employer_id:
+            return
+
+        key = (str(row.get("vacancy_id")), str(row.get("query")))
+        if key not in self.seen_vacancies:
+            self.seen_vacancies.add(key)
+            self._vacancies.append({c: row.get(c) for c in VACANCY_COLS})
+            self.new_vacancies += 1
+
+        if employer_id not in self.seen_employers:
+            self.seen_employers.add(employer_id)
+            self._employers.append({c: row.get(c) for c in EMPLOYER_COLS})
+            self.new_employers += 1
+
+    def flush(self) -> None:
+        self._employers_out.write(pd.DataFrame(self._employers, columns=EMPLOYER_COLS))
+        self._vacancies_out.write(pd.DataFrame(self._vacancies, columns=VACANCY_COLS))
+        self._employers, self._vacancies = [], []
+
+    def close(self) -> None:
+        self.flush()
+        self._employers_out.close()
+        self._vacancies_out.close()
+
+    def discard(self) -> None:
+        # упали посередине — прежние таблицы сидов остаются как были
+        self._employers_out.discard()
+        self._vacancies_out.discard()
+
+
+def load_watermark() -> Optional[str]:
+    if not STATE_PATH.exists():
+        return None
+    return json.loads(STATE_PATH.read_text(encoding="utf-8")).get("published_at_max")
+
+
+def save_watermark(published_at_max: str) -> None:
+    STATE_PATH.write_text(json.dumps({"published_at_max": published_at_max}), encoding="utf-8")
+
+
+def max_published_at(values: List[Optional[str]]) -> Optional[str]:
+    # сравниваем как даты, а не строки: у HH разные смещения часового пояса
+    best, best_dt = None, None
+    for value in values:
+        if not value:
+            continue
+        try:
+            dt = datetime.strptime(value, HH_DATE_FMT)
+        except ValueError:
+            continue
+        if best_dt is None or dt > best_dt:
+            best, best_dt = value, dt
+    return best
+
+
+def main(incremental: bool = False) -> None:
     import os
     print("CWD:", os.getcwd())
-    rows = []
 
-    for query in tqdm(QUERIES, desc='Queries'):
-        vacancies = collect_vacancies(query, max_page=5, per_page=100)
-        for v in vacancies:
-            emp = v.get("employer") or {}
-            if not emp:
-                continue
+    # инкрементально: берём только вакансии, опубликованные после прошлого прогона
+    date_from = load_watermark() if incremental else None
+    if incremental:
+        print("date_from:", date_from or "(нет водяного знака, полный сбор)")
 
-            rows.append({
-                "employer_id": emp.get("id"),
-                "employer_name": emp.get("name"),
-                "employer_url": emp.get("alternate_url"),
-                "vacancy_id": v.get("id"),
-                "vacancy_name": v.get("name"),
-                "vacancy_url": v.get("alternate_url"),
-                "query": query,
-            })
+    by_query, truncated = collect_vacancies_parallel(QUERIES, max_page=5, per_page=100, date_from=date_from)
 
-        df = pd.DataFrame(rows).dropna(subset=["employer_id"])
-        # уникальные работодатели
-        employers = (
-            df[["employer_id", "employer_name", "employer_url"]]
-            .drop_duplicates(subset=["employer_id"])
-            .sort_values("employer_name")
-            .reset_index(drop=True)
-        )
+    writer = SeedWriter(append=incremental)
+    published: List[Optional[str]] = [date_from]
+    try:
+        for query in QUERIES:
+            vacancies = by_query[query]
+            for v in vacancies:
+                emp = v.get("employer") or {}
+                if not emp:
+                    continue
 
-        employers.to_csv(DATA_RAW / "employers_seeds.csv", index=False, encoding="utf-8")
-        df.to_csv(DATA_RAW / "vacancies_seeds.csv", index=False, encoding="utf-8")
+                published.append(v.get("published_at"))
+                writer.add({
+                    "employer_id": emp.get("id"),
+                    "employer_name": emp.get("name"),
+                    "employer_url": emp.get("alternate_url"),
+                    "vacancy_id": v.get("id"),
+                    "vacancy_name": v.get("name"),
+                    "vacancy_url": v.get("alternate_url"),
+                    "query": query,
+                })
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
 
-        print(f"Saved employers: {len(employers)} -> {DATA_RAW / 'employers_seeds.csv'}")
-        print(f"Saved vacancies:  {len(df)} -> {DATA_RAW / 'vacancies_seeds.csv'}")
+    # выдача — от новых к старым и обрезана max_page*per_page: если где-то прочитали не всё,
+    # старые вакансии окна не скачаны, и сдвинутый знак пропустил бы их навсегда
+    if truncated:
+        print("Водяной знак не сдвинут: выдача обрезана по запросам", ", ".join(sorted(truncated)))
+    else:
+        watermark = max_published_at(published)
+        if watermark:
+            save_watermark(watermark)
+
+    print(f"Saved employers: +{writer.new_employers} (total {len(writer.seen_employers)}) -> {storage.table_path(EMPLOYERS_TABLE)}")
+    print(f"Saved vacancies: +{writer.new_vacancies} (total {len(writer.seen_vacancies)}) -> {storage.table_path(VACANCIES_TABLE)}")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--incremental', action='store_true',
+                        help='докачать только новые вакансии (HH date_from по водяному знаку)')
+    # argv разбираем внутри run_stage: он сперва снимает --profile
+    metrics.run_stage('collect_seeds', lambda: main(incremental=parser.parse_args().incremental))
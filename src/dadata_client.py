@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tqdm import tqdm
+
+from http_cache import CACHE_DIR, TTLS
+from http_client import http_request
+from rate_limit import TokenBucket, parse_retry_after
+
+SUGGEST_PARTY_URL = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/suggest/party"
+
+MEMO_PATH = CACHE_DIR / "dadata.sqlite"
+
+# найденное живёт как ответы DaData в HTTP-кэше; "ничего не нашли" — меньше:
+# компанию могли зарегистрировать или переименовать
+FOUND_TTL = TTLS["dadata"]
+NEGATIVE_TTL = 7 * 24 * 3600
+
+# лимит тарифа DaData на suggestions — с запасом
+RPS = 10.0
+WORKERS = 10
+MAX_RETRIES_429 = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggest_party (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    suggestions TEXT NOT NULL,
+    found INTEGER NOT NULL,
+    stored_at REAL NOT NULL
+);
+"""
+
+Suggestions = List[Dict[str, Any]]
+
+
+def normalize_query(query: str) -> str:
+    # "ООО  Ромашка " и "ооо ромашка" — один и тот же запрос к DaData
+    return " ".join((query or "").split()).casefold()
+
+
+def memo_key(query: str, count: int, status: Optional[Sequence[str]]) -> str:
+    return json.dumps([normalize_query(query), count, sorted(status or [])], ensure_ascii=False)
+
+
+class DadataClient:
+    """
+    suggest/party с мемоизацией: одинаковые (после нормализации) запросы ходят в DaData
+    один раз за прогон и не ходят повторно между прогонами, пока не истёк TTL.
+    Пустые ответы тоже запоминаются (с NEGATIVE_TTL), ошибки — нет.
+    """
+
+    def __init__(self, token: str, rps: float = RPS, workers: int = WORKERS, path: Path = MEMO_PATH) -> None:
+        self.headers = {"Authorization": f"Token {token}"}
+        self.workers = workers
+        self.bucket = TokenBucket(rps, burst=workers)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._memo: Dict[str, Suggestions] = {}
+        self.stats = {"memo": 0, "negative": 0, "requests": 0, "errors": 0}
+
+    def _load(self, key: str) -> Optional[Suggestions]:
+        with self._lock:
+            if key in self._memo:
+                self.stats["memo"] += 1
+                return self._memo[key]
+            row = self._conn.execute(
+                "SELECT suggestions, found, stored_at FROM suggest_party WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        suggestions, found, stored_at = row
+        if time.time() - stored_at >= (FOUND_TTL if found else NEGATIVE_TTL):
+            return None
+        sugs = json.loads(suggestions)
+        with self._lock:
+            self._memo[key] = sugs
+            self.stats["memo" if found else "negative"] += 1
+        return sugs
+
+    def _store(self, key: str, query: str, sugs: Suggestions) -> None:
+        with self._lock:
+            self._memo[key] = sugs
+            self._conn.execute(
+                "INSERT OR REPLACE INTO suggest_party (key, query, suggestions, found, stored_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, query, json.dumps(sugs, ensure_ascii=False), int(bool(sugs)), time.time()),
+            )
+
+    def _fetch(self, query: str, count: int, status: Optional[Sequence[str]]) -> Suggestions:
+        payload: Dict[str, Any] = {"query": query, "count": count}
+        if status:
+            payload["status"] = list(status)
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            r = http_request("POST", SUGGEST_PARTY_URL, source="dadata", cache=False, json=payload, headers=self.headers)
+            with self._lock:
+                self.stats["requests"] += 1
+            if r.status_code == 429 and attempt < MAX_RETRIES_429:
+                attempt += 1
+                self.bucket.pause(parse_retry_after(r.headers.get("Retry-After"), default=2.0 * attempt))
+                continue
+            r.raise_for_status()
+            return (r.json() or {}).get("suggestions", []) or []
+
+    def suggest_party(self, query: str, count: int = 5, status: Optional[Sequence[str]] = None) -> Suggestions:
+        query = " ".join((query or "").split())
+        if not query:
+            return []
+        key = memo_key(query, count, status)
+        sugs = self._load(key)
+        if sugs is None:
+            sugs = self._fetch(query, count, status)
+            self._store(key, query, sugs)
+        return sugs
+
+    def suggest_many(
+        self,
+        queries: Sequence[str],
+        count: int = 5,
+        status: Optional[Sequence[str]] = None,
+        desc: str = "DaData",
+    ) -> Dict[str, Optional[Suggestions]]:
+        """
+        Параллельно (в пределах RPS) по уникальным запросам.
+        query -> suggestions, или None, если запрос упал (в memo не попадает).
+        """
+        unique: Dict[str, str] = {}
+        for q in queries:
+            if normalize_query(q):
+                unique.setdefault(memo_key(q, count, status), q)
+
+        def one(q: str) -> Optional[Suggestions]:
+            try:
+                return self.suggest_party(q, count=count, status=status)
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                print("Failed:", q, repr(e))
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(tqdm(pool.map(one, unique.values()), total=len(unique), desc=desc))
+        by_key = dict(zip(unique, results))
+        return {q: by_key[memo_key(q, count, status)] for q in queries if normalize_query(q)}
+
+    def resolve_cascade(
+        self,
+        cascades: Sequence[Sequence[str]],
+        pick: Callable[[Suggestions], str],
+        count: int = 5,
+        status: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """
+        Для каждой строки — список запросов по убыванию силы (домен, имя, очищенное имя...).
+        Шаг k отправляет k-й запрос только тех строк, что ещё не нашлись; внутри шага — параллельно.
+        Возвращает найденное pick(...) значение по строкам ("" — не нашли).
+        """
+        found = [""] * len(cascades)
+        depth = max((len(c) for c in cascades), default=0)
+        for step in range(depth):
+            todo: List[Tuple[int, str]] = [
+                (i, c[step]) for i, c in enumerate(cascades)
+                if not found[i] and step < len(c) and normalize_query(c[step])
+            ]
+            if not todo:
+                continue
+            results = self.suggest_many([q for _, q in todo], count=count, status=status, desc=f"DaData step {step + 1}")
+            for i, q in todo:
+                sugs = results.get(q)
+                if sugs:
+                    found[i] = pick(sugs)
+        return found
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
+import argparse
 import re
-import time
-import random
 from pathlib import Path
 from typing import Optional
 
-import pandas as pd
-import requests
+import metrics
+import storage
+from http_client import http_request
+from journal import Journal
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -15,17 +16,11 @@ DATA_RAW = BASE_DIR / "data" / "raw"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 DATA_RAW.mkdir(parents=True, exist_ok=True)
 
-CONTACT_EMAIL = "ojdupool2004@mail.ru"
-
 # простой regex для поиска внешних ссылок (не hh.ru)
 URL_RE = re.compile(r'https?://[^\s"\']+')
 
 def get_html(url: str) -> str:
-    headers = {
-        "User-Agent": f"LeadSniperTest/1.0 (contact: {CONTACT_EMAIL})",
-        "Accept": "text/html,application/xhtml+xml",
-    }
-    r = requests.get(url, headers=headers, timeout=30)
+    r = http_request("GET", url, source="hh_employer")
     r.raise_for_status()
     return r.text
 
@@ -57,11 +52,19 @@ def pick_company_site(html: str) -> Optional[str]:
     return uniq[0] if uniq else None
 
 def main() -> None:
-    inp = DATA_DIR / "companies_stage1.csv"
-    out = DATA_DIR / "companies_stage2.csv"
+    inp = "companies_stage1"
+    out = "companies_stage2"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fresh", action="store_true", help="не продолжать с журнала прошлого прогона")
+    args = parser.parse_args()
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    df = storage.read_table(inp)
+    journal = Journal("enrich_company_site_from_hh", [Path(__file__)], resume=not args.fresh)
+    if journal.resumed:
+        print(f"Resumed: {journal.resumed} employers from {journal.path}")
 
+    # по работодателю: готовое берём из журнала, новое пишем в журнал сразу
     sites = []
     for _, r in df.iterrows():
         hh_url = r.get("source_hh_employer_url", "").strip()
@@ -69,20 +72,27 @@ def main() -> None:
             sites.append("")
             continue
 
+        key = r.get("employer_id") or hh_url
+        done = journal.get(key, [hh_url])
+        if done is not None:
+            sites.append(done["site"])
+            continue
+
         try:
             html = get_html(hh_url)
             site = pick_company_site(html) or ""
+            journal.write(key, {"site": site}, [hh_url])
             sites.append(site)
-            time.sleep(0.6 + random.random() * 0.4)
         except Exception as e:
+            # ошибки в журнал не пишем: при resume этого работодателя попробуем снова
             print("Failed:", hh_url, repr(e))
             sites.append("")
-            time.sleep(0.8)
 
     df["site"] = sites
-    df.to_csv(out, index=False, encoding="utf-8")
-    print(f"Saved: {len(df)} rows -> {out}")
+    out_path = storage.write_table(df, out)
+    journal.finish()
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("Sites filled:", int((df["site"] != "").sum()))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_company_site_from_hh", main)
\ No newline at end of file
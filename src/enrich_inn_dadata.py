@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 import os
-import time
-import random
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+import metrics
+import storage
+from dadata_client import DadataClient
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,59 +20,43 @@ DADATA_TOKEN = os.getenv("DADATA_TOKEN", "").strip()
 if not DADATA_TOKEN:
     raise RuntimeError("Нет DADATA_TOKEN в .env")
 
-HEADERS = {
-    "Authorization": f"Token {DADATA_TOKEN}",
-    "Content-Type": "application/json",
-    "Accept": "application/json",
-    "User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-}
+# мемоизация, негативный кэш и параллельность (в пределах RPS) — в dadata_client
+DADATA = DadataClient(DADATA_TOKEN)
+
+STATUS = ["ACTIVE"]  # активные
 
 def dadata_suggest_party(name: str) -> Optional[Dict[str, Any]]:
-    url = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/suggest/party"
-    payload = {
-        "query": name,
-        "count": 5,
-        "status": ["ACTIVE"],  # активные
-    }
-    r = requests.post(url, json=payload, headers=HEADERS, timeout=25)
-    r.raise_for_status()
-    data = r.json()
-    suggestions = data.get("suggestions", [])
+    suggestions = DADATA.suggest_party(name, count=5, status=STATUS)
     return suggestions[0] if suggestions else None
 
+def first_inn(suggestions: List[Dict[str, Any]]) -> str:
+    return (suggestions[0].get("data") or {}).get("inn", "") or ""
+
 def main() -> None:
-    inp = DATA_DIR / "companies_stage4_v2.csv"
-    out = DATA_DIR / "companies_stage5.csv"
+    inp = "companies_stage4_v2"
+    out = "companies_stage5"
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    df = storage.read_table(inp)
 
     filled_before = int((df["inn"].astype(str) != "").sum())
 
-    for i, r in df.iterrows():
-        if (r.get("inn") or "").strip():
-            continue
-
-        name = (r.get("name") or "").strip()
-        if not name:
-            continue
-
-        try:
-            sug = dadata_suggest_party(name)
-            if sug:
-                inn = (sug.get("data") or {}).get("inn", "") or ""
-                if inn:
-                    df.at[i, "inn"] = inn
-                    df.at[i, "inn_source"] = "dadata"
-        except Exception as e:
-            print("Failed:", name, repr(e))
-
-        time.sleep(0.4 + random.random() * 0.3)
-
-    df.to_csv(out, index=False, encoding="utf-8")
+    todo = [
+        i for i, r in df.iterrows()
+        if not (r.get("inn") or "").strip() and (r.get("name") or "").strip()
+    ]
+    cascades = [[df.at[i, "name"].strip()] for i in todo]
+    inns = DADATA.resolve_cascade(cascades, pick=first_inn, count=5, status=STATUS)
+    for i, inn in zip(todo, inns):
+        if inn:
+            df.at[i, "inn"] = inn
+            df.at[i, "inn_source"] = "dadata"
+
+    out_path = storage.write_table(df, out)
     filled_after = int((df["inn"].astype(str) != "").sum())
-    print(f"Saved: {len(df)} rows -> {out}")
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("INN filled before:", filled_before)
     print("INN filled after: ", filled_after)
+    print("DaData:", DADATA.stats)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_inn_dadata", main)
\ No newline at end of file
@@ -2,16 +2,16 @@ from __future__ import annotations
 
 import os
 import re
-import time
-import random
 from pathlib import Path
 from typing import Any, Dict, List
 from urllib.parse import urlparse
 
-import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+import metrics
+import storage
+from dadata_client import DadataClient
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -22,12 +22,8 @@ DADATA_TOKEN = os.getenv("DADATA_TOKEN", "").strip()
 if not DADATA_TOKEN:
     raise RuntimeError("Нет DADATA_TOKEN в .env")
 
-HEADERS = {
-    "Authorization": f"Token {DADATA_TOKEN}",
-    "Content-Type": "application/json",
-    "Accept": "application/json",
-    "User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-}
+# мемоизация, негативный кэш и параллельность (в пределах RPS) — в dadata_client
+DADATA = DadataClient(DADATA_TOKEN)
 
 LEGAL_TRASH = re.compile(r'["«»]|(\b(ООО|АО|ПАО|ЗАО|ОАО|ИП|ГБУЗ|ГУП|МУП|НКО)\b)|[,\.]', re.IGNORECASE)
 
@@ -49,11 +45,7 @@ def domain_from_site(site: str) -> str:
         return ""
 
 def dadata_suggest_party(query: str, count: int = 5) -> List[Dict[str, Any]]:
-    url = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/suggest/party"
-    payload = {"query": query, "count": count}
-    r = requests.post(url, json=payload, headers=HEADERS, timeout=25)
-    r.raise_for_status()
-    return (r.json() or {}).get("suggestions", []) or []
+    return DADATA.suggest_party(query, count=count)
 
 def pick_inn(sugs: List[Dict[str, Any]]) -> str:
     for s in sugs:
@@ -63,12 +55,18 @@ def pick_inn(sugs: List[Dict[str, Any]]) -> str:
     return ""
 
 def main() -> None:
-    inp = DATA_DIR / "companies_stage1.csv"
-    out = DATA_DIR / "companies_stage6_dadata_domain.csv"
-
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    inp = "companies_stage1"
+    out = "companies_stage6_dadata_domain"
+
+    df = storage.read_table(inp)
+    # в companies_stage1 ИНН ещё нет — колонки появляются здесь
+    for col in ("inn", "inn_source"):
+        if col not in df.columns:
+            df[col] = ""
     before = int((df["inn"].astype(str) != "").sum())
 
+    todo: List[int] = []
+    cascades: List[List[str]] = []
     for i, r in df.iterrows():
         if (r.get("inn") or "").strip():
             continue
@@ -76,41 +74,34 @@ def main() -> None:
         name = (r.get("name") or "").strip()
         site = (r.get("site") or "").strip()
         dom = domain_from_site(site)
+        cn = clean_name(name)
+
+        queries = []
+        # 1) домен (самый сильный запрос)
+        if dom:
+            queries.append(dom)
+        # 2) сырое имя
+        if name:
+            queries.append(name)
+        # 3) очищенное имя
+        if cn and cn != name:
+            queries.append(cn)
+        todo.append(i)
+        cascades.append(queries)
+
+    # шаг за шагом: следующий запрос только для тех, кого ещё не нашли
+    inns = DADATA.resolve_cascade(cascades, pick=pick_inn, count=8)
+    for i, inn in zip(todo, inns):
+        if inn:
+            df.at[i, "inn"] = inn
+            df.at[i, "inn_source"] = "dadata"
 
-        try:
-            inn = ""
-
-            # 1) домен (самый сильный запрос)
-            if dom:
-                sugs = dadata_suggest_party(dom, count=8)
-                inn = pick_inn(sugs)
-
-            # 2) сырое имя
-            if not inn and name:
-                sugs = dadata_suggest_party(name, count=8)
-                inn = pick_inn(sugs)
-
-            # 3) очищенное имя
-            if not inn:
-                cn = clean_name(name)
-                if cn and cn != name:
-                    sugs = dadata_suggest_party(cn, count=8)
-                    inn = pick_inn(sugs)
-
-            if inn:
-                df.at[i, "inn"] = inn
-                df.at[i, "inn_source"] = "dadata"
-
-        except Exception as e:
-            print("Failed:", name, dom, repr(e))
-
-        time.sleep(0.4 + random.random() * 0.3)
-
-    df.to_csv(out, index=False, encoding="utf-8")
+    out_path = storage.write_table(df, out)
     after = int((df["inn"].astype(str) != "").sum())
-    print(f"Saved: {len(df)} rows -> {out}")
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("INN filled before:", before)
     print("INN filled after: ", after)
+    print("DaData:", DADATA.stats)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_inn_dadata_domain", main)
\ No newline at end of file
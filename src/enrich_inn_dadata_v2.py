@@ -2,15 +2,15 @@ from __future__ import annotations
 
 import os
 import re
-import time
-import random
 from pathlib import Path
 from typing import Any, Dict, Optional, List
 
-import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+import metrics
+import storage
+from dadata_client import DadataClient
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,12 +21,8 @@ DADATA_TOKEN = os.getenv("DADATA_TOKEN", "").strip()
 if not DADATA_TOKEN:
     raise RuntimeError("Нет DADATA_TOKEN в .env")
 
-HEADERS = {
-    "Authorization": f"Token {DADATA_TOKEN}",
-    "Content-Type": "application/json",
-    "Accept": "application/json",
-    "User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-}
+# мемоизация, негативный кэш и параллельность (в пределах RPS) — в dadata_client
+DADATA = DadataClient(DADATA_TOKEN)
 
 LEGAL_TRASH = re.compile(
     r'["«»]|(\b(ООО|АО|ПАО|ЗАО|ОАО|ИП|ГБУЗ|ГУП|МУП|НКО)\b)|[,\.]',
@@ -40,15 +36,8 @@ def clean_name(name: str) -> str:
     return name
 
 def dadata_suggest_party(query: str, count: int = 5) -> List[Dict[str, Any]]:
-    url = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/suggest/party"
-    payload = {
-        "query": query,
-        "count": count,
-        # специально НЕ ставим status=["ACTIVE"], чтобы не потерять совпадения
-    }
-    r = requests.post(url, json=payload, headers=HEADERS, timeout=25)
-    r.raise_for_status()
-    return (r.json() or {}).get("suggestions", []) or []
+    # специально НЕ ставим status=["ACTIVE"], чтобы не потерять совпадения
+    return DADATA.suggest_party(query, count=count)
 
 def pick_inn_from_suggestions(sugs: List[Dict[str, Any]]) -> str:
     # берём первый, где inn есть
@@ -60,46 +49,38 @@ def pick_inn_from_suggestions(sugs: List[Dict[str, Any]]) -> str:
     return ""
 
 def main() -> None:
-    inp = DATA_DIR / "companies_stage4_v2.csv"
-    out = DATA_DIR / "companies_stage5_v2.csv"
+    inp = "companies_stage4_v2"
+    out = "companies_stage5_v2"
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    df = storage.read_table(inp)
 
     filled_before = int((df["inn"].astype(str) != "").sum())
 
+    todo: List[int] = []
+    cascades: List[List[str]] = []
     for i, r in df.iterrows():
         if (r.get("inn") or "").strip():
             continue
 
         raw_name = (r.get("name") or "").strip()
-        site = (r.get("site") or "").strip()
         q1 = raw_name
         q2 = clean_name(raw_name)
+        # если по сырому имени не нашли — попробуем очищенное
+        todo.append(i)
+        cascades.append([q1] + ([q2] if q2 and q2 != q1 else []))
 
-        try:
-            sugs = dadata_suggest_party(q1, count=5)
-            inn = pick_inn_from_suggestions(sugs)
-
-            # если не нашли — попробуем очищенное имя
-            if not inn and q2 and q2 != q1:
-                time.sleep(0.35 + random.random() * 0.25)
-                sugs = dadata_suggest_party(q2, count=5)
-                inn = pick_inn_from_suggestions(sugs)
-
-            if inn:
-                df.at[i, "inn"] = inn
-                df.at[i, "inn_source"] = "dadata"
-
-        except Exception as e:
-            print("Failed:", raw_name, site, repr(e))
-
-        time.sleep(0.4 + random.random() * 0.3)
+    inns = DADATA.resolve_cascade(cascades, pick=pick_inn_from_suggestions, count=5)
+    for i, inn in zip(todo, inns):
+        if inn:
+            df.at[i, "inn"] = inn
+            df.at[i, "inn_source"] = "dadata"
 
-    df.to_csv(out, index=False, encoding="utf-8")
+    out_path = storage.write_table(df, out)
     filled_after = int((df["inn"].astype(str) != "").sum())
-    print(f"Saved: {len(df)} rows -> {out}")
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("INN filled before:", filled_before)
     print("INN filled after: ", filled_after)
+    print("DaData:", DADATA.stats)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_inn_dadata_v2", main)
\ No newline at end of file
@@ -1,25 +1,21 @@
 from __future__ import annotations
 
+import argparse
 import re
-import time
-import random
 from pathlib import Path
 from typing import Optional
 from urllib.parse import quote_plus, urlparse
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import html_doc
+import metrics
+import storage
+from http_client import http_request
+from journal import Journal
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-HEADERS = {
-    "User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-    "Accept": "text/html,application/xhtml+xml",
-}
-
 INN_RE = re.compile(r"\bИНН\b\D{0,40}(\d{10}|\d{12})")
 URL_RE = re.compile(r"^https?://")
 
@@ -36,7 +32,7 @@ def domain_from_site(site: str) -> str:
         return ""
 
 def http_get(url: str) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=25, allow_redirects=True)
+    r = http_request("GET", url, source="rusprofile", allow_redirects=True)
     r.raise_for_status()
     return r.text
 
@@ -47,12 +43,10 @@ def rusprofile_search(query: str) -> Optional[str]:
     """
     q = quote_plus(query)
     url = f"https://www.rusprofile.ru/search?query={q}"
-    html = http_get(url)
-    soup = BeautifulSoup(html, "lxml")
+    doc = html_doc.parse(http_get(url))
 
     # Ищем первую ссылку, похожую на карточку компании
-    for a in soup.select('a[href]'):
-        href = a.get("href", "")
+    for href in doc.links:
         if not href:
             continue
         # типичные пути карточек
@@ -64,18 +58,25 @@ def rusprofile_search(query: str) -> Optional[str]:
     return None
 
 def rusprofile_extract_inn(company_url: str) -> Optional[str]:
-    html = http_get(company_url)
+    text = html_doc.parse(http_get(company_url)).text
     # Быстрый regex по всему тексту страницы
-    m = INN_RE.search(html)
+    m = INN_RE.search(text)
     if m:
         return m.group(1)
     return None
 
 def main() -> None:
-    inp = DATA_DIR / "companies_stage2.csv"
-    out = DATA_DIR / "companies_stage4.csv"
+    inp = "companies_stage2"
+    out = "companies_stage4"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fresh", action="store_true", help="не продолжать с журнала прошлого прогона")
+    args = parser.parse_args()
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    df = storage.read_table(inp)
+    journal = Journal("enrich_inn_rusprofile", [Path(__file__), Path(html_doc.__file__)], resume=not args.fresh)
+    if journal.resumed:
+        print(f"Resumed: {journal.resumed} employers from {journal.path}")
 
     inns = []
     sources = []
@@ -90,6 +91,13 @@ def main() -> None:
             sources.append(r.get("source", ""))
             continue
 
+        key = r.get("employer_id") or name
+        done = journal.get(key, [name, site])
+        if done is not None:
+            inns.append(done["inn"])
+            sources.append("rusprofile" if done["inn"] else "")
+            continue
+
         # 1) пробуем по домену (точнее)
         dom = domain_from_site(site)
         card_url = None
@@ -98,18 +106,17 @@ def main() -> None:
         try:
             if dom:
                 card_url = rusprofile_search(dom)
-                time.sleep(0.8 + random.random() * 0.6)
 
             # 2) если не нашли — по названию
             if not card_url and name:
                 card_url = rusprofile_search(name)
-                time.sleep(0.8 + random.random() * 0.6)
 
             if card_url:
                 found_inn = rusprofile_extract_inn(card_url)
-                time.sleep(0.8 + random.random() * 0.6)
 
+            journal.write(key, {"inn": found_inn or ""}, [name, site])
         except Exception as e:
+            # ошибки в журнал не пишем: при resume этого работодателя попробуем снова
             print("Failed:", name, dom, repr(e))
 
         inns.append(found_inn or "")
@@ -119,9 +126,10 @@ def main() -> None:
     # можно хранить, откуда ИНН
     df["inn_source"] = sources
 
-    df.to_csv(out, index=False, encoding="utf-8")
-    print(f"Saved: {len(df)} rows -> {out}")
+    out_path = storage.write_table(df, out)
+    journal.finish()
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("INN filled:", int((df["inn"].astype(str) != "").sum()))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_inn_rusprofile", main)
\ No newline at end of file
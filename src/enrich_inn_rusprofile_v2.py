@@ -1,27 +1,57 @@
 from __future__ import annotations
 
+import argparse
 import re
-import time
-import random
+from dataclasses import dataclass
+from difflib import SequenceMatcher
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 from urllib.parse import quote_plus, urlparse
 
-import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+
+import html_doc
+import metrics
+import storage
+from html_doc import Document
+from http_client import http_request
+from journal import Journal
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-HEADERS = {
-    "User-Agent": "LeadSniperTest/1.0 (contact: ojdupool2004@mail.ru)",
-    "Accept": "text/html,application/xhtml+xml",
-}
-
 INN_RE = re.compile(r"\bИНН\b\D{0,40}(\d{10}|\d{12})")
 URL_RE = re.compile(r"^https?://")
+CARD_ID_RE = re.compile(r"^/id/(\d+)")
+LEGAL_TRASH = re.compile(r'["«»]|(\b(ООО|АО|ПАО|ЗАО|ОАО|ИП|ГБУЗ|ГУП|МУП|НКО)\b)|[,\.]', re.IGNORECASE)
+
+RUSPROFILE = "https://www.rusprofile.ru"
+# сколько карточек из верха ранжированной выдачи готовы скачать на один запрос
+TOP_CARDS = 2
+# выдача по домену + почти то же название: карточку для проверки домена не качаем
+ACCEPT_SCORE = 0.85
+
+TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+})
+
+@dataclass
+class Candidate:
+    """Компания из выдачи поиска rusprofile: то, что видно без захода в карточку."""
+    key: str
+    url: str
+    name: str = ""
+    inn: str = ""
+    address: str = ""
+    score: float = 0.0
+
+# карточки, уже скачанные и разобранные в этом прогоне (ключ — /id/<n>): общие для разных компаний
+CARDS: Dict[str, Document] = {}
+STATS = {"searches": 0, "cards": 0, "card_memo": 0, "from_search": 0}
 
 def domain_from_site(site: str) -> str:
     site = (site or "").strip()
@@ -34,29 +64,110 @@ def domain_from_site(site: str) -> str:
     except Exception:
         return ""
 
+def clean_name(name: str) -> str:
+    name = LEGAL_TRASH.sub(" ", name or "")
+    return re.sub(r"\s+", " ", name).strip().lower()
+
 def http_get(url: str) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=25, allow_redirects=True)
+    r = http_request("GET", url, source="rusprofile", allow_redirects=True)
     r.raise_for_status()
     return r.text
 
-def rusprofile_search_cards(query: str, max_cards: int = 10) -> List[str]:
-    q = quote_plus(query)
-    url = f"https://www.rusprofile.ru/search?query={q}"
-    html = http_get(url)
-    soup = BeautifulSoup(html, "lxml")
-
-    cards: List[str] = []
-    for a in soup.select("a[href]"):
-        href = a.get("href", "")
-        if not href:
-            continue
-        if href.startswith("/id/") or "/company/" in href:
-            full = href if href.startswith("http") else "https://www.rusprofile.ru" + href
-            if full not in cards:
-                cards.append(full)
-        if len(cards) >= max_cards:
-            break
-    return cards
+def card_key(href: str) -> Optional[str]:
+    # /id/123, https://www.rusprofile.ru/id/123?x=1 -> "/id/123"; прочие карточки — по пути
+    path = urlparse(href).path if href.startswith("http") else href.split("?")[0].split("#")[0]
+    m = CARD_ID_RE.match(path)
+    if m:
+        return f"/id/{m.group(1)}"
+    if "/company/" in path:
+        return path.rstrip("/")
+    return None
+
+def rusprofile_search(query: str, max_cards: int = 10) -> List[Candidate]:
+    html = http_get(f"{RUSPROFILE}/search?query={quote_plus(query)}")
+    STATS["searches"] += 1
+    return parse_search(html, max_cards)
+
+@metrics.timed
+def parse_search(html: str, max_cards: int = 10) -> List[Candidate]:
+    """
+    Выдача поиска: для каждой карточки — название, ИНН и адрес из её блока в списке.
+    Блок карточки — самый широкий предок ссылки, в котором нет других карточек.
+    """
+    root = html_doc.parse(html, tree=True).root
+    if root is None:
+        return []
+    anchors = [(a, card_key(a.get("href") or "")) for a in root.iter("a")]
+    anchors = [(a, key) for a, key in anchors if key is not None]
+
+    # какие карточки лежат под каждым предком ссылок: один подъём на ссылку вместо
+    # пересбора ссылок каждого предка
+    below: Dict[Any, Set[str]] = {}
+    for a, key in anchors:
+        for el in a.iterancestors():
+            below.setdefault(el, set()).add(key)
+
+    found: Dict[str, Candidate] = {}
+    for a, key in anchors:
+        cand = found.get(key)
+        if cand is None:
+            if len(found) >= max_cards:
+                break
+            cand = found[key] = Candidate(key=key, url=RUSPROFILE + key)
+
+        block = a
+        parent = a.getparent()
+        while parent is not None and parent.tag not in ("body", "html") and len(below[parent]) == 1:
+            block, parent = parent, parent.getparent()
+
+        if not cand.name:
+            title = find_class(block, "company-item__title") if block is not a else None
+            cand.name = html_doc.element_text(title if title is not None else a)
+        if not cand.inn:
+            cand.inn = extract_inn_from_card(html_doc.element_text(block)) or ""
+        if not cand.address:
+            addr = block.find(".//address") if block is not a else None
+            cand.address = html_doc.element_text(addr) if addr is not None else ""
+    return list(found.values())
+
+def find_class(el: Any, cls: str) -> Optional[Any]:
+    return next((x for x in el.iter() if cls in (x.get("class") or "").split()), None)
+
+def similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio() if a and b else 0.0
+
+@metrics.timed
+def rank(cands: List[Candidate], name: str, dom: str) -> List[Candidate]:
+    """
+    По похожести на компанию: название к названию и домен к транслиту названия
+    (romashka.ru ~ «Ромашка»). При равенстве — порядок выдачи.
+    """
+    want = clean_name(name)
+    label = dom.split(":")[0].removeprefix("www.").split(".")[0].replace("-", "")
+    for c in cands:
+        cn = clean_name(c.name)
+        c.score = max(similarity(want, cn), similarity(label, cn.translate(TRANSLIT).replace(" ", "")))
+    return sorted(cands, key=lambda c: -c.score)
+
+def card_doc(cand: Candidate) -> Document:
+    doc = CARDS.get(cand.key)
+    if doc is not None:
+        STATS["card_memo"] += 1
+        return doc
+    try:
+        html = http_get(cand.url)
+    except requests.HTTPError as e:
+        # карточку удалили — просто не подошла; бан, капча и 5xx всплывают к вызывающему
+        if getattr(e.response, "status_code", None) != 404:
+            raise
+        html = ""
+    doc = CARDS[cand.key] = html_doc.parse(html)
+    STATS["cards"] += 1
+    return doc
+
+def mentions_domain(doc: Document, dom: str) -> bool:
+    # сайт на карточке — текстом или ссылкой
+    return dom in doc.text.lower() or any(dom in href.lower() for href in doc.links)
 
 def extract_inn_from_card(html: str) -> Optional[str]:
     m = INN_RE.search(html)
@@ -68,69 +179,97 @@ def choose_best_card_and_inn(name: str, site: str) -> tuple[str, str]:
     """
     Возвращает (inn, card_url) или ("","") если не нашли.
     Логика:
-    - если есть домен, ищем карточку по домену, и выбираем ту, где домен встречается на странице
-    - если домена нет или не совпало — ищем по названию (и берём первую с найденным ИНН)
+    - если есть домен, ищем по домену; кандидат с ИНН в выдаче и названием не хуже ACCEPT_SCORE
+      принимается сразу, иначе проверяем лучшие TOP_CARDS карточек: домен должен быть на странице
+    - если домена нет или не совпало — ищем по названию: ИНН берём прямо из выдачи у лучшего
+      кандидата, карточку качаем, только если в выдаче ИНН не нашёлся
+    ("","") — только честное «ни одна карточка не подошла»: сетевые и HTTP-ошибки (бан, капча,
+    5xx, таймаут) пробрасываются, чтобы вызывающий не записал их в журнал как окончательный ответ.
     """
     dom = domain_from_site(site)
 
     # 1) По домену (точнее)
     if dom:
-        try:
-            for card_url in rusprofile_search_cards(dom, max_cards=10):
-                time.sleep(0.6 + random.random() * 0.4)
-                card_html = http_get(card_url)
-
-                # проверка: домен должен встречаться в карточке
-                if dom in card_html.lower():
-                    inn = extract_inn_from_card(card_html)
-                    if inn:
-                        return inn, card_url
-        except Exception:
-            pass
+        for cand in rank(rusprofile_search(dom), name, dom)[:TOP_CARDS]:
+            if cand.inn and cand.score >= ACCEPT_SCORE:
+                STATS["from_search"] += 1
+                return cand.inn, cand.url
+            page = card_doc(cand)
+
+            # проверка: домен должен встречаться в карточке
+            if mentions_domain(page, dom):
+                inn = extract_inn_from_card(page.text) or cand.inn
+                if inn:
+                    return inn, cand.url
 
     # 2) По названию (запасной вариант)
     if name:
-        try:
-            for card_url in rusprofile_search_cards(name, max_cards=10):
-                time.sleep(0.6 + random.random() * 0.4)
-                card_html = http_get(card_url)
-                inn = extract_inn_from_card(card_html)
-                if inn:
-                    return inn, card_url
-        except Exception:
-            pass
+        for cand in rank(rusprofile_search(name), name, dom)[:TOP_CARDS]:
+            if cand.inn:
+                STATS["from_search"] += 1
+                return cand.inn, cand.url
+            inn = extract_inn_from_card(card_doc(cand).text)
+            if inn:
+                return inn, cand.url
 
     return "", ""
 
 def main() -> None:
-    inp = DATA_DIR / "companies_stage2.csv"
-    out = DATA_DIR / "companies_stage4_v2.csv"
+    inp = "companies_stage2"
+    out = "companies_stage4_v2"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fresh", action="store_true", help="не продолжать с журнала прошлого прогона")
+    args = parser.parse_args()
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    df = storage.read_table(inp)
+    journal = Journal("enrich_inn_rusprofile_v2", [Path(__file__), Path(html_doc.__file__)], resume=not args.fresh)
+    if journal.resumed:
+        print(f"Resumed: {journal.resumed} employers from {journal.path}")
 
     inns = []
     inn_sources = []
     rusprofile_urls = []
+    failed = 0
 
     for _, r in df.iterrows():
         name = (r.get("name") or "").strip()
         site = (r.get("site") or "").strip()
 
-        inn, card_url = choose_best_card_and_inn(name, site)
+        key = r.get("employer_id") or name
+        done = journal.get(key, [name, site])
+        if done is None:
+            try:
+                inn, card_url = choose_best_card_and_inn(name, site)
+            except Exception as e:
+                # в журнал не пишем — следующий прогон спросит эту компанию заново
+                print("Failed:", name, repr(e))
+                inn, card_url = "", ""
+                failed += 1
+            else:
+                journal.write(key, {"inn": inn, "card_url": card_url}, [name, site])
+        else:
+            inn, card_url = done["inn"], done["card_url"]
 
         inns.append(inn)
         rusprofile_urls.append(card_url)
         inn_sources.append("rusprofile" if inn else "")
 
-        time.sleep(0.6 + random.random() * 0.4)
-
     df["inn"] = inns
     df["inn_source"] = inn_sources
     df["rusprofile_url"] = rusprofile_urls
 
-    df.to_csv(out, index=False, encoding="utf-8")
-    print(f"Saved: {len(df)} rows -> {out}")
+    out_path = storage.write_table(df, out)
+    if failed:
+        # журнал оставляем: следующий прогон продолжит с него и переспросит только упавшие
+        journal.close()
+    else:
+        journal.finish()
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("INN filled:", int((df["inn"].astype(str) != "").sum()))
+    if failed:
+        print(f"Failed: {failed} (повторятся при следующем запуске)")
+    print("rusprofile:", STATS)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_inn_rusprofile_v2", main)
\ No newline at end of file
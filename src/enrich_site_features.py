@@ -1,40 +1,53 @@
 from __future__ import annotations
 
+import argparse
 import re
 import time
-import random
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
 
-import pandas as pd
-import requests
+from tqdm import tqdm
+
+import html_doc
+import metrics
+import profiling
+import storage
+from html_doc import Document
+from http_client import USER_AGENT, http_request
+from journal import Journal
+from page_scan import Detector, Hit, MultiMatcher
+from sitemap import discover as discover_sitemap
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-CONTACT_EMAIL = "ojdupool2004@mail.ru"
-
-HEADERS = {
-    "User-Agent": f"LeadSniperTest/1.0 (contact: {CONTACT_EMAIL})",
-    "Accept": "text/html,application/xhtml+xml",
-}
+# потоковая загрузка: больше MAX_PAGE_BYTES не читаем, не-html (PDF, картинки) не качаем вовсе
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_SITEMAP_BYTES = 10 * 1024 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml")
+# опционально: оставлять <head> + первые N КБ body. По умолчанию выключено —
+# ИНН и реквизиты часто лежат в футере, в конце страницы
+TRUNCATE_BODY_KB: Optional[int] = None
 
-TIMEOUT = 25
+# сколько разных доменов краулим параллельно; внутри домена — строго по одному запросу
+# (темп на хост держит http_client: профиль "site", one_in_flight)
+CRAWL_WORKERS = 100
 
-TAG_RE = re.compile(r"<[^>]+>")
-WS_RE = re.compile(r"\s+")
+HEAD_END_RE = re.compile(r"</head\s*>", re.IGNORECASE)
 TAXID_JSON_RE = re.compile(r'"taxID"\s*:\s*"(\d{10}|\d{12})"', re.IGNORECASE)
 INN_RE = re.compile(r"(ИНН|INN)\D{0,40}(\d{10}|\d{12})", re.IGNORECASE)
 
 
 EMAIL_RE = re.compile(r"([A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,})", re.IGNORECASE)
+# абсолютный путь без точек/query/fragment: urljoin вернул бы origin + путь как есть
+PLAIN_PATH_RE = re.compile(r"/(?!/)[A-Za-z0-9_~%/-]*")
 
 # признаки
 MENTIONS_24_7_RE = re.compile(r"\b24\s*/\s*7\b|круглосуточ|24\s*час", re.IGNORECASE)
-FORM_RE = re.compile(r"<form\b", re.IGNORECASE)
 
 # мессенджеры
 MESSENGERS_RE = re.compile(r"(t\.me/|telegram\.me/|wa\.me/|api\.whatsapp\.com/|viber\.com/)", re.IGNORECASE)
@@ -51,9 +64,39 @@ CHAT_VENDORS = {
     "bitrix": re.compile(r"bitrix|битрикс", re.IGNORECASE),
 }
 
+# литералы, с которых начинается любое совпадение соответствующего вендора
+CHAT_VENDOR_ANCHORS = {
+    "jivo": ("jivo",),
+    "livetex": ("livetex",),
+    "intercom": ("intercom",),
+    "zendesk": ("zendesk", "zopim"),
+    "freshchat": ("freshchat", "freshworks"),
+    "chatra": ("chatra",),
+    "yandex_chat": ("yandex.ru/chat", "яндекс.чат"),
+    "bitrix": ("bitrix", "битрикс"),
+}
+
 SUPPORT_HINT_RE = re.compile(r"(поддержк|support|help|контакт|обратн(ая|ой)\s+связ)", re.IGNORECASE)
 KB_HINT_RE = re.compile(r"(faq|база знаний|knowledge\s*base|помощ(ь|и)|инструкц|стат(ья|ьи))", re.IGNORECASE)
 
+# признаки страницы за один проход: по разметке (скрипты, JSON-LD, ссылки) и по видимому тексту;
+# ссылки и формы берутся прямо из разобранного документа (html_doc)
+CODE_MATCHER = MultiMatcher([
+    Detector("taxid", TAXID_JSON_RE, ('"taxid"',), group=1),
+    Detector("messengers", MESSENGERS_RE, ("t.me/", "telegram.me/", "wa.me/", "api.whatsapp.com/", "viber.com/")),
+    *[Detector("chat:" + vendor, rx, CHAT_VENDOR_ANCHORS[vendor]) for vendor, rx in CHAT_VENDORS.items()],
+])
+TEXT_MATCHER = MultiMatcher([
+    Detector("inn", INN_RE, ("инн", "inn"), group=2),
+    Detector("email", EMAIL_RE, ("@",), group=1, anchored=False),
+    Detector("mentions_24_7", MENTIONS_24_7_RE, ("24", "круглосуточ")),
+    Detector("support_hint", SUPPORT_HINT_RE, ("поддержк", "support", "help", "контакт", "обратн")),
+    Detector("kb_hint", KB_HINT_RE, ("faq", "база знаний", "knowledge", "помощ", "инструкц", "стат")),
+])
+# для этих признаков достаточно первого совпадения на странице
+CODE_FIRST_ONLY = frozenset(d.name for d in CODE_MATCHER.detectors)
+TEXT_FIRST_ONLY = frozenset({"inn", "mentions_24_7", "support_hint", "kb_hint"})
+
 # какие страницы пробуем дополнительно
 PATH_CANDIDATES = [
     "",  # главная
@@ -64,6 +107,42 @@ PATH_CANDIDATES = [
     "/privacy", "/terms",
 ]
 
+# флаги SiteFeatures, ради которых стоит качать ещё страницы; когда все найдены — краул останавливаем
+FEATURE_FLAGS = (
+    "inn", "has_support_email", "has_contact_form", "has_online_chat",
+    "has_messengers", "has_support_section", "has_kb_or_faq", "mentions_24_7",
+)
+
+# слово в пути URL -> какие признаки обычно находятся на такой странице (вес = насколько вероятно)
+URL_HINTS: Dict[str, Dict[str, float]] = {
+    "rekviz": {"inn": 3},
+    "requis": {"inn": 3},
+    "sveden": {"inn": 2},
+    "disclosure": {"inn": 2},
+    "legal": {"inn": 2},
+    "privacy": {"inn": 1},
+    "terms": {"inn": 1},
+    "o-kompanii": {"inn": 1},
+    "about": {"inn": 1},
+    "company": {"inn": 1},
+    "info": {"inn": 0.5},
+    "contact": {"has_support_email": 2, "has_contact_form": 2, "has_messengers": 1, "inn": 1, "mentions_24_7": 1, "has_support_section": 1},
+    "kontakt": {"has_support_email": 2, "has_contact_form": 2, "has_messengers": 1, "inn": 1, "mentions_24_7": 1, "has_support_section": 1},
+    "support": {"has_support_section": 2, "has_support_email": 2, "has_kb_or_faq": 1, "has_online_chat": 1, "mentions_24_7": 1, "has_contact_form": 1},
+    "help": {"has_support_section": 2, "has_kb_or_faq": 2, "has_support_email": 1, "has_online_chat": 1, "mentions_24_7": 1},
+    "/hc": {"has_kb_or_faq": 2, "has_support_section": 1},
+    "faq": {"has_kb_or_faq": 3, "has_support_section": 1},
+    "/kb": {"has_kb_or_faq": 3},
+    "knowledge": {"has_kb_or_faq": 3},
+}
+
+MAX_PAGES = 12
+MAX_REQUESTS = 25
+# реальная ссылка с сайта надёжнее угаданного пути из PATH_CANDIDATES (тот часто 404)
+DISCOVERED_BONUS = 1.5
+# сколько подходящих страниц из sitemap кладём во фронтир (самые неглубокие)
+SITEMAP_CANDIDATES = 40
+
 @dataclass
 class SiteFeatures:
     inn: str = ""
@@ -79,50 +158,69 @@ class SiteFeatures:
     kb_url: str = ""
     chat_vendor: str = ""
 
-def norm_text(html: str) -> str:
-    text = TAG_RE.sub(" ", html)
-    text = WS_RE.sub(" ", text).strip()
-    return text
+def truncate_html(html: str, body_kb: int) -> str:
+    m = HEAD_END_RE.search(html)
+    return html[:(m.end() if m else 0) + body_kb * 1024]
 
 def safe_get(url: str) -> Optional[str]:
     try:
-        r = requests.get(url, headers=HEADERS, timeout=TIMEOUT, allow_redirects=True)
+        r = http_request(
+            "GET", url, source="site", allow_redirects=True,
+            body_limit=MAX_PAGE_BYTES, content_types=HTML_CONTENT_TYPES,
+        )
         r.raise_for_status()
-        # иногда сайты отдают PDF/JSON — нас интересует только html
+        # иногда сайты отдают PDF/JSON — нас интересует только html (тело таких ответов и не качали);
+        # без content-type — пусть будет
         ctype = (r.headers.get("content-type") or "").lower()
-        if "text/html" not in ctype and "application/xhtml" not in ctype:
-            return r.text  # пусть будет, иногда без content-type
-        return r.text
+        if ctype and not any(t in ctype for t in HTML_CONTENT_TYPES):
+            return None
+        html = r.text
+        if TRUNCATE_BODY_KB is not None:
+            html = truncate_html(html, TRUNCATE_BODY_KB)
+        return html
     except Exception:
         return None
 
-def same_domain(base: str, link: str) -> bool:
+def polite_get_bytes(url: str) -> Optional[bytes]:
+    # robots.txt / sitemap.xml(.gz): нужны сырые байты, а не html
     try:
-        b = urlparse(base)
-        l = urlparse(link)
-        if not l.netloc:
-            return True
-        return l.netloc == b.netloc
+        r = http_request(
+            "GET", url, source="site", headers={"Accept": "*/*"},
+            allow_redirects=True, body_limit=MAX_SITEMAP_BYTES,
+        )
+        r.raise_for_status()
+        return r.content
     except Exception:
-        return False
+        return None
 
-def extract_links(html: str, base_url: str) -> List[str]:
-    # грубо ищем href
-    hrefs = re.findall(r'href=["\']([^"\']+)["\']', html, flags=re.IGNORECASE)
-    links = []
+@metrics.timed
+def resolve_links(hrefs: List[str], base_url: str) -> List[str]:
+    # ссылки того же домена, уникальные, порядок сохраняем;
+    # одинаковые href (меню, футер) резолвим один раз, домен базы парсим один раз
+    base = urlparse(base_url)
+    base_netloc = base.netloc
+    origin = f"{base.scheme}://{base_netloc}" if base.scheme in ("http", "https") and base_netloc else ""
+    seen_hrefs = set()
+    seen = set()
+    out = []
     for h in hrefs:
         h = h.strip()
-        if not h or h.startswith("#") or h.startswith("mailto:") or h.startswith("tel:"):
+        if not h or h in seen_hrefs or h.startswith(("#", "mailto:", "tel:")):
+            continue
+        seen_hrefs.add(h)
+        if origin and PLAIN_PATH_RE.fullmatch(h):
+            if origin + h not in seen:
+                out.append(origin + h); seen.add(origin + h)
             continue
         full = urljoin(base_url, h)
-        if same_domain(base_url, full):
-            links.append(full)
-    # уникальные, порядок сохраняем
-    seen = set()
-    out = []
-    for u in links:
-        if u not in seen:
-            out.append(u); seen.add(u)
+        try:
+            netloc = urlparse(full).netloc
+        except ValueError:
+            continue
+        if netloc and netloc != base_netloc:
+            continue
+        if full not in seen:
+            out.append(full); seen.add(full)
     return out
 
 def pick_best_support_links(links: List[str]) -> Tuple[str, str]:
@@ -136,6 +234,41 @@ def pick_best_support_links(links: List[str]) -> Tuple[str, str]:
             kb_url = u
     return support_url, kb_url
 
+def missing_features(f: SiteFeatures) -> Set[str]:
+    return {name for name in FEATURE_FLAGS if not getattr(f, name)}
+
+def url_hints(url: str) -> List[Dict[str, float]]:
+    path = urlparse(url).path.lower()
+    return [hints for word, hints in URL_HINTS.items() if word in path]
+
+def score_url(url: str, missing: Set[str], discovered: bool) -> float:
+    score = sum(w for hints in url_hints(url) for feat, w in hints.items() if feat in missing)
+    return score * DISCOVERED_BONUS if discovered else score
+
+def next_url(frontier: Dict[str, bool], f: SiteFeatures) -> Optional[str]:
+    """Самый полезный кандидат с учётом того, чего ещё не нашли; None — качать больше нечего."""
+    missing = missing_features(f)
+    if not missing or not frontier:
+        return None
+    best_url, best_score = None, 0.0
+    for url, discovered in frontier.items():
+        score = score_url(url, missing, discovered)
+        if score > best_score:
+            best_url, best_score = url, score
+    return best_url
+
+def bare_host(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def pick_sitemap_urls(urls: List[str], base: str) -> List[str]:
+    # страницы этого же сайта (www. не важен), у которых в пути есть подсказка; сначала неглубокие
+    host = bare_host(base)
+    picked = [u for u in dict.fromkeys(urls) if bare_host(u) == host and url_hints(u)]
+    picked.sort(key=lambda u: (urlparse(u).path.rstrip("/").count("/"), len(u)))
+    return picked[:SITEMAP_CANDIDATES]
+
+@profiling.hot
 def enrich_one_site(site: str) -> SiteFeatures:
     f = SiteFeatures()
     if not site:
@@ -144,112 +277,107 @@ def enrich_one_site(site: str) -> SiteFeatures:
     if not site.startswith("http"):
         site = "https://" + site
 
-    visited = set()
-    pages_html: List[Tuple[str, str]] = []
-
-    # 1) сначала типовые страницы
-    for p in PATH_CANDIDATES:
-        url = urljoin(site.rstrip("/") + "/", p.lstrip("/"))
-        if url in visited:
-            continue
+    base = site.rstrip("/") + "/"
+    visited: Set[str] = set()
+    all_links: List[str] = []
+    pages = 0
+
+    # robots.txt + sitemap: реальные адреса контактов/реквизитов/FAQ вместо перебора путей
+    sm = discover_sitemap(base, polite_get_bytes)
+    requests_made = sm.requests
+    user_agent = USER_AGENT
+
+    # фронтир: url -> нашли ли его на сайте (ссылка/sitemap), иначе это угаданный путь
+    frontier: Dict[str, bool] = {}
+    if sm.has_sitemap:
+        for u in pick_sitemap_urls(sm.urls, base):
+            frontier.setdefault(u, True)
+    else:
+        for p in PATH_CANDIDATES:
+            if p:
+                frontier.setdefault(urljoin(base, p.lstrip("/")), False)
+    # главную качаем всегда, остальное — только если robots.txt разрешает
+    frontier = {u: d for u, d in frontier.items() if sm.allowed(user_agent, u)}
+
+    # главная — всегда первой: там виджеты чата, мессенджеры и ссылки для фронтира
+    url: Optional[str] = urljoin(base, "")
+    while url is not None:
         visited.add(url)
+        frontier.pop(url, None)
+        requests_made += 1
 
         html = safe_get(url)
-        time.sleep(0.35 + random.random() * 0.25)
-        if not html:
-            continue
-
-        pages_html.append((url, html))
-        if len(pages_html) >= 6:
+        if html:
+            pages += 1
+            links = analyze_page(url, html, f)
+            all_links.extend(links)
+            for link in links:
+                if link not in visited and url_hints(link) and sm.allowed(user_agent, link):
+                    frontier[link] = True
+
+        if pages >= MAX_PAGES or requests_made >= MAX_REQUESTS:
             break
+        url = next_url(frontier, f)
 
-    # 2) умный добор ссылок с уже скачанных страниц (depth=1)
-    # выбираем ссылки, похожие на "реквизиты/о компании/контакты/правовая"
-    keyword_links: List[str] = []
-    for url, html in pages_html:
-        for link in extract_links(html, url):
-            low = link.lower()
-            if any(k in low for k in [
-                "rekviz", "requis", "legal", "privacy", "terms",
-                "about", "company", "contacts", "contact", "kontakty",
-                "info", "disclosure", "sveden"
-            ]):
-                keyword_links.append(link)
-
-    # уникализируем
-    seen = set()
-    keyword_links_uniq = []
-    for u in keyword_links:
-        if u not in seen:
-            keyword_links_uniq.append(u)
-            seen.add(u)
-
-    # докачаем ещё страниц (до 12 суммарно)
-    for url in keyword_links_uniq:
-        if len(pages_html) >= 12:
-            break
-        if url in visited:
-            continue
-        visited.add(url)
-
-        html = safe_get(url)
-        time.sleep(0.35 + random.random() * 0.25)
-        if not html:
-            continue
-        pages_html.append((url, html))
-
-    # 3) анализируем собранные страницы
-    all_links: List[str] = []
-    for url, html in pages_html:
-        text = norm_text(html)
-
-        # ИНН: сначала JSON-LD (очень часто так)
-        if not f.inn:
-            mj = TAXID_JSON_RE.search(html)
-            if mj:
-                f.inn = mj.group(1)
-
-        # ИНН: потом обычный текст
-        if not f.inn:
-            m = INN_RE.search(text)
-            if m:
-                f.inn = m.group(2)
-
-        # email
-        emails = EMAIL_RE.findall(text)
-        emails = [e.lower() for e in emails]
-        support_emails = [e for e in emails if e.startswith(("support@", "help@", "client@", "service@", "info@")) or "support" in e or "help" in e]
-        if support_emails and not f.support_email:
-            f.support_email = support_emails[0]
-            f.has_support_email = 1
-
-        # форма
-        if not f.has_contact_form and FORM_RE.search(html):
-            f.has_contact_form = 1
-
-        # 24/7
-        if not f.mentions_24_7 and MENTIONS_24_7_RE.search(text):
-            f.mentions_24_7 = 1
-
-        # мессенджеры
-        if not f.has_messengers and MESSENGERS_RE.search(html):
-            f.has_messengers = 1
-
-        # чат-вендор
-        if not f.has_online_chat:
-            for vendor, rx in CHAT_VENDORS.items():
-                if rx.search(html):
-                    f.has_online_chat = 1
-                    f.chat_vendor = vendor
-                    break
-
-        all_links.extend(extract_links(html, url))
-
-        if not f.has_support_section and SUPPORT_HINT_RE.search(text):
-            f.has_support_section = 1
-        if not f.has_kb_or_faq and KB_HINT_RE.search(text):
-            f.has_kb_or_faq = 1
+    apply_support_links(all_links, f)
+    return f
 
+@metrics.timed
+def scan_page(doc: Document) -> Tuple[List[Hit], List[Hit]]:
+    """Все попадания признаков по разметке и по видимому тексту (по одному проходу на каждый)."""
+    return (
+        CODE_MATCHER.scan(doc.code, first_only=CODE_FIRST_ONLY),
+        TEXT_MATCHER.scan(doc.text, first_only=TEXT_FIRST_ONLY),
+    )
+
+@metrics.timed
+def analyze_page(url: str, html: str, f: SiteFeatures) -> List[str]:
+    """Дополняет f признаками одной страницы, возвращает её ссылки того же домена."""
+    doc = html_doc.parse(html)
+    code_hits, text_hits = scan_page(doc)
+    first: Dict[str, Hit] = {}
+    for h in code_hits + text_hits:
+        first.setdefault(h.feature, h)
+
+    # ИНН: сначала JSON-LD (очень часто так), потом обычный текст
+    if not f.inn and "taxid" in first:
+        f.inn = first["taxid"].value
+    if not f.inn and "inn" in first:
+        f.inn = first["inn"].value
+
+    # email
+    emails = [h.value.lower() for h in text_hits if h.feature == "email"]
+    support_emails = [e for e in emails if e.startswith(("support@", "help@", "client@", "service@", "info@")) or "support" in e or "help" in e]
+    if support_emails and not f.support_email:
+        f.support_email = support_emails[0]
+        f.has_support_email = 1
+
+    # форма, 24/7, мессенджеры
+    if not f.has_contact_form and doc.forms:
+        f.has_contact_form = 1
+    if not f.mentions_24_7 and "mentions_24_7" in first:
+        f.mentions_24_7 = 1
+    if not f.has_messengers and "messengers" in first:
+        f.has_messengers = 1
+
+    # чат-вендор: приоритет — порядок CHAT_VENDORS, а не позиция на странице
+    if not f.has_online_chat:
+        for vendor in CHAT_VENDORS:
+            if "chat:" + vendor in first:
+                f.has_online_chat = 1
+                f.chat_vendor = vendor
+                break
+
+    links = resolve_links(doc.links, url)
+
+    if not f.has_support_section and "support_hint" in first:
+        f.has_support_section = 1
+    if not f.has_kb_or_faq and "kb_hint" in first:
+        f.has_kb_or_faq = 1
+
+    return links
+
+def apply_support_links(all_links: List[str], f: SiteFeatures) -> None:
     if all_links:
         support_url, kb_url = pick_best_support_links(all_links)
         if support_url and not f.support_url:
@@ -257,13 +385,66 @@ def enrich_one_site(site: str) -> SiteFeatures:
         if kb_url and not f.kb_url:
             f.kb_url = kb_url
 
+def analyze_pages(pages_html: List[Tuple[str, str]], f: SiteFeatures) -> SiteFeatures:
+    all_links: List[str] = []
+    for url, html in pages_html:
+        all_links.extend(analyze_page(url, html, f))
+    apply_support_links(all_links, f)
     return f
 
+def crawl_sites(sites: List[str], workers: int = CRAWL_WORKERS, journal: Optional[Journal] = None) -> Dict[str, SiteFeatures]:
+    """
+    Краулит уникальные сайты параллельно (разные домены не ждут друг друга,
+    вежливость на хост держит http_client). Возвращает {site: SiteFeatures}.
+    С journal: сайты из журнала не краулятся, каждый докраулённый сразу пишется в журнал.
+    """
+    results: Dict[str, SiteFeatures] = {}
+    uniq = []
+    for site in dict.fromkeys(s for s in sites if s):
+        done = journal.get(site) if journal is not None else None
+        if done is not None:
+            results[site] = SiteFeatures(**done)
+        else:
+            uniq.append(site)
+    if not uniq:
+        return results
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(uniq)))) as pool:
+        futures = {pool.submit(enrich_one_site, site): site for site in uniq}
+        bar = tqdm(as_completed(futures), total=len(futures), desc="Crawl sites")
+        for fut in bar:
+            site = futures[fut]
+            try:
+                results[site] = fut.result()
+                if journal is not None:
+                    journal.write(site, asdict(results[site]))
+            except Exception as e:
+                # не в журнал: при resume сайт краулится снова
+                print("Failed:", site, repr(e))
+                results[site] = SiteFeatures()
+            minutes = (time.monotonic() - started) / 60
+            if minutes > 0:
+                bar.set_postfix(domains_per_min=f"{len(results) / minutes:.1f}")
+
+    minutes = (time.monotonic() - started) / 60
+    print(f"Crawled {len(uniq)} sites in {minutes:.1f} min ({len(uniq) / max(minutes, 1e-9):.1f} domains/min)")
+    return results
+
 def main() -> None:
-    inp = DATA_DIR / "companies_stage2.csv"
-    out = DATA_DIR / "companies_stage3.csv"
+    inp = "companies_stage2"
+    out = "companies_stage3"
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fresh", action="store_true", help="не продолжать с журнала прошлого прогона")
+    args = parser.parse_args()
+
+    df = storage.read_table(inp)
+    # результат по сайту зависит от детекторов и обхода sitemap — их код тоже в хэше журнала
+    code = [Path(__file__)] + [Path(__file__).with_name(m) for m in ("html_doc.py", "page_scan.py", "sitemap.py")]
+    journal = Journal("enrich_site_features", code, resume=not args.fresh)
+    if journal.resumed:
+        print(f"Resumed: {journal.resumed} sites from {journal.path}")
 
     inns = []
     has_support_email = []
@@ -278,9 +459,11 @@ def main() -> None:
     kb_url = []
     chat_vendor = []
 
-    for _, r in df.iterrows():
-        site = (r.get("site") or "").strip()
-        f = enrich_one_site(site)
+    row_sites = [(r.get("site") or "").strip() for _, r in df.iterrows()]
+    crawled = crawl_sites(row_sites, journal=journal)
+
+    for site in row_sites:
+        f = crawled.get(site) or SiteFeatures()
 
         inns.append(f.inn)
         has_support_email.append(f.has_support_email)
@@ -309,9 +492,10 @@ def main() -> None:
     df["kb_url"] = kb_url
     df["chat_vendor"] = chat_vendor
 
-    df.to_csv(out, index=False, encoding="utf-8")
-    print(f"Saved: {len(df)} rows -> {out}")
+    out_path = storage.write_table(df, out)
+    journal.finish()
+    print(f"Saved: {len(df)} rows -> {out_path}")
     print("INN filled:", int((df["inn"].astype(str) != "").sum()))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("enrich_site_features", main)
\ No newline at end of file
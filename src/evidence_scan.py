@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+# максимальный зазор между числом и словом "поддержка" (в символах очищенного текста)
+WINDOW = 60
+SNIPPET_PAD = 40
+
+UNIT = r"чел(?:овек)?|сотрудник(?:ов)?|специалист(?:ов)?|оператор(?:ов)?"
+
+# якоря — только литералы: один проход по тексту в нижнем регистре без IGNORECASE,
+# re пропускает позиции по набору первых букв. Число ищем назад от единицы ("50 операторов")
+# или от "/" и "час" (24/7, 2/2, 24 часа) — голые числа вроде "2024 года" якорями не считаются
+UNITS = ("чел", "сотрудник", "специалист", "оператор")
+SUPPORT_ANCHORS = ("поддержк", "саппорт", "support", "контакт", "call")
+ANCHORS = "|".join(re.escape(a) for a in (*UNITS, "час", "/", *SUPPORT_ANCHORS, "круглосуточ", "сменн", "ночн"))
+ANCHOR_RE = re.compile(ANCHORS)
+# запасной вариант, если lower() поменял длину строки (редкие символы вроде "İ")
+ANCHOR_RE_CI = re.compile(ANCHORS, re.IGNORECASE)
+
+# полные токены проверяем только с найденной позиции (match, не search)
+NUM_RE = re.compile(rf"(\d{{2,4}})\s*(?:{UNIT})", re.IGNORECASE)
+SUPPORT_RE = re.compile(r"поддержк|саппорт|support|контакт[\s-]?центр|call[\s-]?центр", re.IGNORECASE)
+B_DIGITS_RE = re.compile(r"(?P<mentions_24_7>\b24\s*/\s*7\b)|(?P<shift_work>\b2\s*/\s*2\b|\b3\s*/\s*3\b)")
+B_WORDS = {
+    "круглосуточ": ("mentions_24_7", None),
+    "сменн": ("shift_work", re.compile(r"сменн(?:ый|ая)\s+график", re.IGNORECASE)),
+    "ночн": ("shift_work", re.compile(r"ночн(?:ые|ая)\s+смен", re.IGNORECASE)),
+}
+
+B_FEATURES = ("mentions_24_7", "shift_work")
+
+
+@dataclass(frozen=True)
+class EvidenceHit:
+    """
+    kind: "a" — число рядом с поддержкой (value — это число; feature — что стоит раньше),
+    "b" — признак масштаба (feature = value = mentions_24_7 / shift_work).
+    start/end — границы в тексте (для A — вся пара число+ключевое слово), snippet — контекст вокруг.
+    """
+    kind: str
+    feature: str
+    start: int
+    end: int
+    value: str
+    snippet: str
+
+
+def snippet(text: str, start: int, end: int, pad: int = SNIPPET_PAD) -> str:
+    left, right = max(0, start - pad), min(len(text), end + pad)
+    return ("…" if left else "") + text[left:right].strip() + ("…" if right < len(text) else "")
+
+
+def tokenize(text: str) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int]], List[Tuple[str, int, int]]]:
+    """Один проход по тексту: числа с единицей (start, end, n), ключевые слова (start, end), признаки B."""
+    nums: List[Tuple[int, int, int]] = []
+    kws: List[Tuple[int, int]] = []
+    bs: List[Tuple[str, int, int]] = []
+
+    low = text.lower()
+    if len(low) == len(text):
+        it = ANCHOR_RE.finditer(low)
+    else:
+        low = text
+        it = ANCHOR_RE_CI.finditer(text)
+
+    for a in it:
+        start, end = a.span()
+        anchor = a.group(0).lower()
+        if anchor in SUPPORT_ANCHORS:
+            m = SUPPORT_RE.match(low, start)
+            if m:
+                kws.append((start, m.end()))
+            continue
+        if anchor in B_WORDS:
+            feature, rx = B_WORDS[anchor]
+            m = rx.match(low, start) if rx else a
+            if m:
+                bs.append((feature, start, m.end()))
+            continue
+
+        # единица, "/" или "час": смотрим, какое число стоит перед ней
+        digits_end = start
+        while digits_end and low[digits_end - 1].isspace():
+            digits_end -= 1
+        digits_start = digits_end
+        while digits_start and low[digits_start - 1].isdigit():
+            digits_start -= 1
+        if digits_start == digits_end:
+            continue
+        if anchor == "/":
+            m = B_DIGITS_RE.match(low, digits_start)
+            if m:
+                bs.append((m.lastgroup, digits_start, m.end()))
+        elif anchor == "час":
+            # "24 часа" — в том числе в конце длинного числа ("124 часа"), как раньше
+            if low.startswith("24", digits_end - 2):
+                bs.append(("mentions_24_7", digits_end - 2, end))
+        elif 2 <= digits_end - digits_start <= 4:
+            # у "12345 человек" нет хвоста "2345" — такое число не размер команды
+            m = NUM_RE.match(low, digits_start)
+            if m:
+                nums.append((digits_start, m.end(), int(m.group(1))))
+    return nums, kws, bs
+
+
+@metrics.timed
+def scan(text: str) -> List[EvidenceHit]:
+    """
+    Все A/B-совпадения по порядку в тексте. Число — A-хит, если ключевое слово начинается
+    не дальше WINDOW символов после него (приоритет, берётся ближайшее) или заканчивается
+    не дальше WINDOW до него (берётся самое левое такое — как прежний "слово.{0,60}число").
+    Близость ищем бинарным поиском по отсортированным позициям — без .{0,60} и откатов,
+    время линейно по длине текста.
+    """
+    nums, kws, bs = tokenize(text)
+    kw_starts = [s for s, _ in kws]
+    kw_ends = [e for _, e in kws]
+
+    hits: List[EvidenceHit] = []
+    for start, end, n in nums:
+        # первое ключевое слово после числа
+        j = bisect_left(kw_starts, end)
+        if j < len(kws) and kw_starts[j] - end <= WINDOW:
+            feature, span = "number_near_support", (start, kws[j][1])
+        else:
+            # самое левое ключевое слово, которое кончается перед числом не дальше WINDOW
+            j = bisect_left(kw_ends, start - WINDOW)
+            if j >= len(kws) or kw_ends[j] > start:
+                continue
+            feature, span = "support_near_number", (kws[j][0], end)
+        hits.append(EvidenceHit("a", feature, span[0], span[1], str(n), snippet(text, *span)))
+
+    for feature, start, end in bs:
+        hits.append(EvidenceHit("b", feature, start, end, feature, snippet(text, start, end)))
+
+    hits.sort(key=lambda h: h.start)
+    return hits
+
+
+def a_size(hits: List[EvidenceHit]) -> Optional[EvidenceHit]:
+    """
+    Как прежние регулярки: сначала самое левое "число ... поддержка"; если такого нет —
+    самое левое слово "поддержка ..." и последнее число в его окне (жадный .{0,60}).
+    """
+    hit = next((h for h in hits if h.feature == "number_near_support"), None)
+    if hit:
+        return hit
+    near = [h for h in hits if h.feature == "support_near_number"]
+    if not near:
+        return None
+    # hits отсортированы по началу (у этих — начало слова), сортировка устойчива: числа по порядку
+    return [h for h in near if h.start == near[0].start][-1]
+
+
+def b_flags(hits: List[EvidenceHit]) -> Dict[str, int]:
+    found = {h.feature for h in hits if h.kind == "b"}
+    return {f: int(f in found) for f in B_FEATURES}
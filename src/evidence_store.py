@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Set
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_PATH = BASE_DIR / "data" / "support_evidence.sqlite"
+
+# колонки агрегата в том порядке, в каком их отдаёт frame()
+COLUMNS = [
+    "employer_id", "vacancy_id", "evidence_url", "support_team_size_min", "support_evidence",
+    "evidence_snippet", "evidence_type", "mentions_24_7", "shift_work",
+    "a_size_max", "count_24_7", "count_shift_work", "support_vacancies",
+]
+
+# поменялись таблицы — старый файл пересоздаётся (как при смене engine)
+SCHEMA_VERSION = "2"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vacancies (
+    vacancy_id TEXT PRIMARY KEY,
+    employer_id TEXT NOT NULL,
+    a_size INTEGER,
+    mentions_24_7 INTEGER NOT NULL,
+    shift_work INTEGER NOT NULL,
+    support_team_size_min INTEGER,
+    evidence_url TEXT,
+    support_evidence TEXT,
+    evidence_snippet TEXT,
+    evidence_type TEXT
+);
+CREATE TABLE IF NOT EXISTS employers (
+    employer_id TEXT PRIMARY KEY,
+    support_vacancies INTEGER NOT NULL,
+    a_size_max INTEGER,
+    count_24_7 INTEGER NOT NULL,
+    count_shift_work INTEGER NOT NULL,
+    support_team_size_min INTEGER,
+    vacancy_id TEXT,
+    evidence_url TEXT,
+    support_evidence TEXT,
+    evidence_snippet TEXT,
+    evidence_type TEXT,
+    mentions_24_7 INTEGER,
+    shift_work INTEGER,
+    updated_at REAL NOT NULL
+);
+"""
+
+# счётчики копятся; "лучшая" вакансия (с максимальным support_team_size_min) меняется
+# только на строго лучшую. В DO UPDATE голые имена — старая строка, excluded — новая
+UPSERT = """
+INSERT INTO employers (
+    employer_id, support_vacancies, a_size_max, count_24_7, count_shift_work,
+    support_team_size_min, vacancy_id, evidence_url, support_evidence, evidence_snippet,
+    evidence_type, mentions_24_7, shift_work, updated_at
+) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(employer_id) DO UPDATE SET
+    support_vacancies = support_vacancies + 1,
+    a_size_max = CASE WHEN a_size_max IS NULL OR excluded.a_size_max > a_size_max
+                      THEN coalesce(excluded.a_size_max, a_size_max) ELSE a_size_max END,
+    count_24_7 = count_24_7 + excluded.count_24_7,
+    count_shift_work = count_shift_work + excluded.count_shift_work,
+    {best},
+    updated_at = excluded.updated_at
+"""
+BEST_COLUMNS = (
+    "support_team_size_min", "vacancy_id", "evidence_url", "support_evidence", "evidence_snippet",
+    "evidence_type", "mentions_24_7", "shift_work",
+)
+BETTER = "coalesce(excluded.support_team_size_min, -1) > coalesce(support_team_size_min, -1)"
+UPSERT = UPSERT.format(best=",\n    ".join(f"{c} = CASE WHEN {BETTER} THEN excluded.{c} ELSE {c} END" for c in BEST_COLUMNS))
+
+VACANCY_COLUMNS = (
+    "vacancy_id", "employer_id", "a_size", "mentions_24_7", "shift_work", "support_team_size_min",
+    "evidence_url", "support_evidence", "evidence_snippet", "evidence_type",
+)
+INSERT_VACANCY = (
+    f"INSERT OR IGNORE INTO vacancies ({', '.join(VACANCY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(VACANCY_COLUMNS))})"
+)
+
+# агрегат заново из оставшихся вакансий — то же, что дали бы UPSERT'ы по порядку добавления:
+# счётчики — суммы, лучшая вакансия — первая (по rowid) с максимальным support_team_size_min
+REBUILD = """
+INSERT INTO employers (
+    employer_id, support_vacancies, a_size_max, count_24_7, count_shift_work,
+    support_team_size_min, vacancy_id, evidence_url, support_evidence, evidence_snippet,
+    evidence_type, mentions_24_7, shift_work, updated_at
+)
+SELECT b.employer_id, a.n, a.a_size_max, a.count_24_7, a.count_shift_work,
+       b.support_team_size_min, b.vacancy_id, b.evidence_url, b.support_evidence, b.evidence_snippet,
+       b.evidence_type, b.mentions_24_7, b.shift_work, ?
+FROM (
+    SELECT *, ROW_NUMBER() OVER (
+        PARTITION BY employer_id ORDER BY coalesce(support_team_size_min, -1) DESC, rowid
+    ) AS rn
+    FROM vacancies
+) AS b
+JOIN (
+    SELECT employer_id, count(*) AS n, max(a_size) AS a_size_max,
+           sum(mentions_24_7) AS count_24_7, sum(shift_work) AS count_shift_work
+    FROM vacancies GROUP BY employer_id
+) AS a USING (employer_id)
+WHERE b.rn = 1
+"""
+
+
+def engine_hash(paths: Sequence[Path]) -> str:
+    # код, который превращает вакансию в улики: поменялся — агрегат пересобираем с нуля
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+class EvidenceStore:
+    """
+    Накопительный агрегат улик по работодателям: каждая вакансия учитывается один раз,
+    новые вакансии дописываются в агрегат без пересчёта всей истории.
+    Вакансии, которых больше нет во входе, убирает evict() — агрегат пересобирается из оставшихся.
+    Если engine (хэш кода извлечения) не совпал с сохранённым — история сбрасывается.
+    """
+
+    def __init__(self, engine: str, path: Path = STORE_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        if meta.get("schema") != SCHEMA_VERSION:
+            self._conn.executescript("DROP TABLE vacancies; DROP TABLE employers;" + SCHEMA)
+        self.rebuilt = "engine" in meta and (meta["engine"] != engine or meta.get("schema") != SCHEMA_VERSION)
+        if self.rebuilt:
+            self.reset()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("engine", engine), ("schema", SCHEMA_VERSION)],
+        )
+        self._conn.commit()
+
+    def reset(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM vacancies")
+            self._conn.execute("DELETE FROM employers")
+
+    def seen(self, vacancy_ids: Iterable[str], batch: int = 500) -> Set[str]:
+        ids = [v for v in vacancy_ids if v]
+        out: Set[str] = set()
+        for i in range(0, len(ids), batch):
+            part = ids[i:i + batch]
+            marks = ",".join("?" * len(part))
+            out.update(v for (v,) in self._conn.execute(
+                f"SELECT vacancy_id FROM vacancies WHERE vacancy_id IN ({marks})", part
+            ))
+        return out
+
+    def add(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        rows — по одной на вакансию (и без улик тоже: она идёт в support_vacancies).
+        Уже учтённые вакансии пропускаются. Возвращает, сколько добавлено.
+        """
+        added = 0
+        now = time.time()
+        with self._conn:
+            for r in rows:
+                cur = self._conn.execute(INSERT_VACANCY, [r[c] for c in VACANCY_COLUMNS])
+                if not cur.rowcount:
+                    continue
+                added += 1
+                self._conn.execute(UPSERT, (
+                    r["employer_id"], r["a_size"], r["mentions_24_7"], r["shift_work"],
+                    r["support_team_size_min"], r["vacancy_id"], r["evidence_url"], r["support_evidence"],
+                    r["evidence_snippet"], r["evidence_type"], r["mentions_24_7"], r["shift_work"], now,
+                ))
+        return added
+
+    def evict(self, current: Set[str], batch: int = 500) -> int:
+        """
+        Убирает вакансии, которых нет в current (их выкинул фильтр или новый полный сбор),
+        и пересобирает агрегат работодателей из оставшихся. Возвращает, сколько убрано.
+        """
+        stale = [v for (v,) in self._conn.execute("SELECT vacancy_id FROM vacancies") if v not in current]
+        if not stale:
+            return 0
+        with self._conn:
+            for i in range(0, len(stale), batch):
+                part = stale[i:i + batch]
+                self._conn.execute(f"DELETE FROM vacancies WHERE vacancy_id IN ({','.join('?' * len(part))})", part)
+            self._conn.execute("DELETE FROM employers")
+            self._conn.execute(REBUILD, (time.time(),))
+        return len(stale)
+
+    def frame(self) -> pd.DataFrame:
+        # только работодатели с уликами: 1 строка = 1 компания, как раньше после groupby
+        return pd.read_sql_query(
+            f"SELECT {', '.join(COLUMNS)} FROM employers "
+            "WHERE support_team_size_min IS NOT NULL ORDER BY employer_id",
+            self._conn,
+        ).astype({"a_size_max": "Int64"})
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import metrics
+import storage
+
+# листья пайплайна — то, что отдаём наружу; промежуточные таблицы остаются в data/ как есть
+EXPORTS = [
+    "companies_stage5_inn",
+]
+
+
+def main() -> None:
+    for path in storage.export_csv(EXPORTS):
+        print(f"Exported -> {path}")
+
+
+if __name__ == "__main__":
+    metrics.run_stage("export_csv", main)
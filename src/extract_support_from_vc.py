@@ -1,81 +1,62 @@
 from __future__ import annotations
 
+import argparse
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Set
 
 import pandas as pd
 
+import evidence_scan
+import metrics
+import storage
+from evidence_store import EvidenceStore, engine_hash
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_RAW = BASE_DIR / "data" / "raw"
 DATA_RAW.mkdir(parents=True, exist_ok=True)
 
-# --- B: признаки масштаба ---
-B_PATTERNS = {
-    "mentions_24_7": re.compile(r"\b24\s*/\s*7\b|круглосуточ|24\s*час", re.IGNORECASE),
-    "shift_work": re.compile(
-        r"\b2\s*/\s*2\b|\b3\s*/\s*3\b|сменн(ый|ая)\s+график|ночн(ые|ая)\s+смен",
-        re.IGNORECASE,
-    ),
-}
-
-# --- A: число рядом с поддержкой ---
-A_NUMBER_NEAR_SUPPORT = re.compile(
-    r"(?P<n>\d{2,4})\s*(чел(овек)?|сотрудник(ов)?|специалист(ов)?|оператор(ов)?)"
-    r".{0,60}(поддержк|саппорт|support|контакт[\s-]?центр|call[\s-]?центр)",
-    re.IGNORECASE | re.DOTALL,
-)
-
-A_SUPPORT_NEAR_NUMBER = re.compile(
-    r"(поддержк|саппорт|support|контакт[\s-]?центр|call[\s-]?центр)"
-    r".{0,60}(?P<n>\d{2,4})\s*(чел(овек)?|сотрудник(ов)?|специалист(ов)?|оператор(ов)?)",
-    re.IGNORECASE | re.DOTALL,
-)
-
 TAG_RE = re.compile(r"<[^>]+>")
 
+@metrics.timed
 def strip_html(x: str) -> str:
     x = TAG_RE.sub(" ", x)
     x = re.sub(r"\s+", " ", x).strip()
     return x
 
-def extract_a_size(text: str) -> Optional[int]:
-    m = A_NUMBER_NEAR_SUPPORT.search(text)
-    if m:
-        return int(m.group("n"))
-    m = A_SUPPORT_NEAR_NUMBER.search(text)
-    if m:
-        return int(m.group("n"))
-    return None
-
-def extract_b_flags(text: str) -> Dict[str, int]:
-    return {k: int(bool(rx.search(text))) for k, rx in B_PATTERNS.items()}
-
-def main() -> None:
-    inp = DATA_RAW / "vacancies_support_only.csv"
-    out = DATA_RAW / "support_evidence_jobs.csv"
-
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+CHUNK_ROWS = 5_000
+WORKERS = os.cpu_count() or 1
 
+@metrics.timed
+def evidence_rows(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    # по строке на каждую вакансию, в том числе без улик (support_team_size_min = None)
     rows: List[Dict[str, Any]] = []
 
-    for _, r in df.iterrows():
-        employer_id = r.get("employer_id", "").strip()
-        if not employer_id:
+    for r in df.to_dict("records"):
+        employer_id = (r.get("employer_id") or "").strip()
+        vacancy_id = (r.get("vacancy_id") or "").strip()
+        if not employer_id or not vacancy_id:
             continue
 
         desc = strip_html(r.get("description", "") or "")
-        a_size = extract_a_size(desc)
-        b_flags = extract_b_flags(desc)
+        hits = evidence_scan.scan(desc)
+        a_hit = evidence_scan.a_size(hits)
+        a_size = int(a_hit.value) if a_hit else None
+        b_flags = evidence_scan.b_flags(hits)
 
         support_team_size_min = None
         support_evidence = None
+        evidence_snippet = ""
         evidence_type = "jobs"
 
         # Уровень A
         if a_size is not None and a_size >= 10:
             support_team_size_min = a_size
             support_evidence = f"Прямое указание размера команды поддержки: {a_size} человек."
+            evidence_snippet = a_hit.snippet
 
         # Уровень B
         elif b_flags["mentions_24_7"] or b_flags["shift_work"]:
@@ -86,34 +67,79 @@ def main() -> None:
             if b_flags["shift_work"]:
                 reasons.append("сменный график/ночные смены")
             support_evidence = "Признаки крупной поддержки: " + ", ".join(reasons) + ". По правилу B ставим минимум 10."
-
-        if support_team_size_min is None:
-            continue
+            evidence_snippet = next(h.snippet for h in hits if h.kind == "b")
 
         rows.append(
             {
                 "employer_id": employer_id,
-                "vacancy_id": r.get("vacancy_id"),
+                "vacancy_id": vacancy_id,
                 "evidence_url": r.get("alternate_url"),
-                "support_team_size_min": int(support_team_size_min),
+                "a_size": a_size,
+                "support_team_size_min": support_team_size_min,
                 "support_evidence": support_evidence,
+                "evidence_snippet": evidence_snippet,
                 "evidence_type": evidence_type,
                 "mentions_24_7": b_flags["mentions_24_7"],
                 "shift_work": b_flags["shift_work"],
             }
         )
+    return rows
 
-    ev = pd.DataFrame(rows)
-
-    # Агрегация: 1 строка = 1 компания (берём максимальную оценку)
-    ev = (
-        ev.sort_values(["employer_id", "support_team_size_min"], ascending=[True, False])
-          .groupby("employer_id", as_index=False)
-          .first()
-    )
-
-    ev.to_csv(out, index=False, encoding="utf-8")
-    print(f"Saved: {len(ev)} companies -> {out}")
+def main() -> None:
+    inp = "raw/vacancies_support_only"
+    out = "raw/support_evidence_jobs"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rebuild", action="store_true", help="забыть накопленный агрегат и пройти всё заново")
+    args = parser.parse_args()
+
+    store = EvidenceStore(engine_hash([Path(evidence_scan.__file__), Path(__file__)]))
+    if args.rebuild:
+        store.reset()
+
+    # нужны 4 колонки из всех деталей вакансии; читаем кусками и сканируем только новые вакансии,
+    # а id всех текущих запоминаем — чтобы потом убрать из агрегата выбывшие
+    current: Set[str] = set()
+
+    def new_chunks() -> Iterator[pd.DataFrame]:
+        for chunk in storage.iter_table(
+            inp, columns=["employer_id", "vacancy_id", "alternate_url", "description"], chunk_rows=args.chunk_rows
+        ):
+            ids = chunk["vacancy_id"].fillna("").astype(str).str.strip()
+            current.update(ids)
+            seen = store.seen(ids)
+            chunk = chunk[~ids.isin(seen)]
+            if len(chunk):
+                yield chunk
+
+    added = 0
+    if args.workers <= 1:
+        for chunk in new_chunks():
+            added += store.add(evidence_rows(chunk))
+    else:
+        # в полёте не больше 2*workers кусков, как в filter_support: pool.map забрал бы весь вход сразу
+        task = metrics.WorkerTask(evidence_rows)
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            inflight = deque()
+            for chunk in new_chunks():
+                inflight.append(pool.submit(task, chunk))
+                if len(inflight) >= 2 * args.workers:
+                    added += store.add(metrics.unwrap(inflight.popleft().result()))
+            while inflight:
+                added += store.add(metrics.unwrap(inflight.popleft().result()))
+
+    evicted = store.evict(current)
+
+    # Агрегат: 1 строка = 1 компания (максимальная оценка + счётчики по всем вакансиям)
+    ev = store.frame()
+    store.close()
+
+    out_path = storage.write_table(ev, out)
+    print(f"New vacancies: {added}" + (" (агрегат пересобран: поменялся код извлечения)" if store.rebuilt else ""))
+    print(f"Evicted vacancies (нет во входе): {evicted}")
+    print(f"Saved: {len(ev)} companies -> {out_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("extract_support_from_vc", main)
\ No newline at end of file
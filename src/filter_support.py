@@ -1,7 +1,14 @@
+import argparse
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 
+import metrics
+import storage
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_RAW = BASE_DIR / "data" / "raw"
 DATA_RAW.mkdir(parents=True, exist_ok=True)
@@ -18,35 +25,71 @@ NEG = re.compile(
     re.IGNORECASE,
 )
 
+# POS и NEG одним проходом: на одной позиции NEG приоритетнее, на первом NEG — стоп
+POS_NEG = re.compile(f"(?P<neg>{NEG.pattern})|(?P<pos>{POS.pattern})", re.IGNORECASE)
+
 TAG_RE = re.compile(r"<[^>]+>")
 
-def strip_html(x: str) -> str:
-    x = TAG_RE.sub(" ", x)
-    x = re.sub(r"\s+", " ", x).strip()
-    return x
+CHUNK_ROWS = 20_000
+WORKERS = os.cpu_count() or 1
 
-def main() -> None:
-    inp = DATA_RAW / "vacancies_details.csv"
-    out = DATA_RAW / "vacancies_support_only.csv"
+def is_support(text: str) -> bool:
+    pos = False
+    for m in POS_NEG.finditer(text):
+        if m.group("neg") is not None:
+            return False
+        pos = True
+    return pos
 
-    df = pd.read_csv(inp, dtype=str, keep_default_na=False)
+@metrics.timed
+def classify_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    # название и описание — один документ; теги режем сразу по всей колонке и схлопываем пробелы,
+    # как прежний strip_html: иначе "контакт <b>центр</b>" не попадёт в контакт[\s-]?центр.
+    # "|" между ними не попадает ни в \s, ни в [\s-] — совпадение не склеит конец названия с началом описания
+    desc = (
+        df["description"].fillna("").astype(str)
+        .str.replace(TAG_RE, " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    docs = df["name"].fillna("").astype(str) + " | " + desc
+    keep = [is_support(doc) for doc in docs]
+    return df[keep]
 
-    # готовим текст для фильтра
-    df["name_norm"] = df["name"].fillna("").astype(str)
-    df["desc_norm"] = df["description"].fillna("").astype(str).map(strip_html)
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
 
-    # условия
-    is_pos = df["name_norm"].str.contains(POS) | df["desc_norm"].str.contains(POS)
-    is_neg = df["name_norm"].str.contains(NEG) | df["desc_norm"].str.contains(NEG)
+    inp = "raw/vacancies_details"
+    out = "raw/vacancies_support_only"
 
-    filtered = df[is_pos & (~is_neg)].copy()
+    total = 0
+    chunks = storage.iter_table(inp, chunk_rows=args.chunk_rows)
+    with storage.TableWriter(out) as writer:
+        if args.workers <= 1:
+            for chunk in chunks:
+                total += len(chunk)
+                writer.write(classify_chunk(chunk))
+        else:
+            # в полёте не больше 2*workers кусков — память постоянна, порядок строк сохраняется
+            task = metrics.WorkerTask(classify_chunk)
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                inflight = deque()
+                for chunk in chunks:
+                    total += len(chunk)
+                    inflight.append(pool.submit(task, chunk))
+                    if len(inflight) >= 2 * args.workers:
+                        writer.write(metrics.unwrap(inflight.popleft().result()))
+                while inflight:
+                    writer.write(metrics.unwrap(inflight.popleft().result()))
 
     # немного метрик для контроля
-    print("Total details:", len(df))
-    print("Kept (support-like):", len(filtered))
+    print("Total details:", total)
+    print("Kept (support-like):", writer.rows)
 
-    filtered.to_csv(out, index=False, encoding="utf-8")
-    print(f"Saved -> {out}")
+    print(f"Saved -> {writer.path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("filter_support", main)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from lxml import etree
+
+import metrics
+
+JSON_LD_TYPE = "application/ld+json"
+# содержимое этих тегов — не видимый текст
+HIDDEN_TAGS = ("script", "style", "template")
+# где ещё в разметке бывают URL и код виджетов, кроме <a href> и <script>: чаты во фреймах,
+# preconnect к CDN вендора, кнопки с data-href и onclick="window.open(...)"
+EMBEDS_XPATH = (
+    "//iframe/@src | //frame/@src | //embed/@src | //link/@href | //object/@data"
+    " | //@*[starts-with(name(), 'data-') or starts-with(name(), 'on')]"
+)
+
+_local = threading.local()
+
+
+def _parser() -> etree.HTMLParser:
+    # парсер lxml нельзя делить между потоками — по одному на поток краулера
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        # на вход всегда utf-8 байты: строки с <?xml encoding=...?> lxml не принимает,
+        # а meta charset уже учтён при декодировании ответа; huge_tree — иначе libxml2 молча
+        # бросает разбор на вложенности 256 (вёрстка с незакрытыми div) и теряет хвост страницы
+        parser = _local.parser = etree.HTMLParser(
+            encoding="utf-8", remove_comments=True, remove_pis=True, no_network=True, huge_tree=True,
+        )
+    return parser
+
+
+def _embeds() -> etree.XPath:
+    # скомпилированный XPath — тоже по одному на поток
+    xpath = getattr(_local, "embeds", None)
+    if xpath is None:
+        xpath = _local.embeds = etree.XPath(EMBEDS_XPATH, smart_strings=False)
+    return xpath
+
+
+def squash(text: str) -> str:
+    return " ".join(text.split())
+
+
+@dataclass
+class Document:
+    """
+    Страница, разобранная один раз (lxml, C-парсер): всё, что нужно детекторам.
+    text — видимый текст без скриптов и стилей, пробелы схлопнуты, сущности раскрыты;
+    links — href у <a>/<area> в порядке документа; scripts — тела inline-скриптов (без JSON-LD);
+    embeds — прочие URL и код в атрибутах (iframe/link/embed/object, data-*, on*).
+    root — дерево, если разбирали с tree=True (для разборов по структуре, как выдача rusprofile).
+    """
+    text: str = ""
+    links: List[str] = field(default_factory=list)
+    forms: int = 0
+    script_srcs: List[str] = field(default_factory=list)
+    scripts: List[str] = field(default_factory=list)
+    json_ld: List[str] = field(default_factory=list)
+    embeds: List[str] = field(default_factory=list)
+    root: Optional[etree._Element] = None
+
+    @property
+    def code(self) -> str:
+        """Всё «невидимое» одной строкой: скрипты, их src, JSON-LD, href и embeds — для детекторов по разметке."""
+        return "\n".join([*self.script_srcs, *self.scripts, *self.json_ld, *self.links, *self.embeds])
+
+
+@metrics.timed
+def parse(html: str, tree: bool = False) -> Document:
+    root = etree.fromstring(html.encode("utf-8", errors="replace"), _parser()) if html.strip() else None
+    if root is None:
+        return Document()
+
+    doc = Document(root=root if tree else None)
+    doc.links = [href for href in (a.get("href") for a in root.iter("a", "area")) if href is not None]
+    doc.forms = sum(1 for _ in root.iter("form"))
+    doc.embeds = _embeds()(root)
+
+    for s in root.iter("script"):
+        src = s.get("src")
+        if src:
+            doc.script_srcs.append(src)
+        elif s.text:
+            if (s.get("type") or "").strip().lower() == JSON_LD_TYPE:
+                doc.json_ld.append(s.text)
+            else:
+                doc.scripts.append(s.text)
+
+    # текст убираем, а не сами элементы: strip_elements склеил бы соседние слова через хвост
+    for el in list(root.iter(*HIDDEN_TAGS)):
+        el.text = None
+        for child in list(el):
+            el.remove(child)
+    doc.text = squash(" ".join(root.itertext()))
+    return doc
+
+
+def element_text(el: etree._Element) -> str:
+    return squash(" ".join(el.itertext()))
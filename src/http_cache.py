@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import metrics
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "data" / "cache"
+CACHE_PATH = CACHE_DIR / "http.sqlite"
+
+# сколько живёт ответ без перепроверки (секунды), по источнику
+TTLS: Dict[str, float] = {
+    "hh_search": 6 * 3600,          # выдача меняется быстро
+    "hh_vacancy": 7 * 24 * 3600,
+    "hh_employer": 14 * 24 * 3600,
+    "site": 7 * 24 * 3600,
+    "rusprofile": 30 * 24 * 3600,
+    "dadata": 30 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+MAX_BYTES = 2 * 1024 ** 3  # ~2 ГБ тел ответов, дальше вытесняем по LRU
+
+# кэшируем только "окончательные" ответы; 404/410 тоже — сайт без /faq не станет его иметь завтра
+CACHEABLE_STATUSES = {200, 203, 404, 410}
+
+# заголовки, которые после декодирования тела уже неверны
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+# пометки в сохранённых заголовках: тело обрезано до N байт / не читалось из-за content-type
+TRUNCATED_HEADER = "X-Body-Truncated"
+SKIPPED_HEADER = "X-Body-Skipped"
+
+STREAM_CHUNK = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses(accessed_at);
+"""
+
+
+def read_limited(
+    r: requests.Response,
+    body_limit: Optional[int],
+    content_types: Optional[Tuple[str, ...]],
+) -> None:
+    """
+    Дочитывает stream-ответ в r._content: не больше body_limit байт (после распаковки gzip),
+    а при неподходящем Content-Type или ошибочном статусе тело не читает вовсе.
+    """
+    ctype = (r.headers.get("content-type") or "").lower()
+    skip = r.status_code >= 400 or (content_types and ctype and not any(t in ctype for t in content_types))
+    if skip:
+        r._content = b""
+        r.headers[SKIPPED_HEADER] = "1"
+        r.close()
+        return
+
+    chunks = []
+    size = 0
+    for chunk in r.iter_content(STREAM_CHUNK):
+        chunks.append(chunk)
+        size += len(chunk)
+        if body_limit is not None and size >= body_limit:
+            r.headers[TRUNCATED_HEADER] = str(body_limit)
+            break
+    body = b"".join(chunks)
+    r._content = body[:body_limit] if body_limit is not None else body
+    r.close()
+
+
+def covers(headers: Dict[str, str], body_limit: Optional[int], content_types: Optional[Tuple[str, ...]]) -> bool:
+    # годится ли сохранённая (возможно, урезанная) запись для этого вызова
+    lower = {k.lower(): v for k, v in headers.items()}
+    if SKIPPED_HEADER.lower() in lower and not content_types:
+        return False
+    truncated = lower.get(TRUNCATED_HEADER.lower())
+    if truncated is not None and (body_limit is None or body_limit > int(truncated)):
+        return False
+    return True
+
+
+def cache_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    h = hashlib.sha256()
+    h.update(method.upper().encode())
+    h.update(b"\0")
+    h.update(url.encode())
+    h.update(b"\0")
+    h.update(body or b"")
+    return h.hexdigest()
+
+
+class HttpCache:
+    """
+    Дисковый кэш HTTP-ответов на SQLite (WAL). Ключ — method+URL+body.
+    Свежие записи (моложе TTL источника) отдаются без сети, устаревшие
+    перепроверяются через ETag / Last-Modified (304 -> берём тело из кэша).
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = MAX_BYTES) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._total = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0, "stored": 0, "evicted": 0}
+
+    def _get(self, key: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT url, status, headers, encoding, body, stored_at FROM responses WHERE key = ?",
+                (key,),
+            )
+            row = cur.fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def _put(self, key: str, source: str, r: requests.Response) -> None:
+        headers = {k: v for k, v in r.headers.items() if k.lower() not in DROP_HEADERS}
+        body = r.content or b""
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, source, url, status, headers, encoding, body, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, r.url, r.status_code, json.dumps(headers), r.encoding, body, len(body), now, now),
+            )
+            self._total += len(body) - (old[0] if old else 0)
+            self.stats["stored"] += 1
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _touch(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self) -> None:
+        # вызывается под локом: удаляем самые давно читанные, пока не уйдём ниже 90% лимита
+        target = int(self.max_bytes * 0.9)
+        cur = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC")
+        doomed = []
+        for key, size in cur:
+            if self._total <= target:
+                break
+            doomed.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.stats["evicted"] += len(doomed)
+
+    @staticmethod
+    def _build(row: Any) -> requests.Response:
+        url, status, headers, encoding, body, _ = row
+        r = requests.Response()
+        r.status_code = status
+        r.headers = CaseInsensitiveDict(json.loads(headers))
+        r._content = body
+        r.encoding = encoding
+        r.url = url
+        r.from_cache = True  # type: ignore[attr-defined]
+        try:
+            r.reason = HTTPStatus(status).phrase
+        except ValueError:
+            r.reason = ""
+        return r
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        source: str,
+        session: Any = requests,
+        body_limit: Optional[int] = None,
+        content_types: Optional[Tuple[str, ...]] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        Как requests.request, но через кэш. Некэшируемые ответы (429, 5xx...)
+        возвращаются как есть, так что raise_for_status у вызывающего работает по-старому.
+        body_limit / content_types включают потоковое чтение: тело режется до body_limit байт,
+        а при чужом Content-Type не скачивается (content пустой, заголовки на месте).
+        """
+        prepared = requests.Request(
+            method.upper(), url, params=kwargs.pop("params", None),
+            json=kwargs.get("json"), data=kwargs.get("data"),
+        ).prepare()
+        body = prepared.body.encode() if isinstance(prepared.body, str) else prepared.body
+        key = cache_key(method, prepared.url, body)
+        ttl = TTLS.get(source, DEFAULT_TTL)
+
+        row = self._get(key)
+        if row is not None and not covers(json.loads(row[2]), body_limit, content_types):
+            row = None
+        if row is not None and time.time() - row[5] < ttl:
+            self.stats["hit"] += 1
+            metrics.inc("http_cache_total", source=source, result="hit")
+            return self._build(row)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if row is not None:
+            cached_headers = json.loads(row[2])
+            lower = {k.lower(): v for k, v in cached_headers.items()}
+            if lower.get("etag"):
+                headers["If-None-Match"] = lower["etag"]
+            if lower.get("last-modified"):
+                headers["If-Modified-Since"] = lower["last-modified"]
+
+        stream = body_limit is not None or content_types is not None
+        r = session.request(method.upper(), prepared.url, headers=headers, stream=stream, **kwargs)
+
+        if r.status_code == 304 and row is not None:
+            r.close()
+            self.stats["revalidated"] += 1
+            metrics.inc("http_cache_total", source=source, result="revalidated")
+            self._touch(key)
+            return self._build(row)
+
+        if stream:
+            read_limited(r, body_limit, content_types)
+
+        self.stats["miss"] += 1
+        metrics.inc("http_cache_total", source=source, result="miss")
+        if r.status_code in CACHEABLE_STATUSES:
+            self._put(key, source, r)
+        return r
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> HttpCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+
+def cached_request(method: str, url: str, source: str, **kwargs: Any) -> requests.Response:
+    return get_cache().request(method, url, source, **kwargs)
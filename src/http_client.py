@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import metrics
+from http_cache import cached_request, read_limited
+from rate_limit import HostGate, PaceLimits, parse_retry_after
+
+try:  # HTTP/2 — опционально: pip install "httpx[http2]"
+    import httpx
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover
+    httpx = None
+
+CONTACT_EMAIL = "ojdupool2004@mail.ru"
+USER_AGENT = f"LeadSniperTest/1.0 (contact: {CONTACT_EMAIL})"
+
+# профиль = семейство хостов со своими заголовками, пулом, таймаутами и ретраями
+SOURCE_PROFILES = {
+    "hh_search": "hh",
+    "hh_vacancy": "hh",
+    "hh_employer": "hh_web",
+    "site": "site",
+    "rusprofile": "rusprofile",
+    "dadata": "dadata",
+}
+
+PROFILE_HEADERS: Dict[str, Dict[str, str]] = {
+    # HH просит представляться и в HH-User-Agent
+    "hh": {"HH-User-Agent": USER_AGENT, "Accept": "application/json"},
+    "hh_web": {"Accept": "text/html,application/xhtml+xml"},
+    "site": {"Accept": "text/html,application/xhtml+xml"},
+    "rusprofile": {"Accept": "text/html,application/xhtml+xml"},
+    "dadata": {"Content-Type": "application/json", "Accept": "application/json"},
+}
+
+# (connect, read): соединение должно быть быстрым, а ответ может и подождать
+TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "hh": (5, 30),
+    "hh_web": (5, 30),
+    "site": (5, 20),
+    "rusprofile": (5, 25),
+    "dadata": (5, 25),
+}
+
+# сколько хостов держим в пуле и сколько соединений на хост
+POOL_SIZES: Dict[str, Tuple[int, int]] = {
+    "hh": (4, 32),
+    "hh_web": (4, 16),
+    "site": (512, 2),   # сотни доменов, по одному запросу в полёте на каждый
+    "rusprofile": (4, 16),
+    "dadata": (2, 32),
+}
+
+# ретраи только на сетевые ошибки и 5xx; 429 обрабатывают лимитеры у вызывающих
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_METHODS = frozenset({"GET", "HEAD", "POST"})  # POST к DaData — только чтение
+RETRIES: Dict[str, int] = {"hh": 3, "hh_web": 2, "site": 1, "rusprofile": 2, "dadata": 3}
+# пауза перед n-м повтором подряд: 0, 2*BACKOFF, 4*BACKOFF... (как backoff_factor urllib3)
+BACKOFF = 0.5
+
+# темп на хост (AIMD, rate_limit.AimdPacer): разгоняемся до floor, пока хост отвечает быстро,
+# и откатываемся к ceiling на 429/503, таймаутах и росте задержки. start — прежние паузы в скриптах
+PACE: Dict[str, PaceLimits] = {
+    # у api.hh.ru и DaData жёсткий потолок по договору держат TokenBucket у вызывающих
+    "hh": PaceLimits(floor=0.05, ceiling=5.0, start=0.1),
+    "hh_web": PaceLimits(floor=0.2, ceiling=10.0, start=0.8, one_in_flight=True),
+    "site": PaceLimits(floor=0.1, ceiling=5.0, start=0.35, one_in_flight=True),
+    "rusprofile": PaceLimits(floor=0.3, ceiling=15.0, start=1.0, one_in_flight=True),
+    "dadata": PaceLimits(floor=0.02, ceiling=5.0, start=0.1),
+}
+
+# HH и rusprofile умеют HTTP/2: один коннект, много параллельных потоков
+HTTP2_PREFIXES: Dict[str, Tuple[str, ...]] = {
+    "hh": ("https://api.hh.ru",),
+    "rusprofile": ("https://www.rusprofile.ru",),
+}
+HTTP2 = os.getenv("HTTP2", "").strip() == "1" and httpx is not None
+
+# офлайн-стенд (bench/): префикс URL -> адрес локального стенд-ина,
+# например {"https://api.hh.ru": "http://127.0.0.1:8001"}
+BASE_OVERRIDES: Dict[str, str] = json.loads(os.getenv("HTTP_BASE_OVERRIDES") or "{}")
+
+# профили, где хостов сотни (сайты компаний): в метриках они сводятся в один ряд
+AGGREGATE_HOSTS = {"site": "(sites)"}
+
+# сжатие: requests/urllib3 сами шлют Accept-Encoding gzip/deflate (+br/zstd, если стоят brotli/zstandard)
+
+
+def host_label(profile: str, url: str) -> str:
+    return AGGREGATE_HOSTS.get(profile) or urlparse(url).netloc.lower()
+
+
+class _Paced:
+    """
+    Примесь к адаптеру: в сеть — только через HostGate профиля (ответы из кэша сюда не доходят).
+    Ретраи (сетевые ошибки и 5xx) — тоже здесь, над темпом, а не в urllib3: каждая попытка
+    ждёт свой слот, и её исход (статус, задержка, Retry-After, таймаут) уходит в AIMD хоста и в метрики.
+    """
+
+    gate: HostGate
+    profile: str
+    retries: int = 0
+
+    def send(self, request, *args, **kwargs):  # type: ignore[no-untyped-def]
+        host = host_label(self.profile, request.url)
+        attempt = 0
+        while True:
+            attempt += 1
+            last = attempt > self.retries or request.method not in RETRY_METHODS
+            with self.gate.slot(request.url) as pacer:
+                started = time.monotonic()
+                try:
+                    r = super().send(request, *args, **kwargs)  # type: ignore[misc]
+                except (requests.Timeout, requests.ConnectionError) as e:
+                    pacer.feedback(None)
+                    metrics.inc("http_requests_total", host=host, status=type(e).__name__)
+                    if last:
+                        raise
+                else:
+                    elapsed = time.monotonic() - started
+                    retry_after = parse_retry_after(r.headers.get("Retry-After"), default=0.0)
+                    pacer.feedback(r.status_code, elapsed, retry_after)
+                    metrics.inc("http_requests_total", host=host, status=str(r.status_code))
+                    metrics.observe("http_request_duration_seconds", elapsed, host=host)
+                    if last or r.status_code not in RETRY_STATUSES:
+                        return r
+                    r.close()
+            # спим вне слота: one_in_flight-хост в это время обслуживает другие запросы,
+            # а Retry-After уже поставил паузу в pacer — следующая попытка её дождётся
+            metrics.inc("http_retries_total", host=host)
+            if attempt > 1:
+                time.sleep(BACKOFF * 2 ** (attempt - 1))
+
+
+class PacedAdapter(_Paced, HTTPAdapter):
+    # max_retries у HTTPAdapter остаётся 0: повторяет _Paced
+    def __init__(self, gate: HostGate, profile: str, retries: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.gate = gate
+        self.profile = profile
+        self.retries = retries
+
+
+class _HttpxRaw:
+    """Минимальный raw для requests.Response поверх потокового httpx.Response."""
+
+    def __init__(self, resp: Any) -> None:
+        self._resp = resp
+        self._it: Optional[Iterator[bytes]] = None
+
+    def stream(self, chunk_size: int = 65536, decode_content: bool = True) -> Iterator[bytes]:
+        yield from self._resp.iter_bytes(chunk_size)
+
+    def read(self, amt: Optional[int] = None, decode_content: bool = True) -> bytes:
+        if self._it is None:
+            self._it = self._resp.iter_bytes(amt)
+        return next(self._it, b"")
+
+    def close(self) -> None:
+        self._resp.close()
+
+    def release_conn(self) -> None:
+        self._resp.close()
+
+
+class Http2Adapter(BaseAdapter):
+    """Транспорт requests через httpx с HTTP/2 — кэш, стриминг и raise_for_status работают как прежде."""
+
+    def __init__(self, retries: int) -> None:
+        super().__init__()
+        self.client = httpx.Client(http2=True, transport=httpx.HTTPTransport(http2=True, retries=retries))
+        self.requests = 0
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):  # type: ignore[override]
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        try:
+            hreq = self.client.build_request(
+                request.method, request.url, headers=dict(request.headers), content=request.body,
+                timeout=httpx.Timeout(read, connect=connect),
+            )
+            hresp = self.client.send(hreq, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+        self.requests += 1
+
+        r = requests.Response()
+        r.status_code = hresp.status_code
+        r.headers = CaseInsensitiveDict(hresp.headers.items())
+        r.encoding = get_encoding_from_headers(r.headers)
+        r.raw = _HttpxRaw(hresp)
+        r.reason = hresp.reason_phrase
+        r.url = request.url
+        r.request = request
+        r.connection = self
+        if not stream:
+            r.content
+        return r
+
+    def close(self) -> None:
+        self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        pool = getattr(self.client._transport, "_pool", None)
+        return {"http2": True, "requests": self.requests, "connections": len(getattr(pool, "connections", []))}
+
+
+class PacedHttp2Adapter(_Paced, Http2Adapter):
+    def __init__(self, retries: int, gate: HostGate, profile: str) -> None:
+        super().__init__(0)
+        self.gate = gate
+        self.profile = profile
+        self.retries = retries
+
+
+def route(url: str) -> str:
+    for prefix, target in BASE_OVERRIDES.items():
+        if url.startswith(prefix):
+            return target + url[len(prefix):]
+    return url
+
+
+_sessions: Dict[str, requests.Session] = {}
+_gates: Dict[str, HostGate] = {profile: HostGate(limits) for profile, limits in PACE.items()}
+_requests_made: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def make_session(profile: str) -> requests.Session:
+    s = requests.Session()
+    s.headers.update({"User-Agent": USER_AGENT, **PROFILE_HEADERS[profile]})
+
+    retries = RETRIES[profile]
+    pool_connections, pool_maxsize = POOL_SIZES[profile]
+    adapter = PacedAdapter(
+        _gates[profile], profile, retries, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+    )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+
+    if HTTP2:
+        for prefix in HTTP2_PREFIXES.get(profile, ()):
+            s.mount(prefix, PacedHttp2Adapter(retries, _gates[profile], profile))
+    return s
+
+
+def get_session(profile: str) -> requests.Session:
+    with _lock:
+        if profile not in _sessions:
+            _sessions[profile] = make_session(profile)
+        return _sessions[profile]
+
+
+def http_request(
+    method: str,
+    url: str,
+    source: str,
+    cache: bool = True,
+    body_limit: Optional[int] = None,
+    content_types: Optional[Tuple[str, ...]] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Единая точка для всех HTTP-запросов пайплайна: keep-alive пул профиля,
+    таймауты (connect, read), ретраи и (по умолчанию) дисковый кэш.
+    """
+    profile = SOURCE_PROFILES[source]
+    url = route(url)
+    kwargs.setdefault("timeout", TIMEOUTS[profile])
+    session = get_session(profile)
+    with _lock:
+        _requests_made[profile] = _requests_made.get(profile, 0) + 1
+
+    if cache:
+        r = cached_request(
+            method, url, source, session=session,
+            body_limit=body_limit, content_types=content_types, **kwargs,
+        )
+    else:
+        stream = body_limit is not None or content_types is not None
+        r = session.request(method.upper(), url, stream=stream, **kwargs)
+        if stream:
+            read_limited(r, body_limit, content_types)
+    if not getattr(r, "from_cache", False):
+        metrics.inc("http_response_bytes_total", len(r.content or b""), host=host_label(profile, r.url or url))
+    return r
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    По каждому профилю и хосту: сколько открыто соединений и сделано запросов.
+    requests / connections > 1 — значит keep-alive работает.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        sessions = dict(_sessions)
+        made = dict(_requests_made)
+    for profile, session in sessions.items():
+        hosts: Dict[str, Any] = {}
+        for adapter in set(session.adapters.values()):
+            if isinstance(adapter, HTTPAdapter):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    hosts[f"{pool.scheme}://{pool.host}"] = {
+                        "connections": pool.num_connections,
+                        "requests": pool.num_requests,
+                    }
+            elif isinstance(adapter, Http2Adapter):
+                hosts["http2"] = adapter.stats()
+        out[profile] = {"calls": made.get(profile, 0), "hosts": hosts}
+    return out
+
+
+def pace_stats() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """По профилю и хосту: текущий интервал между запросами, сглаженная задержка, сколько раз тормозили."""
+    return {profile: gate.stats() for profile, gate in _gates.items() if gate.stats()}
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+
+from enrich_inn_rusprofile_v2 import clean_name, domain_from_site
+from http_cache import CACHE_DIR
+
+INN_CACHE_PATH = CACHE_DIR / "inn.sqlite"
+
+# inn — уверенные ответы резолвера (ключ "domain:..." / "name:..."), bulk — импорт ЕГРЮЛ/открытых данных
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inn (
+    key TEXT PRIMARY KEY,
+    inn TEXT NOT NULL,
+    source TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bulk (
+    inn TEXT NOT NULL,
+    name TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+"""
+
+# Jaccard по триграммам: ниже FUZZY_MIN — не кандидат
+FUZZY_MIN = 0.6
+# префикс запроса длиннее минимального на PREFIX_EXTRA триграмм: годный кандидат встречается
+# в нём не меньше PREFIX_EXTRA + 1 раз — совпадения по одной-двум частым триграммам отсеиваются сразу
+PREFIX_EXTRA = 3
+
+
+def normalize_name(name: str) -> str:
+    # clean_name (LEGAL_TRASH, пробелы, регистр) + ё/е и дефисы: "Орбита-Сервис" == "орбита сервис"
+    return " ".join(clean_name(name).replace("ё", "е").replace("-", " ").split())
+
+
+def normalize_domain(site: str) -> str:
+    return domain_from_site(site).removeprefix("www.")
+
+
+def trigrams(s: str) -> FrozenSet[str]:
+    s = f"  {s} "
+    return frozenset(s[i:i + 3] for i in range(len(s) - 2))
+
+
+@dataclass(frozen=True)
+class IndexMatch:
+    inn: str
+    source: str
+    score: float
+    how: str  # domain / name / fuzzy
+
+
+class InnIndex:
+    """
+    В памяти: домен -> ИНН, нормализованное название -> ИНН и триграммный индекс названий.
+    Нечёткий поиск — prefix filter: кандидатов дают только самые редкие триграммы запроса
+    (при Jaccard >= t общих триграмм не меньше t*|q|); попадания в префиксе считает numpy,
+    кто набрал слишком мало или не подходит по длине (|g| в [t*|q|, |q|/t]), отсеивается
+    без пересечения множеств, точный Jaccard — лишь для оставшихся.
+    Название или домен с несколькими разными ИНН считаются неоднозначными и не отвечают.
+    """
+
+    def __init__(self) -> None:
+        self._domains: Dict[str, Set[Tuple[str, str]]] = {}
+        self._names: Dict[str, Set[Tuple[str, str]]] = {}
+        self._entries: List[Tuple[str, FrozenSet[str]]] = []
+        self._postings: Dict[str, List[int]] = {}
+        # те же списки в numpy; add сбрасывает изменённые, пересобираются при следующем поиске
+        self._arrays: Dict[str, np.ndarray] = {}
+        # число триграмм у каждого названия (с запасом, растёт удвоением)
+        self._sizes = np.zeros(1024, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, inn: str, name: str = "", domain: str = "", source: str = "") -> None:
+        if domain:
+            self._domains.setdefault(domain, set()).add((inn, source))
+        norm = normalize_name(name)
+        if not norm:
+            return
+        known = self._names.get(norm)
+        self._names.setdefault(norm, set()).add((inn, source))
+        if known is not None:
+            return
+        eid = len(self._entries)
+        grams = trigrams(norm)
+        self._entries.append((norm, grams))
+        if eid == len(self._sizes):
+            self._sizes = np.concatenate([self._sizes, np.zeros_like(self._sizes)])
+        self._sizes[eid] = len(grams)
+        for g in grams:
+            self._postings.setdefault(g, []).append(eid)
+            self._arrays.pop(g, None)
+
+    @staticmethod
+    def _unique(found: Optional[Set[Tuple[str, str]]]) -> Optional[Tuple[str, str]]:
+        if not found or len({inn for inn, _ in found}) != 1:
+            return None
+        return min(found)
+
+    def domain_inns(self, domain: str) -> Set[str]:
+        return {inn for inn, _ in self._domains.get(domain, ())} if domain else set()
+
+    def lookup(self, domain: str = "", name: str = "", min_score: float = FUZZY_MIN) -> Optional[IndexMatch]:
+        hit = self._unique(self._domains.get(domain)) if domain else None
+        if hit:
+            return IndexMatch(hit[0], hit[1], 1.0, "domain")
+
+        norm = normalize_name(name)
+        if not norm:
+            return None
+        found = self._names.get(norm)
+        if found:
+            # неоднозначное точное название нечёткий поиск нашёл бы первым же — и тоже не ответил бы
+            hit = self._unique(found)
+            return IndexMatch(hit[0], hit[1], 1.0, "name") if hit else None
+        return self._fuzzy(norm, min_score)
+
+    def _posting(self, gram: str) -> np.ndarray:
+        arr = self._arrays.get(gram)
+        if arr is None:
+            arr = self._arrays[gram] = np.array(self._postings.get(gram, ()), dtype=np.int32)
+        return arr
+
+    def _fuzzy(self, norm: str, min_score: float) -> Optional[IndexMatch]:
+        q = trigrams(norm)
+        n = len(q)
+        # общих триграмм не меньше overlap; eps — чтобы 0.6*10 не округлилось вверх до 7
+        overlap, longest = math.ceil(min_score * n - 1e-9), math.floor(n / min_score + 1e-9)
+        prefix = min(n, n - overlap + 1 + PREFIX_EXTRA)
+        rare = sorted(q, key=lambda g: len(self._postings.get(g, ())))[:prefix]
+        ids, seen = np.unique(np.concatenate([self._posting(g) for g in rare]), return_counts=True)
+        sizes = self._sizes[ids]
+        # Jaccard >= t <=> общих >= t/(1+t)*(|q|+|g|); вне префикса общих не больше n - prefix
+        keep = (sizes >= overlap) & (sizes <= longest) & (
+            (seen + n - prefix) * (1 + min_score) >= min_score * (n + sizes) - 1e-9
+        )
+
+        best: Optional[Tuple[float, str]] = None
+        for eid in ids[keep].tolist():
+            other, grams = self._entries[eid]
+            common = len(q & grams)
+            score = common / (len(q) + len(grams) - common)
+            if score >= min_score and (best is None or score > best[0]):
+                best = (score, other)
+        if best is None:
+            return None
+        hit = self._unique(self._names[best[1]])
+        return IndexMatch(hit[0], hit[1], best[0], "fuzzy") if hit else None
+
+
+def import_csv(path: Path, inn_col: str, name_col: str, domain_col: str, source: str, db: Path = INN_CACHE_PATH) -> int:
+    """Выгрузка ЕГРЮЛ/открытых данных в CSV (ИНН, название, опционально сайт) -> таблица bulk."""
+    db.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db))
+    conn.executescript(SCHEMA)
+    rows = 0
+    with path.open(encoding="utf-8", newline="") as fh, conn:
+        batch = []
+        for r in csv.DictReader(fh):
+            inn = (r.get(inn_col) or "").strip()
+            if not inn:
+                continue
+            batch.append((inn, (r.get(name_col) or "").strip(), normalize_domain(r.get(domain_col) or ""), source))
+            if len(batch) >= 10_000:
+                conn.executemany("INSERT INTO bulk (inn, name, domain, source) VALUES (?, ?, ?, ?)", batch)
+                rows += len(batch)
+                batch = []
+        conn.executemany("INSERT INTO bulk (inn, name, domain, source) VALUES (?, ?, ?, ?)", batch)
+        rows += len(batch)
+    conn.close()
+    return rows
+
+
+def load_bulk(index: InnIndex, conn: sqlite3.Connection) -> int:
+    n = 0
+    for inn, name, domain, source in conn.execute("SELECT inn, name, domain, source FROM bulk"):
+        index.add(inn, name, domain, source)
+        n += 1
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальный индекс домен/название -> ИНН")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    imp = sub.add_parser("import", help="загрузить CSV (ЕГРЮЛ, открытые данные) в индекс")
+    imp.add_argument("path", type=Path)
+    imp.add_argument("--inn-col", default="inn")
+    imp.add_argument("--name-col", default="name")
+    imp.add_argument("--domain-col", default="site")
+    imp.add_argument("--source", default="egrul")
+
+    look = sub.add_parser("lookup", help="проверить, что ответит индекс")
+    look.add_argument("name")
+    look.add_argument("--site", default="")
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        n = import_csv(args.path, args.inn_col, args.name_col, args.domain_col, args.source)
+        print(f"Imported: {n} rows -> {INN_CACHE_PATH}")
+        return
+
+    from inn_resolver import LocalCache  # резолвер сам собирает индекс из всех источников
+
+    started = time.perf_counter()
+    cache = LocalCache()
+    print(f"Index: {len(cache.index)} names, built in {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    match = cache.index.lookup(normalize_domain(args.site), args.name)
+    print(match, f"({(time.perf_counter() - started) * 1e6:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from tqdm import tqdm
+
+import storage
+from dadata_client import DadataClient
+from enrich_inn_rusprofile_v2 import choose_best_card_and_inn, clean_name, domain_from_site
+from inn_index import INN_CACHE_PATH, SCHEMA, InnIndex, load_bulk, normalize_domain, normalize_name
+
+# ИНН у домена/названия меняется редко; "не нашли" не кэшируем — это решают источники
+INN_CACHE_TTL = 90 * 24 * 3600
+# таблицы прежних enrich_inn_* (ручные прогоны): их ИНН тоже идут в индекс
+INDEX_TABLES = (
+    "companies_stage4", "companies_stage4_v2", "companies_stage5",
+    "companies_stage5_v2", "companies_stage6_dadata_domain",
+)
+
+WORKERS = 8
+# DaData по названию: ниже этой похожести названия ответ — лишь запасной вариант
+NAME_MATCH = 0.75
+
+INN_WEIGHTS_10 = (2, 4, 10, 3, 5, 9, 4, 6, 8)
+INN_WEIGHTS_11 = (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+INN_WEIGHTS_12 = (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+INN_FORMAT = re.compile(r"^(\d{10}|\d{12})$")
+
+
+def _check_digit(digits: Sequence[int], weights: Sequence[int]) -> int:
+    return sum(d * w for d, w in zip(digits, weights)) % 11 % 10
+
+
+def valid_inn(inn: str) -> bool:
+    """Формат и контрольные цифры ИНН (10 — юрлицо, 12 — ИП/физлицо)."""
+    if not INN_FORMAT.match(inn or ""):
+        return False
+    d = [int(c) for c in inn]
+    if len(d) == 10:
+        return _check_digit(d, INN_WEIGHTS_10) == d[9]
+    return _check_digit(d, INN_WEIGHTS_11) == d[10] and _check_digit(d, INN_WEIGHTS_12) == d[11]
+
+
+@dataclass(frozen=True)
+class Company:
+    name: str
+    site: str = ""
+    site_inn: str = ""
+
+    @property
+    def domain(self) -> str:
+        return domain_from_site(self.site)
+
+
+@dataclass(frozen=True)
+class InnHit:
+    """
+    confident=False — ИНН похож на правду, но следующий источник может найти лучше.
+    by_name — источник сверил само название (а не только домен): лишь такие ответы
+    LocalCache запоминает по названию, иначе один ИНН расползается на тёзок.
+    """
+    inn: str
+    source: str
+    confident: bool = True
+    detail: str = ""
+    by_name: bool = False
+
+
+class InnSource:
+    name = ""
+    cost = 0
+
+    def lookup(self, company: Company) -> Optional[InnHit]:
+        raise NotImplementedError
+
+
+class SiteSource(InnSource):
+    """ИНН, который enrich_site_features уже достал с сайта (taxID из JSON-LD или текст "ИНН ...")."""
+    name = "site"
+    cost = 0
+
+    def lookup(self, company: Company) -> Optional[InnHit]:
+        inn = (company.site_inn or "").strip()
+        if not inn:
+            return None
+        return InnHit(inn, self.name, confident=valid_inn(inn), detail=company.site)
+
+
+class LocalCache(InnSource):
+    """
+    Локальный индекс (inn_index) — до любых сетевых запросов. В нём: уверенные ответы
+    прошлых прогонов, bulk-импорт ЕГРЮЛ/открытых данных и ИНН из таблиц прежних стадий (по домену).
+    Домен и точное название — уверенный ответ; похожее название — только если тот же ИНН
+    есть и у домена компании (домен неоднозначен), иначе запасной: похожие названия бывают у разных фирм.
+    """
+    name = "cache"
+    cost = 1
+
+    def __init__(self, path: Path = INN_CACHE_PATH, ttl: float = INN_CACHE_TTL, tables: Sequence[str] = INDEX_TABLES) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        # _lock — только индекс в памяти (поиск ~0.4 мс), запись в sqlite — под своим замком,
+        # чтобы воркеры резолвера не ждали диск ради чтения индекса
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+        self.index = InnIndex()
+        load_bulk(self.index, self._conn)
+        for table in tables:
+            self._load_table(table)
+        fresh = time.time() - ttl
+        for key, inn, source in self._conn.execute("SELECT key, inn, source FROM inn WHERE stored_at >= ?", (fresh,)):
+            kind, _, value = key.partition(":")
+            if kind == "domain":
+                self.index.add(inn, domain=value, source=source)
+            else:
+                self.index.add(inn, name=value, source=source)
+
+    def _load_table(self, table: str) -> None:
+        # только по домену: ИНН в старых таблицах часто — непроверенная догадка DaData/rusprofile
+        # по названию, а ключ по названию раздал бы её всем тёзкам как уверенный ответ
+        if not storage.exists(table):
+            return
+        df = storage.read_table(table, columns=["site", "inn", "inn_source"])
+        for r in df.to_dict("records"):
+            inn = (r.get("inn") or "").strip()
+            domain = normalize_domain(r.get("site") or "")
+            if domain and valid_inn(inn):
+                self.index.add(inn, domain=domain, source=r.get("inn_source") or table)
+
+    @staticmethod
+    def keys(company: Company, hit: InnHit) -> List[str]:
+        keys = []
+        if company.domain:
+            keys.append("domain:" + normalize_domain(company.site))
+        if hit.by_name and normalize_name(company.name):
+            keys.append("name:" + normalize_name(company.name))
+        return keys
+
+    def lookup(self, company: Company) -> Optional[InnHit]:
+        domain = normalize_domain(company.site)
+        with self._lock:
+            m = self.index.lookup(domain, company.name)
+            confident = m is not None and (m.how != "fuzzy" or m.inn in self.index.domain_inns(domain))
+        if m is None:
+            return None
+        # в inn_source — откуда ИНН взялся изначально
+        return InnHit(m.inn, m.source, confident=confident, detail=m.how, by_name=m.how == "name")
+
+    def remember(self, company: Company, hit: InnHit) -> None:
+        now = time.time()
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO inn (key, inn, source, stored_at) VALUES (?, ?, ?, ?)",
+                [(key, hit.inn, hit.source, now) for key in self.keys(company, hit)],
+            )
+        with self._lock:
+            self.index.add(hit.inn, company.name if hit.by_name else "", normalize_domain(company.site), hit.source)
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._conn.close()
+
+
+class DadataSource(InnSource):
+    """
+    suggest/party каскадом: домен, сырое название, очищенное название.
+    По домену ответ уверенный; по названию — если название из DaData похоже на наше.
+    """
+    name = "dadata"
+    cost = 2
+
+    def __init__(self, client: DadataClient) -> None:
+        self.client = client
+
+    def lookup(self, company: Company) -> Optional[InnHit]:
+        want = clean_name(company.name)
+        queries = [(company.domain, True), (company.name.strip(), False)]
+        if want and want != company.name.strip().lower():
+            queries.append((want, False))
+
+        fallback: Optional[InnHit] = None
+        for query, by_domain in queries:
+            if not query:
+                continue
+            for s in self.client.suggest_party(query, count=8):
+                inn = ((s.get("data") or {}).get("inn") or "").strip()
+                if not inn:
+                    continue
+                similar = SequenceMatcher(None, want, clean_name(s.get("value") or "")).ratio()
+                hit = InnHit(
+                    inn, self.name, confident=by_domain or similar >= NAME_MATCH, detail=query, by_name=similar >= NAME_MATCH,
+                )
+                if hit.confident:
+                    return hit
+                fallback = fallback or hit
+                break
+        return fallback
+
+
+class RusprofileSource(InnSource):
+    """
+    Поиск rusprofile с ранжированием выдачи (enrich_inn_rusprofile_v2). Самый дорогой: скрейпинг.
+    Наружу не видно, сверено ли название (или взят первый кандидат выдачи) — по названию не кэшируем.
+    """
+    name = "rusprofile"
+    cost = 3
+
+    def __init__(self, concurrency: int = 1) -> None:
+        # rusprofile скрейпим вежливо: параллельно идут другие источники, а не он сам
+        self._slots = threading.Semaphore(concurrency)
+
+    def lookup(self, company: Company) -> Optional[InnHit]:
+        with self._slots:
+            inn, card_url = choose_best_card_and_inn(company.name, company.site)
+        if not inn:
+            return None
+        return InnHit(inn, self.name, confident=valid_inn(inn), detail=card_url)
+
+
+class InnResolver:
+    """
+    Источники по возрастанию стоимости; первый уверенный ответ останавливает каскад.
+    Неуверенный ответ запоминается и отдаётся, только если дальше ничего уверенного нет.
+    Уверенные ответы внешних источников оседают в LocalCache.
+    """
+
+    def __init__(self, sources: List[InnSource], cache: Optional[LocalCache] = None, workers: int = WORKERS) -> None:
+        self.sources = sorted(sources, key=lambda s: s.cost)
+        self.cache = cache
+        self.workers = workers
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def resolve(self, company: Company) -> Optional[InnHit]:
+        return self._resolve(company)[0]
+
+    def _resolve(self, company: Company) -> Tuple[Optional[InnHit], bool]:
+        # второе значение — какой-то источник упал (ответ может быть неполным)
+        fallback: Optional[InnHit] = None
+        failed = False
+        for source in self.sources:
+            try:
+                hit = source.lookup(company)
+            except Exception as e:
+                self._count(f"{source.name}_errors")
+                print("Failed:", source.name, company.name, repr(e))
+                failed = True
+                continue
+            if hit is None or not INN_FORMAT.match(hit.inn):
+                continue
+            if not hit.confident:
+                fallback = fallback or hit
+                continue
+            self._count(source.name)
+            if self.cache is not None and source is not self.cache:
+                self.cache.remember(company, hit)
+            return hit, False
+        self._count("fallback" if fallback else "not_found")
+        return fallback, failed
+
+    def resolve_many(
+        self,
+        companies: List[Company],
+        on_done: Optional[Callable[[int, Optional[InnHit]], None]] = None,
+    ) -> List[Optional[InnHit]]:
+        """
+        on_done(i, hit) — сразу по готовности каждой компании, из потока пула (для журнала).
+        Если по дороге упал источник, on_done не зовётся: такую компанию стоит спросить снова.
+        """
+        def one(i: int) -> Optional[InnHit]:
+            hit, failed = self._resolve(companies[i])
+            if on_done is not None and not failed:
+                on_done(i, hit)
+            return hit
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(tqdm(pool.map(one, range(len(companies))), total=len(companies), desc="INN"))
+
+
+def default_resolver(dadata_token: str = "", workers: int = WORKERS) -> InnResolver:
+    cache = LocalCache()
+    sources: List[InnSource] = [SiteSource(), cache, RusprofileSource()]
+    if dadata_token:
+        sources.append(DadataSource(DadataClient(dadata_token)))
+    return InnResolver(sources, cache=cache, workers=workers)
+
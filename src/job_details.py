@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -9,21 +9,24 @@ import pandas as pd
 import requests
 from tqdm import tqdm
 
+import metrics
+import storage
+from http_client import http_request
+from rate_limit import TokenBucket, parse_retry_after
+
 HH_API = "https://api.hh.ru"
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_RAW = BASE_DIR / "data" / "raw"
 DATA_RAW.mkdir(parents=True, exist_ok=True)
 
-CONTACT_EMAIL = "ojdupool2004@mail.ru"
+# целевая скорость к HH и число параллельных запросов
+RPS = 5.0
+WORKERS = 8
+MAX_RETRIES_429 = 5
 
-def get_hh(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    headers = {
-        "HH-User-Agent": f"LeadSniperTest/1.0 (contact: {CONTACT_EMAIL})",
-        "User-Agent": f"LeadSniperTest/1.0 (contact: {CONTACT_EMAIL})",
-        "Accept": "application/json",
-    }
-    r = requests.get(url, params=params, headers=headers, timeout=30)
+def get_hh(url: str, params: Optional[Dict[str, Any]] = None, source: str = "hh_vacancy") -> Dict[str, Any]:
+    r = http_request("GET", url, source=source, params=params)
     r.raise_for_status()
     data = r.json()
     if not isinstance(data, dict):
@@ -44,62 +47,90 @@ def normalize_vacancy_id(x: Any) -> Optional[str]:
 def fetch_vacancy_detail(vacancy_id: str) -> Dict[str, Any]:
     return get_hh(f"{HH_API}/vacancies/{vacancy_id}")
 
+def detail_row(v: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "vacancy_id": v.get("id"),
+        "name": v.get("name"),
+        "employer_id": (v.get("employer") or {}).get("id"),
+        "published_at": v.get("published_at"),
+        "description": v.get("description"),
+        "schedule": (v.get("schedule") or {}).get("name"),
+        "employment": (v.get("employment") or {}).get("name"),
+        "alternate_url": v.get("alternate_url"),
+    }
+
+def fetch_detail_row(vacancy_id: str, bucket: TokenBucket) -> Dict[str, Any]:
+    """
+    Одна вакансия -> одна строка (как раньше, включая error/status).
+    На 429 ставим на паузу весь bucket по Retry-After и пробуем снова.
+    """
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            return detail_row(fetch_vacancy_detail(vacancy_id))
+        except requests.HTTPError as e:
+            status = getattr(e.response, "status_code", None)
+            if status == 429 and attempt < MAX_RETRIES_429:
+                attempt += 1
+                retry_after = e.response.headers.get("Retry-After") if e.response is not None else None
+                bucket.pause(parse_retry_after(retry_after, default=2.0 * attempt))
+                continue
+            return {"vacancy_id": vacancy_id, "error": str(e), "status": status}
+        except Exception as e:
+            return {"vacancy_id": vacancy_id, "error": repr(e)}
+
+def fetch_details(todo: List[str], rps: float = RPS, workers: int = WORKERS) -> List[Dict[str, Any]]:
+    bucket = TokenBucket(rps, burst=workers)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # map сохраняет порядок todo
+        rows = list(tqdm(
+            pool.map(lambda vid: fetch_detail_row(vid, bucket), todo),
+            total=len(todo),
+            desc="Fetch vacancy details",
+        ))
+    elapsed = time.monotonic() - started
+    if todo and elapsed > 0:
+        print(f"Fetched {len(todo)} in {elapsed:.1f}s ({len(todo) / elapsed:.2f} req/s)")
+    return rows
+
 def main() -> None:
-    seeds_path = DATA_RAW / "vacancies_seeds.csv"
-    out_path = DATA_RAW / "vacancies_details.csv"
+    seeds_name = "raw/vacancies_seeds"
+    out_name = "raw/vacancies_details"
 
-    seeds = pd.read_csv(seeds_path, dtype=str, keep_default_na=False)
+    # из сидов нужен только vacancy_id
+    seeds = storage.read_table(seeds_name, columns=["vacancy_id"])
     seeds["vacancy_id_norm"] = seeds["vacancy_id"].apply(normalize_vacancy_id)
     seeds = seeds.dropna(subset=["vacancy_id_norm"]).copy()
 
-    # если файл деталей уже есть — не качаем повторно
-    if out_path.exists():
-        existing = pd.read_csv(out_path, dtype=str, keep_default_na=False)
-        if "vacancy_id" in existing.columns:
-            done = set(existing["vacancy_id"].astype(str).tolist())
-        else:
-            done = set()
+    # если файл деталей уже есть — не качаем повторно (описания для этого не читаем)
+    if storage.exists(out_name):
+        ids = storage.read_table(out_name, columns=["vacancy_id"])
+        done = set(ids["vacancy_id"].astype(str).tolist()) if "vacancy_id" in ids.columns else set()
     else:
-        existing = pd.DataFrame()
         done = set()
 
     todo = [vid for vid in seeds["vacancy_id_norm"].tolist() if vid not in done]
     print("Already have:", len(done))
     print("To fetch:", len(todo))
 
-    rows: List[Dict[str, Any]] = []
-    for vid in tqdm(todo, desc="Fetch vacancy details"):
-        try:
-            v = fetch_vacancy_detail(vid)
-            rows.append({
-                "vacancy_id": v.get("id"),
-                "name": v.get("name"),
-                "employer_id": (v.get("employer") or {}).get("id"),
-                "published_at": v.get("published_at"),
-                "description": v.get("description"),
-                "schedule": (v.get("schedule") or {}).get("name"),
-                "employment": (v.get("employment") or {}).get("name"),
-                "alternate_url": v.get("alternate_url"),
-            })
-            time.sleep(0.25 + random.random() * 0.25)
-        except requests.HTTPError as e:
-            rows.append({"vacancy_id": vid, "error": str(e), "status": getattr(e.response, "status_code", None)})
-            time.sleep(0.6)
-        except Exception as e:
-            rows.append({"vacancy_id": vid, "error": repr(e)})
-            time.sleep(0.6)
+    rows = fetch_details(todo)
 
     new_df = pd.DataFrame(rows)
 
-    if not existing.empty:
-        out = pd.concat([existing, new_df], ignore_index=True)
-    else:
-        out = new_df
+    # дописывать нечего — таблицу не трогаем (ни чтения, ни перезаписи, хэш для pipeline тот же)
+    if done and new_df.empty:
+        print(f"Nothing new, kept {len(done)} -> {storage.source_path(out_name)}")
+        return
+
+    # целиком старые детали читаем, только если есть что дописать
+    out = pd.concat([storage.read_table(out_name), new_df], ignore_index=True) if done else new_df
 
-    out.to_csv(out_path, index=False, encoding="utf-8")
+    out_path = storage.write_table(out, out_name)
     errors = int(out["error"].notna().sum()) if "error" in out.columns else 0
     print(f"Saved total: {len(out)} -> {out_path}")
     print("Total errors:", errors)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("job_details", main)
\ No newline at end of file
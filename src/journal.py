@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from evidence_store import engine_hash
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+JOURNAL_DIR = BASE_DIR / "data" / "journal"
+
+
+class Journal:
+    """
+    Append-only JSONL на стадию: строка = готовый результат по одному ключу (работодатель, сайт),
+    пишется сразу, с flush + fsync. Падение, бан или Ctrl-C теряют только строки в работе.
+    Первая строка — заголовок с хэшем кода стадии: код тот же — прогон продолжается (resume),
+    поменялся или resume=False — журнал начинается заново. После записи итоговой таблицы — finish().
+    """
+
+    def __init__(self, stage: str, code: Sequence[Path], resume: bool = True, path: Optional[Path] = None) -> None:
+        self.path = path or JOURNAL_DIR / f"{stage}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.engine = engine_hash(code)
+        self._lock = threading.Lock()
+        self._done: Dict[str, Dict[str, Any]] = {}
+
+        if resume and self._load():
+            self._fh = self.path.open("a", encoding="utf-8")
+        else:
+            self._fh = self.path.open("w", encoding="utf-8")
+            self._append({"engine": self.engine})
+        self.resumed = len(self._done)
+
+    def _load(self) -> bool:
+        if not self.path.exists():
+            return False
+        raw = self.path.read_bytes()
+        # хвост без \n — строка, которую не успели дописать: отрезаем
+        end = raw.rfind(b"\n") + 1
+        lines = raw[:end].decode("utf-8").splitlines()
+        if not lines or json.loads(lines[0]).get("engine") != self.engine:
+            return False
+        if end < len(raw):
+            with self.path.open("r+b") as fh:
+                fh.truncate(end)
+        for line in lines[1:]:
+            rec = json.loads(line)
+            self._done[rec["key"]] = rec
+        return True
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def get(self, key: str, inputs: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        """Результат из журнала, если ключ есть и посчитан по тем же входам (сайт, название...)."""
+        rec = self._done.get(key)
+        if rec is None or rec["in"] != list(inputs):
+            return None
+        return rec["out"]
+
+    def write(self, key: str, out: Dict[str, Any], inputs: Sequence[Any] = ()) -> None:
+        rec = {"key": key, "in": list(inputs), "out": out}
+        with self._lock:
+            self._done[key] = rec
+            self._append(rec)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+    def finish(self) -> None:
+        # итог уже в таблице — следующий прогон начнёт с чистого листа
+        self.close()
+        self.path.unlink(missing_ok=True)
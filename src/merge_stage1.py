@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from pathlib import Path
-import pandas as pd
+
+import metrics
+import storage
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_RAW = BASE_DIR / "data" / "raw"
@@ -10,12 +12,12 @@ DATA_RAW.mkdir(parents=True, exist_ok=True)
 DATA_OUT.mkdir(parents=True, exist_ok=True)
 
 def main() -> None:
-    evidence_path = DATA_RAW / "support_evidence_jobs.csv"
-    employers_path = DATA_RAW / "employers_seeds.csv"
-    out_path = DATA_OUT / "companies_stage1.csv"
-
-    ev = pd.read_csv(evidence_path, dtype=str, keep_default_na=False)
-    emp = pd.read_csv(employers_path, dtype=str, keep_default_na=False)
+    # агрегат по работодателям (extract_support_from_vc) — берём только то, что идёт в stage1
+    ev = storage.read_table(
+        "raw/support_evidence_jobs",
+        columns=["employer_id", "support_team_size_min", "support_evidence", "evidence_url", "evidence_type", "mentions_24_7"],
+    )
+    emp = storage.read_table("raw/employers_seeds", columns=["employer_id", "employer_name", "employer_url"])
 
     # Мёрж по employer_id
     merged = ev.merge(
@@ -66,8 +68,8 @@ def main() -> None:
     ]
     merged = merged[cols]
 
-    merged.to_csv(out_path, index=False, encoding="utf-8")
+    out_path = storage.write_table(merged, "companies_stage1")
     print(f"Saved: {len(merged)} rows -> {out_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    metrics.run_stage("merge_stage1", main)
\ No newline at end of file
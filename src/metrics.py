@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import profiling
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+# каталог можно отдать textfile collector'у node_exporter: METRICS_DIR=/var/lib/node_exporter/textfile
+METRICS_DIR = Path(os.getenv("METRICS_DIR") or BASE_DIR / "data" / "metrics")
+PREFIX = "leadsniper_"
+
+# секунды: сеть — от десятков мс до таймаута, анализ — от десятков мкс
+HTTP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CPU_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+
+HELP = {
+    "http_requests_total": "HTTP-запросы в сеть (без ответов из кэша) по хосту и статусу",
+    "http_request_duration_seconds": "время до ответа, по каждой попытке",
+    "http_response_bytes_total": "байты тел ответов из сети (после распаковки)",
+    "http_retries_total": "повторы запросов (сетевые ошибки и 5xx)",
+    "http_cache_total": "обращения к HTTP-кэшу: hit / revalidated / miss",
+    "analysis_seconds": "время CPU-функций анализа (регэкспы, парсинг)",
+    "rows_written_total": "строки, записанные в таблицы storage",
+    "stage_duration_seconds": "длительность последнего прогона стадии",
+    "stage_success": "1 — последний прогон стадии завершился без ошибки",
+    "stage_last_run_timestamp_seconds": "когда закончился последний прогон стадии",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Histogram:
+    buckets: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        # верхняя граница корзины, куда попал q-й квантиль (для +Inf — последняя граница)
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class Registry:
+    """Счётчики и гистограммы процесса. Потокобезопасно; воркеры пула сливают своё через merge()."""
+
+    def __init__(self) -> None:
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = HTTP_BUCKETS, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram(buckets)
+            h.observe(value)
+
+    def take(self) -> Dict[str, Any]:
+        """Снять накопленное и обнулить (для передачи из воркера в родителя)."""
+        with self._lock:
+            snap = {"counters": self.counters, "histograms": self.histograms}
+            self.counters, self.histograms = {}, {}
+        return snap
+
+    def merge(self, snap: Dict[str, Any]) -> None:
+        with self._lock:
+            for key, value in snap["counters"].items():
+                self.counters[key] = self.counters.get(key, 0.0) + value
+            for key, h in snap["histograms"].items():
+                mine = self.histograms.get(key)
+                if mine is None:
+                    self.histograms[key] = h
+                    continue
+                mine.counts = [a + b for a, b in zip(mine.counts, h.counts)]
+                mine.sum += h.sum
+                mine.count += h.count
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+
+
+def timed(fn: F) -> F:
+    """
+    Время вызова fn -> analysis_seconds{fn=...}. Для CPU-функций анализа, не для сетевых.
+    Под --profile заодно попадает в отчёт о пиках памяти (profiling.measured).
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return profiling.measured(name, fn, args, kwargs)
+        finally:
+            observe("analysis_seconds", time.perf_counter() - started, CPU_BUCKETS, fn=name)
+
+    return wrapper  # type: ignore[return-value]
+
+
+class WorkerTask:
+    """
+    Обёртка задачи для ProcessPoolExecutor: возвращает (результат, метрики воркера).
+    Родитель разворачивает её через unwrap() — метрики из дочерних процессов не теряются.
+    """
+
+    def __init__(self, fn: Callable[..., Any]) -> None:
+        self.fn = fn
+
+    def __call__(self, *args: Any) -> Tuple[Any, Dict[str, Any]]:
+        # после fork в воркере — копия метрик родителя: её не отдаём, иначе посчитаем дважды
+        if REGISTRY.pid != os.getpid():
+            REGISTRY.take()
+            REGISTRY.pid = os.getpid()
+        result = self.fn(*args)
+        return result, REGISTRY.take()
+
+
+def unwrap(item: Tuple[Any, Dict[str, Any]]) -> Any:
+    result, snap = item
+    REGISTRY.merge(snap)
+    profiling.pool_task()
+    return result
+
+
+def _fmt_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')  # noqa: E731
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(stage: str, gauges: Dict[str, float]) -> str:
+    """Текстовый формат Prometheus; у всех рядов метка stage — файлы разных стадий не конфликтуют."""
+    st = (("stage", stage),)
+    with REGISTRY._lock:
+        counters = dict(REGISTRY.counters)
+        histograms = {k: Histogram(h.buckets, list(h.counts), h.sum, h.count) for k, h in REGISTRY.histograms.items()}
+
+    lines: List[str] = []
+    seen: set = set()
+
+    def header(name: str, kind: str) -> None:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for name, value in sorted(gauges.items()):
+        header(name, "gauge")
+        lines.append(f"{PREFIX}{name}{_fmt_labels(st)} {value}")
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{PREFIX}{name}{_fmt_labels(st + labels)} {value:.15g}")
+    for (name, labels), h in sorted(histograms.items(), key=lambda kv: kv[0]):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{PREFIX}{name}_bucket{_fmt_labels(st + labels, (('le', le),))} {cumulative}")
+        lines.append(f"{PREFIX}{name}_sum{_fmt_labels(st + labels)} {h.sum:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_fmt_labels(st + labels)} {h.count}")
+    return "\n".join(lines) + "\n"
+
+
+def summary(stage: str, seconds: float, ok: bool) -> Dict[str, Any]:
+    """JSON-сводка прогона: по хостам, кэшу, функциям анализа и таблицам."""
+    with REGISTRY._lock:
+        counters = dict(REGISTRY.counters)
+        histograms = dict(REGISTRY.histograms)
+
+    http: Dict[str, Dict[str, Any]] = {}
+    cache: Dict[str, Dict[str, int]] = {}
+    rows: Dict[str, int] = {}
+    for (name, labels), value in counters.items():
+        lab = dict(labels)
+        if name.startswith("http_") and name != "http_cache_total":
+            host = http.setdefault(lab["host"], {"requests": 0, "statuses": {}, "bytes": 0, "retries": 0})
+            if name == "http_requests_total":
+                host["requests"] += int(value)
+                host["statuses"][lab["status"]] = host["statuses"].get(lab["status"], 0) + int(value)
+            elif name == "http_response_bytes_total":
+                host["bytes"] += int(value)
+            elif name == "http_retries_total":
+                host["retries"] += int(value)
+        elif name == "http_cache_total":
+            cache.setdefault(lab["source"], {})[lab["result"]] = int(value)
+        elif name == "rows_written_total":
+            rows[lab["table"]] = rows.get(lab["table"], 0) + int(value)
+    for src in cache.values():
+        total = sum(src.values())
+        src["hit_rate"] = round((src.get("hit", 0) + src.get("revalidated", 0)) / total, 3) if total else 0.0
+
+    analysis: Dict[str, Dict[str, Any]] = {}
+    for (name, labels), h in histograms.items():
+        lab = dict(labels)
+        stats = {
+            "calls": h.count,
+            "seconds": round(h.sum, 3),
+            "mean_ms": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+            "p50_le_ms": round(h.quantile(0.5) * 1000, 3),
+            "p95_le_ms": round(h.quantile(0.95) * 1000, 3),
+        }
+        if name == "http_request_duration_seconds":
+            http.setdefault(lab["host"], {"requests": 0, "statuses": {}, "bytes": 0, "retries": 0})["latency"] = stats
+        elif name == "analysis_seconds":
+            analysis[lab["fn"]] = stats
+
+    written = sum(rows.values())
+    return {
+        "stage": stage,
+        "ok": ok,
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "rows_per_s": round(written / seconds, 2) if seconds > 0 else 0.0,
+        "http": http,
+        "cache": cache,
+        "analysis": analysis,
+    }
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # textfile collector не должен увидеть недописанный файл
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def export(stage: str, seconds: float, ok: bool, out_dir: Optional[Path] = None) -> Path:
+    out_dir = out_dir or METRICS_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    gauges = {
+        "stage_duration_seconds": round(seconds, 3),
+        "stage_success": int(ok),
+        "stage_last_run_timestamp_seconds": int(time.time()),
+    }
+    _write_atomic(out_dir / f"{stage}.prom", render_prometheus(stage, gauges))
+    path = out_dir / f"{stage}.json"
+    _write_atomic(path, json.dumps(summary(stage, seconds, ok), ensure_ascii=False, indent=2))
+    return path
+
+
+def run_stage(stage: str, main: Callable[[], Any]) -> None:
+    """
+    Точка входа стадии: main() + метрики прогона (и при падении — с stage_success=0).
+    --profile снимается с argv до argparse стадии и включает profiling.session.
+    """
+    profile = "--profile" in sys.argv
+    if profile:
+        sys.argv = [a for a in sys.argv if a != "--profile"]
+    started = time.monotonic()
+    ok = False
+    try:
+        with profiling.session(stage) if profile else nullcontext():
+            main()
+        ok = True
+    finally:
+        path = export(stage, time.monotonic() - started, ok)
+        print(f"Metrics: {path.with_suffix('.prom')}, {path}")
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Container, Dict, List, Pattern, Set, Tuple
+
+
+@dataclass(frozen=True)
+class Detector:
+    """
+    Один признак страницы.
+    anchors — литералы в нижнем регистре; любое совпадение regex обязано содержать хотя бы один из них.
+    anchored — совпадение всегда начинается с якоря (иначе, как у email, regex гоняем с начала строки).
+    """
+    name: str
+    regex: Pattern[str]
+    anchors: Tuple[str, ...]
+    group: int = 0
+    anchored: bool = True
+
+
+@dataclass(frozen=True)
+class Hit:
+    feature: str
+    start: int
+    end: int
+    value: str
+
+
+class MultiMatcher:
+    """
+    Поиск многих признаков за один общий проход: все якоря склеены в одну альтернацию
+    без IGNORECASE и ищутся по s.lower() (re пропускает неподходящие позиции по
+    charset-префиксу — по сути Aho-Corasick на C). Полный regex запускается только
+    для признаков, чей якорь встретился, и начиная с позиции первого якоря,
+    поэтому отсутствующие признаки страницу повторно не сканируют.
+
+    Результат для каждого признака совпадает с rx.finditer(s) (или rx.search для first_only).
+    """
+
+    def __init__(self, detectors: List[Detector]) -> None:
+        self.detectors = detectors
+        self._by_anchor: Dict[str, List[Detector]] = {}
+        for d in detectors:
+            for a in d.anchors:
+                self._by_anchor.setdefault(a, []).append(d)
+
+        anchors = sorted(self._by_anchor, key=len, reverse=True)
+        alternation = "|".join(re.escape(a) for a in anchors)
+        self._anchor_re = re.compile(alternation)
+        # запасной вариант, если lower() поменял длину строки (редкие символы вроде "İ")
+        self._anchor_re_ci = re.compile(alternation, re.IGNORECASE)
+
+        # finditer по якорям не перекрывается: якорь, который может начинаться
+        # внутри другого, считаем "возможно есть" вместе с внешним
+        self._overlaps: Dict[str, List[str]] = {}
+        for a in anchors:
+            for k in range(1, len(a)):
+                tail = a[k:]
+                for b in anchors:
+                    if b.startswith(tail) or tail.startswith(b):
+                        self._overlaps.setdefault(a, []).append(b)
+
+    def _first_positions(self, s: str) -> Dict[str, int]:
+        # позиция первого вхождения каждого детектора (по его якорям)
+        low = s.lower()
+        if len(low) == len(s):
+            it = self._anchor_re.finditer(low)
+        else:
+            it = self._anchor_re_ci.finditer(s)
+
+        first: Dict[str, int] = {}
+        seen: Set[str] = set()
+        pending = len(self.detectors)
+        for m in it:
+            anchor = m.group(0).lower()
+            if anchor in seen:
+                continue
+            seen.add(anchor)
+            for a in [anchor, *self._overlaps.get(anchor, ())]:
+                for d in self._by_anchor[a]:
+                    if d.name not in first:
+                        first[d.name] = m.start()
+                        pending -= 1
+            if not pending:
+                break
+        return first
+
+    def scan(self, s: str, first_only: Container[str] = ()) -> List[Hit]:
+        """
+        Все совпадения всех признаков (по позиции). Для признаков из first_only
+        возвращается только первое совпадение.
+        """
+        first = self._first_positions(s)
+        hits: List[Hit] = []
+        for d in self.detectors:
+            pos = first.get(d.name)
+            if pos is None:
+                continue
+            start = pos if d.anchored else 0
+            if d.name in first_only:
+                m = d.regex.search(s, start)
+                if m:
+                    hits.append(Hit(d.name, m.start(), m.end(), m.group(d.group)))
+            else:
+                for m in d.regex.finditer(s, start):
+                    hits.append(Hit(d.name, m.start(), m.end(), m.group(d.group)))
+
+        hits.sort(key=lambda h: h.start)
+        return hits
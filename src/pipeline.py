@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import storage
+from export_csv import EXPORTS
+
+SRC_DIR = Path(__file__).resolve().parent
+BASE_DIR = SRC_DIR.parent
+DATA_DIR = BASE_DIR / "data"
+STATE_PATH = DATA_DIR / "pipeline_state.json"
+LOGS_DIR = DATA_DIR / "logs"
+
+WORKERS = 4
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    Стадия = скрипт src/<name>.py. inputs/outputs — таблицы storage ("raw/vacancies_details")
+    или файлы с расширением, относительно data/.
+    Входы без стадии-производителя (или их нет вовсе, как у collect_seeds) — внешние:
+    такую стадию перезапускаем только при смене кода или по --force.
+    """
+    name: str
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    args: Tuple[str, ...] = ()
+
+
+STAGES: List[Stage] = [
+    Stage("collect_seeds", (), ("raw/employers_seeds", "raw/vacancies_seeds")),
+    Stage("job_details", ("raw/vacancies_seeds",), ("raw/vacancies_details",)),
+    Stage("filter_support", ("raw/vacancies_details",), ("raw/vacancies_support_only",)),
+    Stage("extract_support_from_vc", ("raw/vacancies_support_only",), ("raw/support_evidence_jobs",)),
+    Stage("merge_stage1", ("raw/support_evidence_jobs", "raw/employers_seeds"), ("companies_stage1",)),
+    Stage("enrich_company_site_from_hh", ("companies_stage1",), ("companies_stage2",)),
+    Stage("enrich_site_features", ("companies_stage2",), ("companies_stage3",)),
+    # ИНН — одним каскадом (сайт -> кэш -> DaData -> rusprofile); прежние enrich_inn_* остались для ручных прогонов
+    Stage("resolve_inn", ("companies_stage3",), ("companies_stage5_inn",)),
+    Stage("export_csv", tuple(EXPORTS), tuple(f"export/{name}.csv" for name in EXPORTS)),
+]
+
+
+def artifact_path(name: str) -> Path:
+    return DATA_DIR / name if Path(name).suffix else storage.source_path(name)
+
+
+def file_hash(path: Path) -> Optional[str]:
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def local_imports(path: Path) -> Set[str]:
+    # модули из src/, которые импортирует скрипт (http_client, page_scan, ...)
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return {n for n in names if (SRC_DIR / f"{n}.py").exists()}
+
+
+def code_hash(module: str) -> str:
+    """Хэш исходника стадии и всех её локальных зависимостей (транзитивно)."""
+    seen: Set[str] = set()
+    todo = [module]
+    while todo:
+        m = todo.pop()
+        if m in seen:
+            continue
+        seen.add(m)
+        todo.extend(local_imports(SRC_DIR / f"{m}.py"))
+    h = hashlib.sha256()
+    for m in sorted(seen):
+        h.update(m.encode())
+        h.update(b"\0")
+        h.update((SRC_DIR / f"{m}.py").read_bytes())
+    return h.hexdigest()
+
+
+def load_state() -> Dict[str, Dict]:
+    if not STATE_PATH.exists():
+        return {}
+    return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+
+
+def save_state(state: Dict[str, Dict]) -> None:
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, STATE_PATH)
+
+
+class Pipeline:
+    """
+    DAG из STAGES: рёбра — по совпадению outputs одной стадии с inputs другой.
+    Стадию пропускаем, если хэши её входов, кода и аргументов те же, что при прошлом
+    успешном запуске, а выходы на месте и не менялись. Независимые ветки идут параллельно.
+    """
+
+    def __init__(self, stages: List[Stage], workers: int = WORKERS) -> None:
+        self.stages = {s.name: s for s in stages}
+        self.workers = workers
+        producers = {out: s.name for s in stages for out in s.outputs}
+        self.deps: Dict[str, Set[str]] = {
+            s.name: {producers[i] for i in s.inputs if i in producers and producers[i] != s.name}
+            for s in stages
+        }
+        self.state = load_state()
+        self._lock = threading.Lock()
+
+    def ancestors(self, names: Set[str]) -> Set[str]:
+        out: Set[str] = set()
+        todo = list(names)
+        while todo:
+            n = todo.pop()
+            if n not in out:
+                out.add(n)
+                todo.extend(self.deps[n])
+        return out
+
+    def fingerprint(self, stage: Stage) -> Dict:
+        return {
+            "code": code_hash(stage.name),
+            "args": list(stage.args),
+            "inputs": {i: file_hash(artifact_path(i)) for i in stage.inputs},
+        }
+
+    def up_to_date(self, stage: Stage, fp: Dict) -> bool:
+        prev = self.state.get(stage.name)
+        if not prev or any(prev.get(k) != fp[k] for k in ("code", "args", "inputs")):
+            return False
+        for o in stage.outputs:
+            h = file_hash(artifact_path(o))
+            if h is None or prev["outputs"].get(o) != h:
+                return False
+        return True
+
+    def run_stage(self, stage: Stage, fp: Dict) -> Tuple[bool, float]:
+        LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        started = time.monotonic()
+        with (LOGS_DIR / f"{stage.name}.log").open("w", encoding="utf-8") as log:
+            proc = subprocess.run(
+                [sys.executable, str(SRC_DIR / f"{stage.name}.py"), *stage.args],
+                cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+            )
+        elapsed = time.monotonic() - started
+        if proc.returncode != 0:
+            return False, elapsed
+        with self._lock:
+            self.state[stage.name] = {
+                **fp,
+                "outputs": {o: file_hash(artifact_path(o)) for o in stage.outputs},
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "seconds": round(elapsed, 1),
+            }
+            save_state(self.state)
+        return True, elapsed
+
+    def run(self, targets: Optional[Set[str]] = None, force: Set[str] = frozenset(), dry_run: bool = False) -> bool:
+        selected = self.ancestors(targets) if targets else set(self.stages)
+        pending = [n for n in self.stages if n in selected]
+        done: Set[str] = set()
+        rerun: Set[str] = set()
+        failed: Set[str] = set()
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pending or running:
+                # всё, у чего зависимости готовы: либо пропускаем сразу, либо отдаём в пул
+                for name in list(pending):
+                    deps = self.deps[name] & selected
+                    if deps & failed:
+                        pending.remove(name)
+                        failed.add(name)
+                        print(f"[blocked] {name}")
+                        continue
+                    if not deps <= done:
+                        continue
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    fp = self.fingerprint(stage)
+                    # в dry-run родители не запускались: если родитель поменяется, поменяемся и мы
+                    stale = dry_run and bool(deps & rerun)
+                    if name not in force and not stale and self.up_to_date(stage, fp):
+                        print(f"[skip]    {name} (не изменилась)")
+                        done.add(name)
+                        continue
+                    rerun.add(name)
+                    if dry_run:
+                        print(f"[run]     {name}")
+                        done.add(name)
+                        continue
+                    print(f"[start]   {name}")
+                    running[pool.submit(self.run_stage, stage, fp)] = name
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    ok, elapsed = fut.result()
+                    if ok:
+                        done.add(name)
+                        print(f"[done]    {name} ({elapsed:.1f}s)")
+                    else:
+                        failed.add(name)
+                        print(f"[failed]  {name} ({elapsed:.1f}s) -> {LOGS_DIR / (name + '.log')}")
+
+        return not failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Запуск пайплайна с пропуском неизменившихся стадий")
+    parser.add_argument("targets", nargs="*", help="какие стадии нужны (с их предками); по умолчанию все")
+    parser.add_argument("--force", default="", help="через запятую: перезапустить, даже если не изменились")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="сколько стадий одновременно")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет запущено")
+    args = parser.parse_args()
+
+    names = {s.name for s in STAGES}
+    force = {s for s in args.force.split(",") if s}
+    unknown = (set(args.targets) | force) - names
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    ok = Pipeline(STAGES, workers=args.workers).run(set(args.targets) or None, force, args.dry_run)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
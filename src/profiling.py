@@ -0,0 +1,228 @@
+"""
+Режим --profile у любой стадии (обрабатывает metrics.run_stage):
+
+    python src/enrich_site_features.py --profile
+
+В data/profiles/ появляются:
+  <stage>.collapsed — CPU-сэмплы в folded-формате (flamegraph.pl, speedscope, inferno);
+  <stage>.memory.txt — пик tracemalloc: общий, по горячим функциям и топ мест аллокаций.
+Воркеры ProcessPoolExecutor не профилируются — для полного профиля запускайте с --workers 1.
+"""
+from __future__ import annotations
+
+import functools
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROFILES_DIR = BASE_DIR / "data" / "profiles"
+
+SAMPLE_INTERVAL = 0.005
+TRACE_FRAMES = 10
+TOP = 15
+
+F = TypeVar("F", bound=Callable[..., Any])
+# ThreadPoolExecutor-0_17 -> ThreadPoolExecutor: потоки пула сливаются в один корень flamegraph
+THREAD_SUFFIX_RE = re.compile(r"[-_]\d+(_\d+)?$")
+CPU_CLOCK = hasattr(time, "pthread_getcpuclockid")
+
+
+def _thread_cpu(ident: int) -> Optional[float]:
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (OSError, ValueError, OverflowError):
+        return None
+
+
+class StackSampler(threading.Thread):
+    """
+    Раз в interval снимает стеки всех потоков (sys._current_frames) и копит folded-стеки.
+    Сэмпл засчитывается, только если поток за интервал тратил CPU (часы потока через
+    pthread_getcpuclockid): ожидание сети и sleep в профиль не попадают. Без таких часов — wall-clock.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._cpu: Dict[int, float] = {}
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        names: Dict[int, str] = {}
+        while not self._halt.wait(self.interval):
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: THREAD_SUFFIX_RE.sub("", t.name) for t in threading.enumerate() if t.ident}
+            for ident, frame in frames.items():
+                if ident == self.ident or not self._busy(ident):
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def _busy(self, ident: int) -> bool:
+        if not CPU_CLOCK:
+            return True
+        now = _thread_cpu(ident)
+        if now is None:
+            return True
+        before = self._cpu.get(ident)
+        self._cpu[ident] = now
+        return before is None or now > before
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+    def self_time(self) -> List[Tuple[str, int]]:
+        # "собственное" время: сколько сэмплов функция была на верхушке стека
+        top: Counter = Counter()
+        for stack, n in self.stacks.items():
+            top[stack.rsplit(";", 1)[-1]] += n
+        return top.most_common(TOP)
+
+    def write_collapsed(self, path: Path) -> None:
+        path.write_text("".join(f"{s} {n}\n" for s, n in self.stacks.most_common()), encoding="utf-8")
+
+
+class _Call:
+    __slots__ = ("entry", "peak")
+
+    def __init__(self, entry: int) -> None:
+        self.entry = entry  # память на входе
+        self.peak = entry   # пик за время вызова, накопленный до чужих reset_peak
+
+
+class MemoryPeaks:
+    """
+    Пик памяти внутри вызовов горячих функций: перед вызовом сбрасываем пик tracemalloc,
+    после — берём (пик - память на входе). reset_peak стирает пик и у объемлющих вызовов
+    (горячая функция внутри горячей, соседние потоки), поэтому перед каждым сбросом
+    текущий пик вливается во все незавершённые вызовы; общий пик процесса — так же.
+    В многопоточных стадиях в пик вызова попадают и аллокации соседних потоков.
+    """
+
+    def __init__(self) -> None:
+        self.peaks: Dict[str, int] = {}
+        self.calls: Counter = Counter()
+        self.overall = 0
+        self.pool_tasks = 0
+        self._active: List[_Call] = []
+        self._lock = threading.Lock()
+
+    def call(self, name: str, fn: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in self._active:
+                outer.peak = max(outer.peak, peak)
+            self.overall = max(self.overall, peak)
+            tracemalloc.reset_peak()
+            call = _Call(current)
+            self._active.append(call)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                _, peak = tracemalloc.get_traced_memory()
+                self._active.remove(call)
+                call.peak = max(call.peak, peak)
+                self.overall = max(self.overall, call.peak)
+                self.peaks[name] = max(self.peaks.get(name, 0), call.peak - call.entry)
+                self.calls[name] += 1
+
+
+PEAKS: Optional[MemoryPeaks] = None
+
+
+def measured(name: str, fn: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+    """Вызов через учёт пика памяти, если идёт профилирование (иначе — просто вызов)."""
+    if PEAKS is None:
+        return fn(*args, **kwargs)
+    return PEAKS.call(name, fn, args, kwargs)
+
+
+def pool_task() -> None:
+    """Результат задачи из ProcessPoolExecutor (metrics.unwrap): её горячий код в профиль не попал."""
+    if PEAKS is not None:
+        with PEAKS._lock:
+            PEAKS.pool_tasks += 1
+
+
+def hot(fn: F) -> F:
+    """Горячая функция не из анализа (metrics.timed уже учитывается сам): видна в отчёте памяти."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return measured(name, fn, args, kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _mb(n: float) -> str:
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+def memory_report(stage: str, peaks: MemoryPeaks, snapshot: tracemalloc.Snapshot) -> str:
+    _, peak = tracemalloc.get_traced_memory()
+    lines = [f"stage: {stage}", f"peak traced: {_mb(max(peaks.overall, peak))}", "", "peak inside hot functions:"]
+    for name, size in sorted(peaks.peaks.items(), key=lambda kv: -kv[1]):
+        lines.append(f"  {name:28} {_mb(size):>10}  calls={peaks.calls[name]}")
+    if peaks.pool_tasks:
+        lines += [
+            f"  NB: {peaks.pool_tasks} task(s) ran in ProcessPoolExecutor workers: their CPU and memory",
+            "      are not in this profile (CPU samples too); rerun the stage with --workers 1 to profile them",
+        ]
+    lines += ["", f"top {TOP} allocation sites still held at exit:"]
+    # свои структуры профайлера и импорт модулей в отчёте только мешают
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    for stat in snapshot.statistics("lineno")[:TOP]:
+        frame = stat.traceback[0]
+        lines.append(f"  {_mb(stat.size):>10}  {stat.count:>8} blocks  {Path(frame.filename).name}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def session(stage: str, out_dir: Path = PROFILES_DIR) -> Iterator[None]:
+    global PEAKS
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tracemalloc.start(TRACE_FRAMES)
+    PEAKS = MemoryPeaks()
+    sampler = StackSampler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        report = memory_report(stage, PEAKS, snapshot)
+        tracemalloc.stop()
+        PEAKS = None
+
+        collapsed = out_dir / f"{stage}.collapsed"
+        sampler.write_collapsed(collapsed)
+        (out_dir / f"{stage}.memory.txt").write_text(report, encoding="utf-8")
+
+        kind = "CPU" if CPU_CLOCK else "wall"
+        print(f"\nProfile ({kind} samples: {sampler.samples}, every {SAMPLE_INTERVAL * 1000:.0f} ms) -> {collapsed}")
+        for frame, n in sampler.self_time():
+            print(f"  {n / max(sampler.samples, 1):6.1%}  {frame}")
+        print(report)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket: не больше `rate` запросов в секунду
+    с допустимым всплеском `burst`. Общий для всех воркеров одного источника.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self) -> None:
+        # ждём, пока не появится токен и не закончится пауза после 429
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Останавливает выдачу токенов всем воркерам (например, по Retry-After)."""
+        with self._lock:
+            until = time.monotonic() + max(0.0, seconds)
+            if until > self._paused_until:
+                self._paused_until = until
+                # после паузы начинаем с пустого ведра, без всплеска
+                self._tokens = 0.0
+                self._updated = until
+
+
+def parse_retry_after(value: Optional[str], default: float = 5.0) -> float:
+    # HH отдаёт Retry-After в секундах; HTTP-date на практике не встречается
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return default
+
+
+# ответы "притормози": rate limit и перегрузка на стороне хоста или прокси перед ним
+THROTTLE_STATUSES = frozenset({429, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class PaceLimits:
+    """Интервал между стартами запросов к одному хосту, секунды."""
+    floor: float                 # чаще не ходим, даже если хост отвечает мгновенно
+    ceiling: float               # реже не ходим (дольше — только по Retry-After)
+    start: float                 # с чего начинаем, пока про хост ничего не известно
+    one_in_flight: bool = False  # не больше одного запроса в полёте на хост
+
+
+class AimdPacer:
+    """
+    AIMD по скорости к одному хосту: каждый быстрый ответ прибавляет шаг,
+    429/502/503/504, таймаут или обрыв — делят скорость на 2 (и ставят паузу по Retry-After),
+    рост задержки выше LATENCY_RISE * базовая — мягко тормозит.
+    Шаг — 1/INCREASE_STEPS от диапазона: от ceiling до floor хост разгоняется за INCREASE_STEPS ответов.
+    """
+
+    INCREASE_STEPS = 20
+    DECREASE = 0.5
+    LATENCY_DECREASE = 0.8
+    LATENCY_RISE = 2.0
+    EWMA = 0.2
+
+    def __init__(self, limits: PaceLimits) -> None:
+        self.limits = limits
+        self.min_rate = 1.0 / limits.ceiling
+        self.max_rate = 1.0 / limits.floor
+        self.step = (self.max_rate - self.min_rate) / self.INCREASE_STEPS
+        self.rate = 1.0 / limits.start
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.throttled = 0
+        self._next_at = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+    def acquire(self) -> None:
+        # бронируем ближайший старт: параллельные воркеры встают в очередь через interval
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at, self._paused_until)
+            self._next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def feedback(self, status: Optional[int], latency: float = 0.0, retry_after: float = 0.0) -> None:
+        """status=None — таймаут или сетевая ошибка; latency — до заголовков ответа."""
+        with self._lock:
+            if status is None or status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.rate *= self.DECREASE
+                if retry_after > 0:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            else:
+                self.latency = latency if self.latency is None else self.latency + self.EWMA * (latency - self.latency)
+                # базовая задержка — лучшая сглаженная, медленно подтягивается вверх
+                if self.baseline is None or self.latency < self.baseline:
+                    self.baseline = self.latency
+                else:
+                    self.baseline += 0.01 * (self.latency - self.baseline)
+                if self.latency > self.LATENCY_RISE * self.baseline:
+                    self.rate *= self.LATENCY_DECREASE
+                else:
+                    self.rate += self.step
+            self.rate = min(self.max_rate, max(self.min_rate, self.rate))
+
+
+class HostGate:
+    """
+    Вежливость per-host: у каждого хоста свой AimdPacer в пределах limits,
+    при one_in_flight — ещё и не больше одного запроса в полёте. Разные хосты друг друга не ждут.
+    Вызывающий сообщает исход запроса через pacer.feedback(...).
+    """
+
+    def __init__(self, limits: PaceLimits) -> None:
+        self.limits = limits
+        self._pacers: Dict[str, AimdPacer] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def pacer(self, host: str) -> AimdPacer:
+        with self._guard:
+            if host not in self._pacers:
+                self._pacers[host] = AimdPacer(self.limits)
+                self._locks[host] = threading.Lock()
+            return self._pacers[host]
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[AimdPacer]:
+        host = urlparse(url).netloc.lower()
+        pacer = self.pacer(host)
+        if not self.limits.one_in_flight:
+            pacer.acquire()
+            yield pacer
+            return
+        with self._locks[host]:
+            pacer.acquire()
+            yield pacer
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._guard:
+            pacers = dict(self._pacers)
+        return {
+            host: {"interval": round(p.interval, 3), "latency": round(p.latency or 0.0, 3), "throttled": p.throttled}
+            for host, p in pacers.items()
+        }
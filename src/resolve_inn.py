@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import argparse
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+import metrics
+import storage
+from enrich_inn_rusprofile_v2 import STATS as RUSPROFILE_STATS
+from inn_resolver import WORKERS, Company, DadataSource, InnHit, default_resolver
+from journal import Journal
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+# без токена DaData просто выпадает из каскада
+DADATA_TOKEN = os.getenv("DADATA_TOKEN", "").strip()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ИНН одним каскадом: сайт -> локальный кэш -> DaData -> rusprofile")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--fresh", action="store_true", help="не продолжать с журнала прошлого прогона")
+    args = parser.parse_args()
+
+    inp = "companies_stage3"
+    out = "companies_stage5_inn"
+
+    df = storage.read_table(inp)
+    for col in ("inn", "inn_source"):
+        if col not in df.columns:
+            df[col] = ""
+
+    companies = [
+        Company(name=(r.get("name") or "").strip(), site=(r.get("site") or "").strip(), site_inn=(r.get("inn") or "").strip())
+        for _, r in df.iterrows()
+    ]
+
+    # каскад зависит от кода резолвера и его источников — он тоже в хэше журнала
+    code = [Path(__file__)] + [
+        Path(__file__).with_name(m)
+        for m in ("inn_resolver.py", "inn_index.py", "dadata_client.py", "enrich_inn_rusprofile_v2.py", "html_doc.py")
+    ]
+    journal = Journal("resolve_inn", code, resume=not args.fresh)
+    keys = [r.get("employer_id") or c.name for (_, r), c in zip(df.iterrows(), companies)]
+
+    hits = []
+    todo = []
+    for i, c in enumerate(companies):
+        done = journal.get(keys[i], [c.name, c.site, c.site_inn])
+        hits.append(InnHit(**done["hit"]) if done and done["hit"] else None)
+        if done is None:
+            todo.append(i)
+    if journal.resumed:
+        print(f"Resumed: {len(companies) - len(todo)} companies from {journal.path}")
+
+    def remember(j: int, hit: Optional[InnHit]) -> None:
+        c = companies[todo[j]]
+        journal.write(keys[todo[j]], {"hit": asdict(hit) if hit else None}, [c.name, c.site, c.site_inn])
+
+    resolver = default_resolver(DADATA_TOKEN, workers=args.workers)
+    for i, hit in zip(todo, resolver.resolve_many([companies[i] for i in todo], on_done=remember)):
+        hits[i] = hit
+
+    df["inn"] = [h.inn if h else "" for h in hits]
+    df["inn_source"] = [h.source if h else "" for h in hits]
+    df["inn_confident"] = [int(h.confident) if h else 0 for h in hits]
+
+    out_path = storage.write_table(df, out)
+    journal.finish()
+    print(f"Saved: {len(df)} rows -> {out_path}")
+    print("INN filled:", int((df["inn"] != "").sum()))
+    print("By source:", df.loc[df["inn"] != "", "inn_source"].value_counts().to_dict())
+    print("Resolver:", dict(resolver.stats))
+    for s in resolver.sources:
+        if isinstance(s, DadataSource):
+            print("DaData:", s.client.stats)
+    print("rusprofile:", RUSPROFILE_STATS)
+
+if __name__ == "__main__":
+    metrics.run_stage("resolve_inn", main)
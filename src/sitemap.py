@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import gzip
+import html
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+
+# сколько файлов sitemap (включая вложенные из sitemapindex) читаем на домен
+MAX_SITEMAPS = 5
+MAX_SITEMAP_URLS = 50000
+
+LOC_RE = re.compile(r"<loc>\s*(?:<!\[CDATA\[)?\s*(.*?)\s*(?:\]\]>)?\s*</loc>", re.IGNORECASE | re.DOTALL)
+SITEMAPINDEX_RE = re.compile(r"<sitemapindex\b", re.IGNORECASE)
+URLSET_RE = re.compile(r"<urlset\b", re.IGNORECASE)
+
+# вложенные sitemap: сначала "страницы сайта", товары/новости/блог — в конец
+CHILD_PREFER = ("page", "static", "main", "info", "site", "menu")
+CHILD_AVOID = ("product", "goods", "catalog", "news", "blog", "article", "post", "tag", "image", "video")
+
+
+@dataclass
+class SiteMapInfo:
+    robots: Optional[RobotFileParser] = None
+    urls: List[str] = field(default_factory=list)
+    has_sitemap: bool = False
+    requests: int = 0
+
+    def allowed(self, user_agent: str, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(user_agent, url)
+
+
+def decode_body(data: bytes) -> str:
+    # .xml.gz отдают как есть (без Content-Encoding), requests его не распакует
+    if data[:2] == b"\x1f\x8b":
+        try:
+            data = gzip.decompress(data)
+        except (OSError, EOFError, zlib.error):
+            return ""
+    return data.decode("utf-8", errors="replace")
+
+
+def child_priority(url: str) -> int:
+    low = url.lower()
+    if any(k in low for k in CHILD_PREFER):
+        return 0
+    if any(k in low for k in CHILD_AVOID):
+        return 2
+    return 1
+
+
+def discover(base: str, get_bytes: Callable[[str], Optional[bytes]]) -> SiteMapInfo:
+    """
+    robots.txt -> Sitemap: (или /sitemap.xml по умолчанию) -> все <loc> страниц.
+    Понимает sitemapindex и gzip. get_bytes(url) -> тело ответа или None.
+    """
+    info = SiteMapInfo()
+
+    robots_body = get_bytes(urljoin(base, "/robots.txt"))
+    info.requests += 1
+    sitemaps: List[str] = []
+    if robots_body:
+        rp = RobotFileParser()
+        rp.parse(decode_body(robots_body).splitlines())
+        info.robots = rp
+        sitemaps = list(rp.site_maps() or [])
+    if not sitemaps:
+        sitemaps = [urljoin(base, "/sitemap.xml")]
+
+    queue = list(dict.fromkeys(sitemaps))
+    seen = set(queue)
+    fetched = 0
+    while queue and fetched < MAX_SITEMAPS and len(info.urls) < MAX_SITEMAP_URLS:
+        data = get_bytes(queue.pop(0))
+        fetched += 1
+        info.requests += 1
+        if not data:
+            continue
+
+        text = decode_body(data)
+        locs = [html.unescape(u) for u in LOC_RE.findall(text)]
+        if SITEMAPINDEX_RE.search(text):
+            info.has_sitemap = True
+            children = [u for u in locs if u not in seen]
+            seen.update(children)
+            queue.extend(children)
+            queue.sort(key=child_priority)
+        elif URLSET_RE.search(text):
+            # SPA часто отдаёт index.html на любой путь — это не sitemap
+            info.has_sitemap = True
+            info.urls.extend(locs[: MAX_SITEMAP_URLS - len(info.urls)])
+
+    return info
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+import metrics
+
+try:  # колоночный формат — опционально: pip install pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+EXPORT_DIR = DATA_DIR / "export"
+
+# parquet (zstd) при наличии pyarrow; STORAGE_FORMAT=csv — прежние CSV
+PARQUET = pq is not None and os.getenv("STORAGE_FORMAT", "parquet").strip().lower() != "csv"
+EXT = ".parquet" if PARQUET else ".csv"
+COMPRESSION = "zstd"
+# для потокового чтения: столько строк за раз держим в памяти
+CHUNK_ROWS = 50_000
+
+# типы колонок по имени, одинаковые во всех артефактах; остальное — строки
+INT_COLS = {"employer_id", "vacancy_id", "support_team_size_min", "status"}
+FLAG_COLS = {
+    "has_support_email", "has_contact_form", "has_online_chat", "has_messengers",
+    "has_support_section", "has_kb_or_faq", "mentions_24_7", "shift_work",
+}
+# мало разных значений — словарное кодирование
+CATEGORY_COLS = {"query", "source", "inn_source", "evidence_type", "schedule", "employment", "chat_vendor"}
+
+
+def table_path(name: str, data_dir: Path = DATA_DIR) -> Path:
+    """'raw/vacancies_details' -> data/raw/vacancies_details.parquet (или .csv)."""
+    return data_dir / f"{name}{EXT}"
+
+
+def source_path(name: str, data_dir: Path = DATA_DIR) -> Path:
+    """Откуда читать: parquet, а пока его нет — прежний CSV (данные, собранные до перехода на parquet)."""
+    path = table_path(name, data_dir)
+    if PARQUET and not path.exists():
+        legacy = data_dir / f"{name}.csv"
+        if legacy.exists():
+            return legacy
+    return path
+
+
+def exists(name: str) -> bool:
+    return source_path(name).exists()
+
+
+def _as_text(s: pd.Series) -> pd.Series:
+    # 404.0 (int-колонка с пропусками стала float) -> "404"
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all():
+        s = s.astype("Int64")
+    return s.astype("string").fillna("")
+
+
+def to_typed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Строковый фрейм (как после read_csv(dtype=str)) -> типизированный:
+    ID и счётчики — Int64, флаги — Int8, источники — category. Колонка остаётся
+    строкой, если в ней встретилось что-то кроме целых чисел (ничего не теряем).
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in INT_COLS or col in FLAG_COLS:
+            text = _as_text(s).str.strip()
+            if text.str.fullmatch(r"-?\d*").all():
+                out[col] = pd.to_numeric(text.mask(text == "")).astype("Int8" if col in FLAG_COLS else "Int64")
+                continue
+        if col in CATEGORY_COLS:
+            out[col] = _as_text(s).astype("category")
+        else:
+            out[col] = s.astype("string")
+    return pd.DataFrame(out, index=df.index)
+
+
+def to_text(df: pd.DataFrame) -> pd.DataFrame:
+    # обратно в вид read_csv(dtype=str, keep_default_na=False): пропуски -> ""
+    return pd.DataFrame({col: _as_text(df[col]).astype(object) for col in df.columns}, index=df.index)
+
+
+def read_table(
+    name: str,
+    columns: Optional[Sequence[str]] = None,
+    typed: bool = False,
+    data_dir: Path = DATA_DIR,
+) -> pd.DataFrame:
+    """
+    Читает артефакт. columns — только нужные колонки (в parquet остальные даже не декодируются).
+    typed=False отдаёт строки, как прежний read_csv(dtype=str, keep_default_na=False).
+    """
+    path = source_path(name, data_dir)
+    cols = list(columns) if columns is not None else None
+    if path.suffix == ".parquet":
+        if cols is not None:
+            present = set(pq.read_schema(path).names)
+            cols = [c for c in cols if c in present]
+        df = pq.read_table(path, columns=cols).to_pandas()
+        return df if typed else to_text(df)
+
+    usecols = (lambda c: c in set(cols)) if cols is not None else None
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, usecols=usecols)
+    return to_typed(df) if typed else df
+
+
+def iter_table(
+    name: str,
+    columns: Optional[Sequence[str]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    data_dir: Path = DATA_DIR,
+) -> Iterator[pd.DataFrame]:
+    """Как read_table(typed=False), но кусками по chunk_rows строк — память не растёт с размером файла."""
+    path = source_path(name, data_dir)
+    cols = list(columns) if columns is not None else None
+    if path.suffix == ".parquet":
+        pf = pq.ParquetFile(path)
+        if cols is not None:
+            cols = [c for c in cols if c in set(pf.schema_arrow.names)]
+        for batch in pf.iter_batches(batch_size=chunk_rows, columns=cols):
+            yield to_text(batch.to_pandas())
+        return
+
+    usecols = (lambda c: c in set(cols)) if cols is not None else None
+    yield from pd.read_csv(path, dtype=str, keep_default_na=False, usecols=usecols, chunksize=chunk_rows)
+
+
+class TableWriter:
+    """
+    Потоковая запись таблицы кусками (with TableWriter(name) as w: w.write(df)).
+    Пишем во временный файл и подменяем на close — как write_table, атомарно.
+    Схема parquet берётся из первого непустого куска, остальные приводятся к ней.
+    """
+
+    def __init__(self, name: str, data_dir: Path = DATA_DIR) -> None:
+        self.name = name
+        self.path = table_path(name, data_dir)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._header = True
+        self._columns: Optional[List[str]] = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._columns is None:
+            self._columns = list(df.columns)
+        if df.empty:
+            return
+        if PARQUET:
+            if self._writer is None:
+                table = pa.Table.from_pandas(to_typed(df), preserve_index=False)
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self.tmp, self._schema, compression=COMPRESSION)
+            else:
+                table = pa.Table.from_pandas(to_typed(df), schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.tmp, mode="w" if self._header else "a", header=self._header, index=False, encoding="utf-8")
+            self._header = False
+        self.rows += len(df)
+
+    def close(self) -> Path:
+        if self._writer is not None:
+            self._writer.close()
+        elif self.rows == 0:
+            # ни одной строки — всё равно оставляем таблицу с колонками
+            return write_table(pd.DataFrame(columns=self._columns or []), self.path.name[: -len(EXT)], self.path.parent)
+        os.replace(self.tmp, self.path)
+        metrics.inc("rows_written_total", self.rows, table=self.name)
+        return self.path
+
+    def discard(self) -> None:
+        """Бросить недописанное: прежняя версия таблицы остаётся нетронутой."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def write_table(df: pd.DataFrame, name: str, data_dir: Path = DATA_DIR) -> Path:
+    path = table_path(name, data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    if PARQUET:
+        table = pa.Table.from_pandas(to_typed(df), preserve_index=False)
+        pq.write_table(table, tmp, compression=COMPRESSION)
+    else:
+        df.to_csv(tmp, index=False, encoding="utf-8")
+    # атомарно: читатель (и хэш в pipeline) не увидит полузаписанный файл
+    os.replace(tmp, path)
+    metrics.inc("rows_written_total", len(df), table=name)
+    return path
+
+
+def num_rows(path: Path) -> int:
+    if not path.exists():
+        return 0
+    if path.suffix == ".parquet":
+        return pq.ParquetFile(path).metadata.num_rows
+    with path.open(encoding="utf-8", newline="") as fh:
+        return max(0, sum(1 for _ in csv.reader(fh)) - 1)
+
+
+def export_csv(names: List[str], out_dir: Path = EXPORT_DIR) -> List[Path]:
+    """Финальная выгрузка в CSV — отдельным явным шагом, промежуточные данные остаются в parquet."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        out = out_dir / f"{Path(name).name}.csv"
+        read_table(name).to_csv(out, index=False, encoding="utf-8")
+        paths.append(out)
+    return paths